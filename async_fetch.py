@@ -0,0 +1,264 @@
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError: # Optional dependency, only needed for the asyncio backend
+    aiohttp = None
+
+from metrics import request_metrics
+from scraper_core import (
+    HEADERS, build_search_url, parse_search_results,
+    copy_for_update, prepare_book_data, apply_product_page, apply_extracted_price, finalize_book_data,
+    record_http_error, record_timeout, record_network_error, record_unknown_error,
+)
+
+# --- Configuration ---
+DEFAULT_MAX_IN_FLIGHT = 50 # Cap on concurrent requests sharing the event loop
+PRODUCT_TIMEOUT = 10 # Seconds per product page request (same as update_book_info)
+SEARCH_TIMEOUT = 15 # Seconds per search request (same as scrape_knygos_lt)
+
+
+def _require_aiohttp():
+    if aiohttp is None:
+        raise RuntimeError("The asyncio backend needs the 'aiohttp' package (pip install aiohttp).")
+
+
+def create_client_session(max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    """
+    Creates an aiohttp.ClientSession whose connection pool matches the in-flight cap.
+
+    Must be called from inside a running event loop.
+    """
+    _require_aiohttp()
+    connector = aiohttp.TCPConnector(limit=max_in_flight, limit_per_host=max_in_flight)
+    return aiohttp.ClientSession(connector=connector, headers=HEADERS)
+
+
+# --- Async Scraper for Search Results ---
+async def scrape_knygos_lt_async(query, session=None, timeout=SEARCH_TIMEOUT):
+    """
+    Asyncio counterpart of scrape_knygos_lt.
+
+    Args:
+        query (str): The search term.
+        session (aiohttp.ClientSession, optional): Session to reuse. A temporary
+                                                   one is created if not given.
+        timeout (float): Seconds before the request is abandoned.
+
+    Returns:
+        list: Book dicts, exactly as scrape_knygos_lt returns them.
+        str: An error message string, or None if successful.
+    """
+    _require_aiohttp()
+    own_session = session is None
+    if own_session:
+        session = create_client_session()
+
+    books_found = []
+    error_message = None
+    try:
+        search_url = build_search_url(query)
+        print(f"Fetching Search URL: {search_url}")
+        started = time.perf_counter()
+        async with session.get(search_url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            headers_at = time.perf_counter()
+            request_metrics.record_response('search', response.status, ttfb=headers_at - started)
+            response.raise_for_status()
+            content = await response.read()
+            request_metrics.record_body('search', len(content), download=time.perf_counter() - headers_at)
+        print("Successfully fetched search page.")
+        books_found, error_message = parse_search_results(content)
+    except asyncio.TimeoutError:
+        request_metrics.record_error('search', 'timeout')
+        error_message = f"Search request timed out after {timeout} seconds."
+        print(error_message)
+    except aiohttp.ClientError as e:
+        if not isinstance(e, aiohttp.ClientResponseError):
+            request_metrics.record_error('search', 'network')
+        error_message = f"Search network error: {e}"
+        print(error_message)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        error_message = f"Search scraping error: {e}"
+        print(error_message)
+    finally:
+        if own_session:
+            await session.close()
+
+    return books_found, error_message
+
+
+# --- Async Scraper for Individual Book Page ---
+async def update_book_info_async(book_data, session, semaphore=None, timeout=PRODUCT_TIMEOUT, cache=None, journal=None,
+                                 start_callback=None):
+    """
+    Asyncio counterpart of update_book_info; returns the same book_data dict.
+
+    Args:
+        book_data (dict): Dictionary containing at least 'url' and 'title'.
+        session (aiohttp.ClientSession): Session shared by all fetches of a run.
+        semaphore (asyncio.Semaphore, optional): Limits requests in flight.
+        timeout (float): Seconds before this request is abandoned.
+        cache (http_cache.HttpCache, optional): Validator/price cache, used the
+                                                same way as in update_book_info.
+        journal (price_journal.PriceJournal, optional): Receives every successful price check.
+        start_callback (callable, optional): Called as start_callback(book_data)
+            once the request is allowed to start (after the semaphore).
+
+    Returns:
+        dict: Updated book_data. Includes 'error' key if update failed.
+    """
+    _require_aiohttp()
+    book_data, should_fetch = prepare_book_data(book_data)
+    if not should_fetch:
+        return book_data
+
+    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+    history_length = len(book_data['price_history'])
+    last_checked = book_data.get('last_checked')
+    try:
+        request_headers = None
+        cache_entry = cache.lookup(book_data['url']) if cache is not None else None
+        if cache_entry is not None:
+            if cache.is_fresh(cache_entry):
+                print("  -> Cached copy is still fresh, reusing price.")
+                apply_extracted_price(book_data, cache_entry['price'])
+                return finalize_book_data(book_data)
+            request_headers = cache.validator_headers(cache_entry)
+
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            if start_callback:
+                start_callback(book_data)
+            print(f"Updating book: {str(book_identifier)[:50]}... URL: {book_data['url']}")
+            started = time.perf_counter()
+            async with session.get(book_data['url'], headers=request_headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                headers_at = time.perf_counter()
+                request_metrics.record_response('product', response.status, ttfb=headers_at - started)
+                if response.status == 304 and cache_entry is not None:
+                    print("  -> Not modified (304), reusing cached price.")
+                    cache.revalidated(book_data['url'], response.headers)
+                    apply_extracted_price(book_data, cache_entry['price'])
+                    return finalize_book_data(book_data)
+                if response.status >= 400:
+                    record_http_error(book_data, response.status)
+                    return finalize_book_data(book_data)
+                content = await response.read()
+                request_metrics.record_body('product', len(content), download=time.perf_counter() - headers_at)
+                response_headers = response.headers
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+        # Parse outside the semaphore so the next request can start downloading
+        temp_price = apply_product_page(book_data, content)
+        if cache is not None:
+            cache.store(book_data['url'], response_headers, temp_price)
+
+    except asyncio.TimeoutError:
+        request_metrics.record_error('product', 'timeout')
+        record_timeout(book_data)
+    except aiohttp.ClientError as e:
+        request_metrics.record_error('product', 'network')
+        record_network_error(book_data, e)
+    except asyncio.CancelledError:
+        raise # Let cancellation propagate to the caller
+    except Exception as e:
+        record_unknown_error(book_data, e)
+    finally:
+        if journal is not None and (len(book_data['price_history']) > history_length
+                                    or book_data.get('last_checked') != last_checked):
+            journal.record_observation(book_data)
+
+    return finalize_book_data(book_data)
+
+
+async def refresh_books_async(books, max_in_flight=DEFAULT_MAX_IN_FLIGHT, timeout=PRODUCT_TIMEOUT,
+                              progress_callback=None, stop_event=None, cache=None, journal=None,
+                              start_callback=None):
+    """
+    Refreshes every book on the current event loop.
+
+    Args:
+        books (list): Book data dicts. Each one is copied before being updated.
+        max_in_flight (int): Maximum number of requests running at once.
+        timeout (float): Per-request timeout in seconds.
+        progress_callback (callable, optional): Called as
+            progress_callback(done, total, updated_book) as each book finishes.
+        stop_event (threading.Event, optional): When set, books that have not
+            started yet are skipped and marked as cancelled.
+        cache (http_cache.HttpCache, optional): Validator/price cache.
+        journal (price_journal.PriceJournal, optional): Receives every successful price check.
+        start_callback (callable, optional): Called as start_callback(book) when
+            a book's request starts (not while it waits for a free slot).
+
+    Returns:
+        list: Updated book data dicts in the same order as `books`.
+    """
+    _require_aiohttp()
+    books = list(books)
+    total = len(books)
+    results = [None] * total
+    if total == 0:
+        return results
+
+    semaphore = asyncio.Semaphore(max(1, int(max_in_flight)))
+    done = 0
+
+    async def refresh_one(index, book, session):
+        nonlocal done
+        if stop_event is not None and stop_event.is_set():
+            updated = finalize_book_data(book)
+            updated['error'] = "Cancelled"
+        else:
+            updated = await update_book_info_async(book, session, semaphore=semaphore, timeout=timeout,
+                                                   cache=cache, journal=journal, start_callback=start_callback)
+        results[index] = updated
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, updated)
+
+    async with create_client_session(max_in_flight) as session:
+        tasks = [asyncio.create_task(refresh_one(index, copy_for_update(book), session))
+                 for index, book in enumerate(books)]
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    return results
+
+
+class AsyncRefreshEngine:
+    """
+    Drop-in alternative to refresh_engine.RefreshEngine backed by asyncio.
+
+    run() blocks the calling thread while a private event loop performs all
+    fetches, so it can be swapped in wherever RefreshEngine.run is used.
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, timeout=PRODUCT_TIMEOUT, stop_event=None, cache=None, journal=None):
+        _require_aiohttp()
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.stop_event = stop_event
+        self.cache = cache
+        self.journal = journal
+
+    def run(self, books, progress_callback=None, start_callback=None):
+        """
+        Refreshes every book and waits for all of them to finish.
+
+        Returns:
+            list: Updated book data dicts in the same order as `books`.
+        """
+        return asyncio.run(refresh_books_async(books, max_in_flight=self.max_in_flight, timeout=self.timeout,
+                                               progress_callback=progress_callback, stop_event=self.stop_event,
+                                               cache=self.cache, journal=self.journal,
+                                               start_callback=start_callback))
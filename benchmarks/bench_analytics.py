@@ -0,0 +1,77 @@
+"""
+Times the watchlist analytics of price_analytics.py.
+
+Generates a synthetic watchlist (default: 10,000 books with three years of
+daily checks, the same histories as bench_price_series.py) and reports:
+  * first_s    first compute(): every price_history converted to a PriceSeries
+  * cached_s   compute() again with the series cached (the GUI case after a load)
+  * update_s   compute() after one new observation for a tenth of the books
+               (the GUI case after a refresh)
+
+Usage: python benchmarks/bench_analytics.py [--books N] [--days N] [--runs N] [--max-ms MS]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_price_series import synthetic_history  # noqa: E402
+from price_analytics import PriceAnalytics  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions of the cached and update steps.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if the median cached compute() takes longer than this.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = date(2022, 1, 1)
+    books = [{'url': f"https://www.knygos.lt/lt/knygos/synthetic-{i}/",
+              'price_history': synthetic_history(rng, args.days, start)} for i in range(args.books)]
+    today = start + timedelta(days=args.days)
+    analytics = PriceAnalytics()
+
+    def key_func(book_data):
+        return book_data['url']
+
+    started = time.perf_counter()
+    analytics.compute(books, key_func, today=today)
+    first = time.perf_counter() - started
+
+    cached = []
+    updated = []
+    for run in range(args.runs):
+        started = time.perf_counter()
+        analytics.compute(books, key_func, today=today)
+        cached.append(time.perf_counter() - started)
+
+        today += timedelta(days=1)
+        for book_data in books[run::10]:
+            book_data['price_history'].append([today.isoformat(), book_data['price_history'][-1][1]])
+        started = time.perf_counter()
+        analytics.compute(books, key_func, today=today)
+        updated.append(time.perf_counter() - started)
+
+    print(f"Analytics of {args.books} books x {args.days} days:")
+    print(f"  first_s   {first * 1000:9.1f} ms (history -> PriceSeries conversion included)")
+    print(f"  cached_s  median {statistics.median(cached) * 1000:9.1f} ms   min {min(cached) * 1000:9.1f} ms")
+    print(f"  update_s  median {statistics.median(updated) * 1000:9.1f} ms   min {min(updated) * 1000:9.1f} ms")
+    if args.max_ms is not None and statistics.median(cached) * 1000 > args.max_ms:
+        print(f"FAIL: cached compute() above {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
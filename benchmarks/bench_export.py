@@ -0,0 +1,108 @@
+"""
+Time and peak memory of the streaming watchlist export/import (watchlist_export.py).
+
+Writes a synthetic interested_books.json (default: 2,000 books with three
+years of daily prices, ~2.2 million history rows) one book at a time, then
+runs every step in a fresh child process and reports its wall time and peak
+RSS:
+  * json.load           the whole file loaded at once, for comparison
+  * export csv/parquet  interested_books.json -> books + history files
+  * import csv/parquet  books + history files -> interested_books.json
+The streaming steps should stay near the interpreter's own footprint however
+large --books and --days are, while json.load grows with the file.
+Parquet steps are skipped if pyarrow is not installed.
+
+Usage: python benchmarks/bench_export.py [--books N] [--days N] [--keep DIR]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_price_series import synthetic_history  # noqa: E402
+from scraper_core import write_books_json  # noqa: E402
+from watchlist_export import history_path_for  # noqa: E402
+
+_CHILD = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+if sys.argv[1] == "json.load":
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        json.load(f)
+    code = 0
+else:
+    import watchlist_export
+    code = watchlist_export.main(sys.argv[1:])
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": time.perf_counter() - started, "code": code,
+                  "peak_rss_mb": peak / (1024 * 1024 if sys.platform == "darwin" else 1024)}))
+"""
+
+
+def synthetic_books(count, days, seed=1):
+    rng = random.Random(seed)
+    for i in range(count):
+        history = synthetic_history(rng, days, date(2022, 1, 1))
+        yield {'title': f"Synthetic Book {i}", 'url': f"https://www.knygos.lt/lt/knygos/synthetic-{i}/",
+               'price': history[-1][1], 'product_id': str(100000 + i), 'price_history': history}
+
+
+def run_step(argv):
+    completed = subprocess.run([sys.executable, "-c", _CHILD, *argv], cwd=REPO_DIR, capture_output=True,
+                               text=True, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Step {' '.join(argv)} failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if result['code']:
+        raise RuntimeError(f"Step {' '.join(argv)} returned {result['code']}:\n{completed.stderr}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--keep", help="Write the files into this directory and keep them.")
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("resource") is None:
+        raise SystemExit("This benchmark needs the 'resource' module (not available on Windows).")
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.keep or tmp
+        os.makedirs(directory, exist_ok=True)
+        watchlist = os.path.join(directory, "interested_books.json")
+        started = time.perf_counter()
+        write_books_json(synthetic_books(args.books, args.days), watchlist)
+        print(f"{args.books} books x {args.days} days = {args.books * args.days} history rows, "
+              f"{os.path.getsize(watchlist) / 2 ** 20:.1f} MB of JSON (generated in {time.perf_counter() - started:.1f} s)")
+
+        formats = ["csv"] + (["parquet"] if importlib.util.find_spec("pyarrow") else [])
+        steps = [("json.load", ["json.load", watchlist])]
+        for fmt in formats:
+            exported = os.path.join(directory, f"books.{fmt}")
+            steps.append((f"export {fmt}", ["export", exported, "--file", watchlist]))
+            steps.append((f"import {fmt}", ["import", exported, "--file", os.path.join(directory, f"imported_{fmt}.json")]))
+
+        print(f"{'step':<16}{'seconds':>10}{'peak RSS MB':>14}{'output MB':>12}")
+        for name, argv in steps:
+            result = run_step(argv)
+            output = ""
+            if name.startswith("export"):
+                size = os.path.getsize(argv[1]) + os.path.getsize(history_path_for(argv[1]))
+                output = f"{size / 2 ** 20:.1f}"
+            print(f"{name:<16}{result['seconds']:>10.2f}{result['peak_rss_mb']:>14.1f}{output:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Offline benchmark of the scraping paths against the local knygos.lt stand-in.
+
+Starts benchmarks/standin_server.py in a separate process (so its CPU time and
+memory are not counted), points scraper_core at it and runs:
+  * search    scrape_knygos_lt for --queries queries, --pages pages each
+  * refresh   RefreshEngine + update_book_info over --books product pages
+  * per-book / bulk
+              the books found by the search phase refreshed one product page
+              each, then with BulkRefresher (shared listing pages by search_query)
+  * watchlist write_books_json / json.load and SQLiteStore upsert / load of the
+              refreshed books (no network)
+
+For every network phase it reports requests per second, p50/p99 request
+latency (time to response headers, measured client-side), CPU time of this
+process per parsed page and peak RSS. Results are printed as a table and, with
+--output, written as JSON so runs can be compared across commits.
+
+Usage: python benchmarks/bench_offline.py [--books N] [--queries N] [--pages N]
+                                          [--workers N] [--extractor NAME] [--streaming]
+                                          [stand-in options, see standin_server.py]
+Example: python benchmarks/bench_offline.py --books 2000 --latency 0.02 --page-padding 50000 --output run.json
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import extractors  # noqa: E402
+import scraper_core  # noqa: E402
+from bulk_refresh import BulkRefresher  # noqa: E402
+from refresh_engine import RefreshEngine, create_session  # noqa: E402
+from sqlite_store import SQLiteStore  # noqa: E402
+from standin_server import build_parser  # noqa: E402
+
+# Stand-in options passed through to the server process
+SERVER_OPTIONS = ("latency", "error_rate", "error_status", "retry_after", "rate_limit", "hang_rate",
+                  "hang_seconds", "down_after", "down_for", "page_padding", "page_markup", "search_results",
+                  "search_page_size", "seed")
+
+
+def start_server(args):
+    """Starts the stand-in in a child process and returns (process, base url)."""
+    command = [sys.executable, os.path.join(BENCH_DIR, "standin_server.py"), "--port", "0"]
+    for name in SERVER_OPTIONS:
+        command += ["--" + name.replace("_", "-"), str(getattr(args, name))]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        raise SystemExit("Stand-in server failed to start")
+    return process, line.split()[-1]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1) # Bytes on macOS, KiB elsewhere
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list, None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Recorder:
+    """Collects per-request latency and status of every session it is attached to."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+
+    def session(self):
+        session = create_session()
+        session.hooks['response'].append(self._on_response)
+        return session
+
+    def _on_response(self, response, *args, **kwargs):
+        # list.append and dict updates are atomic enough under the GIL for counting
+        self.latencies.append(response.elapsed.total_seconds())
+        self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+
+
+def measure(name, func, parsed_pages):
+    """Runs func(recorder) and returns the phase report."""
+    recorder = Recorder()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    result = func(recorder)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    pages = parsed_pages(result, recorder)
+    p50, p99 = percentile(recorder.latencies, 0.50), percentile(recorder.latencies, 0.99)
+    return {
+        'phase': name,
+        'requests': len(recorder.latencies),
+        'statuses': recorder.statuses,
+        'seconds': round(elapsed, 3),
+        'req_per_s': round(len(recorder.latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+        'p99_ms': round(p99 * 1000, 2) if p99 is not None else None,
+        'parsed_pages': pages,
+        'cpu_ms_per_page': round(cpu * 1000 / pages, 3) if pages else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_search(args):
+    queries = [f"standin query {i}" for i in range(args.queries)]
+    found = []
+
+    def run(recorder):
+        session = recorder.session()
+        try:
+            for query in queries:
+                books, _ = scraper_core.scrape_knygos_lt(query, max_pages=args.pages, session=session)
+                found.extend(books)
+            return found
+        finally:
+            session.close()
+
+    # Every 200 response is parsed, including the empty page that ends pagination
+    return measure("search", run, lambda result, recorder: recorder.statuses.get(200, 0)), found
+
+
+def bench_refresh(args, base_url):
+    books = [{'title': f"Stand-in Book {i}", 'url': f"{base_url}/lt/knygos/standin-{i}/", 'product_id': str(i),
+              'price': 'N/A', 'price_history': []} for i in range(args.books)]
+    refreshed = []
+
+    def run(recorder):
+        engine = RefreshEngine(workers=args.workers, session_factory=recorder.session)
+        refreshed.extend(engine.run(books))
+        return refreshed
+
+    report = measure("refresh", run,
+                     lambda result, recorder: sum(1 for book_data in result if not book_data.get('error')))
+    return report, refreshed
+
+
+def bench_bulk(args, books):
+    """Refreshes the books found by the search phase per product page, then from listing pages."""
+    reports = []
+    for name, bulk in (("per-book", False), ("bulk", True)):
+        def run(recorder):
+            engine = RefreshEngine(workers=args.workers, session_factory=recorder.session)
+            return (BulkRefresher(engine) if bulk else engine).run(books)
+        reports.append(measure(name, run, lambda result, recorder: recorder.statuses.get(200, 0)))
+    return reports
+
+
+def bench_watchlist(books):
+    """Save and load times of the watchlist storages, without network access."""
+    report = {'phase': 'watchlist', 'books': len(books)}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "interested_books.json")
+        started = time.perf_counter()
+        scraper_core.write_books_json(books, path)
+        report['json_save_s'] = round(time.perf_counter() - started, 4)
+        started = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        report['json_load_s'] = round(time.perf_counter() - started, 4)
+
+        store = SQLiteStore(os.path.join(tmp, "interested_books.db"))
+        try:
+            started = time.perf_counter()
+            store.upsert_books(books)
+            report['sqlite_save_s'] = round(time.perf_counter() - started, 4)
+            started = time.perf_counter()
+            store.load_books()
+            report['sqlite_load_s'] = round(time.perf_counter() - started, 4)
+        finally:
+            store.close()
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = build_parser()
+    parser.description = __doc__
+    parser.add_argument("--books", type=int, default=500, help="Product pages refreshed.")
+    parser.add_argument("--queries", type=int, default=20, help="Search queries scraped.")
+    parser.add_argument("--pages", type=int, default=3, help="Search result pages per query.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--extractor", default=extractors.EXTRACTOR_BACKEND,
+                        help="HTML extractor backend: auto, bs4, lxml, selectolax or regex.")
+    parser.add_argument("--streaming", action="store_true", help="Stream product pages (stop at the price).")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    extractors.EXTRACTOR_BACKEND = args.extractor
+    scraper_core.STREAMING_FETCH = args.streaming
+    process, base_url = start_server(args)
+    scraper_core.SITE_ROOT = base_url
+    scraper_core.BASE_SEARCH_URL = base_url + "/lt/paieska?q="
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w') # Silence the per-page progress messages
+    try:
+        search, found = bench_search(args)
+        refresh, refreshed = bench_refresh(args, base_url)
+        per_book, bulk = bench_bulk(args, found)
+        watchlist = bench_watchlist(refreshed)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        process.terminate()
+        process.wait()
+
+    results = {
+        'config': {'books': args.books, 'queries': args.queries, 'pages': args.pages, 'workers': args.workers,
+                   'extractor': extractors.get_extractor().name, 'streaming': args.streaming,
+                   'latency': args.latency, 'error_rate': args.error_rate, 'page_padding': args.page_padding},
+        'phases': [search, refresh, per_book, bulk, watchlist],
+    }
+    print(f"{'phase':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'pages':>8}{'cpu ms/page':>13}{'rss MB':>9}")
+    for phase in (search, refresh, per_book, bulk):
+        print(f"{phase['phase']:<10}{phase['requests']:>10}{phase['req_per_s'] or '-':>10}{phase['p50_ms'] or '-':>10}"
+              f"{phase['p99_ms'] or '-':>10}{phase['parsed_pages']:>8}{phase['cpu_ms_per_page'] or '-':>13}"
+              f"{phase['peak_rss_mb'] or '-':>9}")
+    print(f"watchlist ({watchlist['books']} books): json save {watchlist['json_save_s']}s, load {watchlist['json_load_s']}s; "
+          f"sqlite save {watchlist['sqlite_save_s']}s, load {watchlist['sqlite_load_s']}s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Throughput of process-pool parsing (parse_pool.py) by number of parser processes.
+
+Starts benchmarks/standin_server.py in a separate process with tag-heavy
+product pages (--page-markup) and, for each --parse-workers count, runs:
+  * parse     the same --books downloaded pages parsed through a ParsePool
+              (0 = parsed on this process's threads, as without a pool), so
+              only parsing and the transfer of the bytes are measured
+  * refresh   RefreshEngine + update_book_info over --books product pages,
+              fetching on --workers threads and parsing in the pool
+Reports pages per second, the speed-up over 0 workers and this process's CPU
+time per page. Parsing is CPU-bound, so throughput should grow with the
+worker count up to the number of cores (os.cpu_count() is printed).
+
+Usage: python benchmarks/bench_parse_pool.py [--books N] [--workers N] [--parse-workers 0,1,2,4]
+                                             [--extractor NAME] [stand-in options, see standin_server.py]
+Example: python benchmarks/bench_parse_pool.py --books 400 --page-markup 200 --output parse.json
+"""
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import extractors  # noqa: E402
+import scraper_core  # noqa: E402
+from bench_offline import start_server  # noqa: E402
+from parse_pool import ParsePool  # noqa: E402
+from refresh_engine import RefreshEngine, create_session  # noqa: E402
+from standin_server import build_parser  # noqa: E402
+
+
+def timed(func):
+    """Runs func() and returns (result, wall seconds, CPU seconds of this process)."""
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started, time.process_time() - cpu_started
+
+
+def download(urls, workers):
+    """Raw bodies of the given pages, fetched once so the parse phase needs no network."""
+    def fetch(url):
+        response = session.get(url, timeout=10)
+        response.raise_for_status()
+        return response.content
+
+    session = create_session(pool_size=workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(fetch, urls))
+    finally:
+        session.close()
+
+
+def bench_parse(contents, parse_workers, threads):
+    """Parses every page; with a pool, `threads` callers keep all its processes busy."""
+    if not parse_workers:
+        extractor = extractors.get_extractor()
+        return timed(lambda: [extractor.extract_product(content) for content in contents])
+    with ParsePool(parse_workers) as pool:
+        pool.warm_up() # Process start-up is not part of the throughput
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return timed(lambda: list(executor.map(pool.product_fields, contents)))
+
+
+def bench_refresh(books, parse_workers, workers):
+    pool = ParsePool(parse_workers) if parse_workers else None
+    try:
+        if pool is not None:
+            pool.warm_up()
+        engine = RefreshEngine(workers=workers, update_func=functools.partial(scraper_core.update_book_info,
+                                                                              parse_pool=pool))
+        return timed(lambda: engine.run(books))
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def row(name, parse_workers, pages, seconds, cpu, baseline):
+    return {'phase': name, 'parse_workers': parse_workers, 'pages': pages, 'seconds': round(seconds, 3),
+            'pages_per_s': round(pages / seconds, 1), 'speedup': round(baseline / seconds, 2) if baseline else 1.0,
+            'cpu_ms_per_page': round(cpu * 1000 / pages, 3)}
+
+
+def main():
+    parser = build_parser()
+    parser.description = __doc__
+    parser.set_defaults(page_markup=100)
+    parser.add_argument("--books", type=int, default=200, help="Product pages parsed and refreshed.")
+    parser.add_argument("--workers", type=int, default=16, help="Fetch threads of the refresh phase.")
+    parser.add_argument("--parse-workers", default=None,
+                        help="Comma-separated parser process counts (default: 0 and powers of two up to the cores).")
+    parser.add_argument("--extractor", default="bs4",
+                        help="HTML extractor backend: auto, bs4, lxml, selectolax or regex (default: bs4).")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.parse_workers:
+        counts = [int(count) for count in args.parse_workers.split(",")]
+    else:
+        counts = [0] + [2 ** power for power in range(cores.bit_length()) if 2 ** power <= cores]
+        if cores not in counts:
+            counts.append(cores)
+
+    extractors.EXTRACTOR_BACKEND = args.extractor # Inherited by the pool's processes
+    process, base_url = start_server(args)
+    scraper_core.SITE_ROOT = base_url
+    urls = [f"{base_url}/lt/knygos/standin-{i}/" for i in range(args.books)]
+    books = [{'title': f"Stand-in Book {i}", 'url': url, 'product_id': str(i), 'price': 'N/A', 'price_history': []}
+             for i, url in enumerate(urls)]
+
+    results = []
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w') # Silence the per-page progress messages
+    try:
+        contents = download(urls, args.workers)
+        for name in ("parse", "refresh"):
+            baseline = None
+            for parse_workers in counts:
+                if name == "parse":
+                    _, seconds, cpu = bench_parse(contents, parse_workers, threads=max(2, parse_workers * 2))
+                else:
+                    refreshed, seconds, cpu = bench_refresh(books, parse_workers, args.workers)
+                    failed = sum(1 for book_data in refreshed if book_data.get('error'))
+                    if failed:
+                        raise RuntimeError(f"{failed} refresh(es) failed with {parse_workers} parse worker(s)")
+                results.append(row(name, parse_workers, len(contents), seconds, cpu, baseline))
+                baseline = baseline or seconds
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        process.terminate()
+        process.wait()
+
+    print(f"{len(contents)} pages of {sum(map(len, contents)) // len(contents)} bytes, "
+          f"extractor {extractors.get_extractor().name}, {cores} core(s)")
+    print(f"{'phase':<10}{'parse workers':>15}{'pages/s':>10}{'speed-up':>10}{'cpu ms/page':>13}")
+    for result in results:
+        print(f"{result['phase']:<10}{result['parse_workers']:>15}{result['pages_per_s']:>10}"
+              f"{result['speedup']:>10}{result['cpu_ms_per_page']:>13}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': {'books': args.books, 'workers': args.workers, 'page_markup': args.page_markup,
+                                  'extractor': extractors.get_extractor().name, 'cores': cores},
+                       'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares the JSON list representation of price_history with PriceSeries.
+
+Generates a synthetic watchlist (default: 10,000 books with three years of
+daily checks) one book at a time, so the benchmark itself stays small in
+memory, and reports for both representations:
+  * memory held by the history of the whole watchlist
+  * time to load it (json.loads of the lists vs. PriceSeries.from_bytes)
+
+Usage: python benchmarks/bench_price_series.py [--books N] [--days N] [--seed N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_series import PriceSeries  # noqa: E402
+
+
+def synthetic_history(rng, days, start=date(2022, 1, 1)):
+    """Daily observations with occasional price changes, like a real book."""
+    cents = rng.randint(299, 2999)
+    history = []
+    day = start
+    for _ in range(days):
+        if rng.random() < 0.03: # A price change roughly once a month
+            cents = max(99, cents + rng.choice((-1, 1)) * rng.randint(10, 300))
+        history.append([day.isoformat(), f"{cents / 100:.2f}"])
+        day += timedelta(days=1)
+    return history
+
+
+def deep_size_of_history(history):
+    """Bytes held by a [[date_str, price_str], ...] list (container + entries + strings)."""
+    size = sys.getsizeof(history)
+    for entry in history:
+        size += sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+    return size
+
+
+def deep_size_of_series(series):
+    return (sys.getsizeof(series) + sys.getsizeof(series.days)
+            + sys.getsizeof(series.run_starts) + sys.getsizeof(series.run_cents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    list_bytes = series_bytes = 0
+    json_bytes = binary_bytes = 0
+    json_load_s = binary_load_s = convert_s = 0.0
+    observations = runs = 0
+
+    for _ in range(args.books):
+        history = synthetic_history(rng, args.days)
+        json_text = json.dumps(history)
+        series = PriceSeries.from_history(history)
+        binary = series.to_bytes()
+
+        start = time.perf_counter()
+        loaded_history = json.loads(json_text)
+        json_load_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded_series = PriceSeries.from_bytes(binary)
+        binary_load_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        converted = PriceSeries.from_history(loaded_history)
+        convert_s += time.perf_counter() - start
+
+        assert converted == loaded_series and loaded_series.to_history() == history # Lossless round trip
+
+        list_bytes += deep_size_of_history(loaded_history)
+        series_bytes += deep_size_of_series(loaded_series)
+        json_bytes += len(json_text.encode('utf-8'))
+        binary_bytes += len(binary)
+        observations += len(series)
+        runs += len(series.run_cents)
+
+    mb = 1024 * 1024
+    print(f"Books: {args.books}, observations: {observations:,}, price runs: {runs:,}")
+    print(f"{'':24}{'JSON lists':>14}{'PriceSeries':>14}{'ratio':>8}")
+    print(f"{'In-memory size (MB)':24}{list_bytes / mb:14.1f}{series_bytes / mb:14.1f}{list_bytes / series_bytes:8.1f}x")
+    print(f"{'On-disk size (MB)':24}{json_bytes / mb:14.1f}{binary_bytes / mb:14.1f}{json_bytes / binary_bytes:8.1f}x")
+    print(f"{'Load time (s)':24}{json_load_s:14.2f}{binary_load_s:14.2f}{json_load_s / binary_load_s:8.1f}x")
+    print(f"Converting the loaded JSON lists to PriceSeries took {convert_s:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Refreshes a synthetic watchlist against the fault-injecting stand-in server,
+with and without the FetchPolicy (retries, adaptive concurrency, circuit
+breaker), and compares how many books end up with a fresh price.
+
+Usage: python benchmarks/bench_resilience.py [--books N] [--workers N]
+                                             [stand-in fault options, see standin_server.py]
+Example: python benchmarks/bench_resilience.py --error-rate 0.2 --rate-limit 30 --latency 0.05
+"""
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fetch_policy import FetchPolicy  # noqa: E402
+from refresh_engine import RefreshEngine  # noqa: E402
+from scraper_core import update_book_info  # noqa: E402
+from standin_server import StandinServer, build_parser, faults_from_args  # noqa: E402
+
+
+def run(server, books, workers, policy):
+    update_func = functools.partial(update_book_info, policy=policy) if policy is not None else update_book_info
+    requests_before = server.requests
+    started = time.perf_counter()
+    results = RefreshEngine(workers=workers, update_func=update_func).run(books)
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for book_data in results if not book_data.get('error'))
+    return {'ok': ok, 'failed': len(results) - ok, 'requests': server.requests - requests_before,
+            'seconds': round(elapsed, 2)}
+
+
+def main():
+    parser = build_parser()
+    parser.description = __doc__
+    parser.add_argument("--books", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with StandinServer(faults_from_args(args), port=0) as server:
+        books = [{'title': f"Stand-in Book {i}", 'url': server.product_url(i), 'product_id': str(i),
+                  'price': 'N/A', 'price_history': []} for i in range(args.books)]
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w') # Silence the per-book progress messages
+        try:
+            plain = run(server, books, args.workers, None)
+            policy = FetchPolicy(max_concurrency=args.workers)
+            resilient = run(server, books, args.workers, policy)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    print(f"{args.books} books, up to {args.workers} workers, server answers: {server.statuses}")
+    print(f"  without policy: {plain}")
+    print(f"  with policy:    {resilient}")
+    print(f"  policy:         {policy.summary()}")
+
+
+if __name__ == "__main__":
+    main()
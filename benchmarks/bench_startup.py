@@ -0,0 +1,127 @@
+"""
+Measures GUI startup time, so slow imports creeping back in get noticed.
+
+Each run starts a fresh interpreter (imports are cached per process) and
+records, from the start of `import book_scraper`:
+  * import_s          time to import the GUI module
+  * window_s          time until the empty window has been drawn
+  * cached_display_s  time until a saved watchlist is shown with its last
+                      known prices (no network access, the refresh is not started)
+  * all_rows_s        time until every row of the watchlist has been inserted
+
+The window steps are skipped when no display is available. The run fails if
+matplotlib or an HTML parser library was imported during startup, or if the
+median import time exceeds --max-import-ms.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--books N] [--max-import-ms MS]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported once they are actually needed
+HEAVY_MODULES = ("matplotlib", "numpy", "bs4", "lxml", "selectolax", "aiohttp", "pyarrow")
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import book_scraper
+result = {"import_s": time.perf_counter() - t0}
+watchlist = sys.argv[1]
+book_scraper.STORAGE_BACKEND = "json"
+if watchlist:
+    book_scraper.INTERESTED_BOOKS_FULL_PATH = watchlist
+try:
+    root = book_scraper.tk.Tk()
+except book_scraper.tk.TclError as e: # No display
+    result["window_error"] = str(e)
+else:
+    app = book_scraper.BookScraperApp(root, auto_load=False)
+    root.update()
+    result["window_s"] = time.perf_counter() - t0
+    if watchlist:
+        app.show_saved_interested()
+        root.update()
+        result["cached_display_s"] = time.perf_counter() - t0
+        while len(app.interested_tree.get_children()) < len(app.interested_books_by_id):
+            root.update() # Large lists are inserted in chunks between idle callbacks
+        result["all_rows_s"] = time.perf_counter() - t0
+        result["rows"] = len(app.interested_tree.get_children())
+    root.destroy()
+result["heavy_modules"] = sorted(name for name in sys.argv[2].split(",") if name in sys.modules)
+print(json.dumps(result))
+"""
+
+
+def write_watchlist(path, books, seed=1):
+    """Writes a synthetic interested_books.json with a short history per book."""
+    rng = random.Random(seed)
+    watchlist = []
+    for i in range(books):
+        price = f"{rng.randint(299, 2999) / 100:.2f}"
+        title = f"Synthetic Book {i}"
+        watchlist.append({
+            'title': title,
+            'url': f"https://www.knygos.lt/lt/knygos/synthetic-{i}/",
+            'price': price,
+            'product_id': str(100000 + i),
+            'display_text': f"{title} ({price} EUR)",
+            'price_history': [[f"2025-01-{day:02d}", price] for day in range(1, 11)],
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(watchlist, f, ensure_ascii=False)
+
+
+def run_once(watchlist_path):
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD, watchlist_path or "", ",".join(HEAVY_MODULES)],
+        cwd=REPO_DIR, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup run failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--books", type=int, default=2000, help="Synthetic watchlist size (0 = no watchlist).")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Fail if the median import time is above this.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        watchlist_path = None
+        if args.books:
+            watchlist_path = os.path.join(tmp_dir, "interested_books.json")
+            write_watchlist(watchlist_path, args.books)
+        results = [run_once(watchlist_path) for _ in range(args.runs)]
+
+    print(f"Startup over {args.runs} fresh interpreter(s), {args.books} saved book(s):")
+    for phase in ("import_s", "window_s", "cached_display_s", "all_rows_s"):
+        values = [result[phase] for result in results if phase in result]
+        if values:
+            print(f"  {phase:<17} median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms")
+    if "window_error" in results[0]:
+        print(f"  (window not measured: {results[0]['window_error']})")
+
+    failed = False
+    heavy = sorted({name for result in results for name in result["heavy_modules"]})
+    if heavy:
+        print(f"FAIL: imported during startup: {', '.join(heavy)}")
+        failed = True
+    median_import_ms = statistics.median(result["import_s"] for result in results) * 1000
+    if args.max_import_ms is not None and median_import_ms > args.max_import_ms:
+        print(f"FAIL: median import {median_import_ms:.1f} ms > {args.max_import_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Local stand-in for knygos.lt, with fault injection.
+
+Serves synthetic pages in the markup the extractors expect:
+  * product pages at /lt/knygos/standin-<id>/ (meta[itemprop="price"],
+    data-cta-product-id, og:title)
+  * search results at /lt/paieska?q=...&page=N (products-holder-wrapper /
+    product-list-item), --search-results books per query, --search-page-size
+    per page, and an empty results page after the last one
+
+It can also misbehave on purpose:
+  * --latency S        delay before every response
+  * --error-rate P     fraction of requests answered with 503 + Retry-After
+  * --rate-limit N     more than N requests in one second get 429 + Retry-After
+  * --hang-rate P      fraction of requests that stall for --hang-seconds
+  * --down-after N     after N requests the host goes down (connections are
+    --down-for S       dropped without a response) for S seconds
+
+Usage: python benchmarks/standin_server.py [--port 8765] [options]
+Import StandinServer to run it inside a benchmark (port 0 picks a free port).
+"""
+import argparse
+import html
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PRODUCT_PATH = "/lt/knygos/standin-"
+SEARCH_PATH = "/lt/paieska"
+
+
+class Faults:
+    """Fault injection settings; every fault is off by default."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=503, retry_after=1, rate_limit=0,
+                 hang_rate=0.0, hang_seconds=15.0, down_after=0, down_for=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.down_after = down_after
+        self.down_for = down_for
+
+
+def product_price(product_id):
+    """Deterministic price of a stand-in product, e.g. '12.34'."""
+    return f"{(product_id * 37 % 2700 + 299) / 100:.2f}"
+
+
+def product_page(product_id, padding=0, markup=0):
+    title = f"Stand-in Book {product_id}"
+    price = product_price(product_id)
+    filler = "<p>" + "Lorem ipsum dolor sit amet. " * (padding // 28) + "</p>" if padding else ""
+    # Tag-heavy blocks like the reviews and recommendations of a real product page
+    filler += "".join(f'<div class="review" data-id="{i}"><span class="author">Reader {i}</span>'
+                      f'<ul class="stars"><li class="on"></li><li class="on"></li><li></li></ul>'
+                      f'<p>Review <b>{i}</b> of <a href="/lt/knygos/standin-{i}/">a book</a>.</p></div>'
+                      for i in range(markup))
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+            f'<meta property="og:title" content="{title}"></head><body>'
+            f'<h1>{title}</h1><div class="product-price"><meta itemprop="price" content="{price}">'
+            f'<span class="price">{price.replace(".", ",")} &euro;</span></div>'
+            f'<button data-cta-product-id="{product_id}">Add to cart</button>{filler}</body></html>').encode('utf-8')
+
+
+def search_product_ids(query, total):
+    """Deterministic product ids returned for a query."""
+    base = zlib.crc32(query.encode('utf-8')) % 100000 * 1000
+    return range(base, base + total)
+
+
+def search_page(query, page, total, page_size):
+    ids = list(search_product_ids(query, total))[(page - 1) * page_size:page * page_size]
+    items = "".join(
+        f'<div class="product-list-item"><div class="book-properties"><h2>'
+        f'<a href="{PRODUCT_PATH}{product_id}/" data-cta-price="{product_price(product_id)}" '
+        f'data-cta-product-id="{product_id}">Stand-in Book {product_id}</a></h2></div>'
+        f'<div class="price">{product_price(product_id).replace(".", ",")} &euro;</div></div>'
+        for product_id in ids)
+    return (f'<!DOCTYPE html><html lang="lt"><head><meta charset="utf-8">'
+            f'<title>Paieška: {html.escape(query)}</title></head><body>'
+            f'<div class="products-holder-wrapper">{items}</div></body></html>').encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real site
+
+    def log_message(self, format, *args): # Quiet by default
+        pass
+
+    def do_GET(self):
+        standin = self.server.standin
+        action, status, body, headers = standin.respond(self.path)
+        if action == 'drop':
+            self.close_connection = True
+            return # No response at all: the client sees a dropped connection
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandinServer:
+    """Threaded local HTTP server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, faults=None, host="127.0.0.1", port=0, page_padding=0, seed=1,
+                 search_results=60, search_page_size=20, page_markup=0):
+        self.faults = faults or Faults()
+        self.page_padding = page_padding
+        self.page_markup = page_markup
+        self.search_results = search_results
+        self.search_page_size = search_page_size
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.statuses = {}
+        self._second = None
+        self._second_count = 0
+        self._down_until = None
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def product_url(self, product_id):
+        return f"{self.url}{PRODUCT_PATH}{product_id}/"
+
+    @property
+    def search_base_url(self):
+        """Value for scraper_core.BASE_SEARCH_URL."""
+        return f"{self.url}{SEARCH_PATH}?q="
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """Serves on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _count(self, status):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def respond(self, path):
+        """
+        Decides how to answer one request.
+
+        Returns:
+            tuple: (action, status, body, headers) where action is 'send' or 'drop'.
+        """
+        faults = self.faults
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            count = self.requests
+            if faults.down_after and count == faults.down_after + 1 and self._down_until is None:
+                self._down_until = now + faults.down_for
+            if self._down_until is not None and now < self._down_until:
+                self._count('dropped')
+                return 'drop', None, b'', {}
+            second = int(now)
+            if second != self._second:
+                self._second, self._second_count = second, 0
+            self._second_count += 1
+            rate_limited = faults.rate_limit and self._second_count > faults.rate_limit
+            roll_error = self.rng.random() < faults.error_rate
+            roll_hang = self.rng.random() < faults.hang_rate
+
+        if faults.latency:
+            time.sleep(faults.latency)
+        if roll_hang:
+            time.sleep(faults.hang_seconds)
+        if rate_limited or roll_error:
+            status = 429 if rate_limited else faults.error_status
+            with self._lock:
+                self._count(status)
+            return 'send', status, b'Try again later', {"Retry-After": str(faults.retry_after),
+                                                         "Content-Type": "text/plain"}
+
+        status, body = 404, b'Not found'
+        parts = urllib.parse.urlsplit(path)
+        if parts.path.startswith(PRODUCT_PATH):
+            try:
+                product_id = int(parts.path[len(PRODUCT_PATH):].strip('/'))
+                status, body = 200, product_page(product_id, self.page_padding, self.page_markup)
+            except ValueError:
+                pass
+        elif parts.path == SEARCH_PATH:
+            params = urllib.parse.parse_qs(parts.query)
+            try:
+                page = max(1, int(params.get('page', ['1'])[0]))
+            except ValueError:
+                page = 1
+            status, body = 200, search_page(params.get('q', [''])[0], page, self.search_results, self.search_page_size)
+        with self._lock:
+            self._count(status)
+        return 'send', status, body, {"Content-Type": "text/html; charset=utf-8"}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=15.0)
+    parser.add_argument("--down-after", type=int, default=0)
+    parser.add_argument("--down-for", type=float, default=0.0)
+    parser.add_argument("--page-padding", type=int, default=0, help="Extra bytes of filler text per product page.")
+    parser.add_argument("--page-markup", type=int, default=0,
+                        help="Extra tag-heavy review blocks per product page (parsing cost).")
+    parser.add_argument("--search-results", type=int, default=60, help="Books found per search query.")
+    parser.add_argument("--search-page-size", type=int, default=20, help="Books per search results page.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the injected faults.")
+    return parser
+
+
+def faults_from_args(args):
+    return Faults(latency=args.latency, error_rate=args.error_rate, error_status=args.error_status,
+                  retry_after=args.retry_after, rate_limit=args.rate_limit, hang_rate=args.hang_rate,
+                  hang_seconds=args.hang_seconds, down_after=args.down_after, down_for=args.down_for)
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    server = StandinServer(faults_from_args(args), host=args.host, port=args.port, page_padding=args.page_padding,
+                           seed=args.seed, search_results=args.search_results, search_page_size=args.search_page_size,
+                           page_markup=args.page_markup)
+    print(f"Serving stand-in knygos.lt at {server.url}", flush=True) # Last word is read by bench_offline.py
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.requests} request(s): {server.statuses}")
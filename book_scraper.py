@@ -1,270 +1,108 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import threading
 import queue
 import json
 import os # Needed to check file existence and get script path
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import functools
+import time
+from collections import deque
 from datetime import datetime # Use datetime for date handling
 
-# --- Configuration ---
-BASE_SEARCH_URL = "https://www.knygos.lt/lt/paieska?q="
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
-# --- Fixed filename for auto-load/save ---
-INTERESTED_BOOKS_FILE = "interested_books.json" # Relative filename
-
-# --- Calculate Absolute Path to the JSON File ---
-# Get the directory where the script itself is located
-try:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-except NameError: # Handle cases where __file__ might not be defined (e.g., interactive interpreter)
-    SCRIPT_DIR = os.getcwd() # Fallback to current working directory
-
-# Combine the script directory with the filename
-INTERESTED_BOOKS_FULL_PATH = os.path.join(SCRIPT_DIR, INTERESTED_BOOKS_FILE)
-# --- ---
-
-
-# --- Scraper for Search Results ---
-def scrape_knygos_lt(query):
-    """
-    Scrapes knygos.lt search results for a given query.
-
-    Args:
-        query (str): The search term.
-
-    Returns:
-        list: A list of dictionaries with book info (title, price, url, product_id).
-              Returns an empty list on error or if nothing found.
-        str: An error message string, or None if successful.
-    """
-    books_found = []
-    error_message = None
-    try:
-        encoded_query = urllib.parse.quote_plus(query)
-        search_url = BASE_SEARCH_URL + encoded_query
-        print(f"Fetching Search URL: {search_url}") # Keep console log for debugging
-
-        response = requests.get(search_url, headers=HEADERS, timeout=15) # Increased timeout
-        response.raise_for_status()
-        print("Successfully fetched search page.")
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # --- Find the main container for products ---
-        product_wrapper = soup.find('div', class_='products-holder-wrapper')
-
-        if not product_wrapper:
-            print("Could not find 'products-holder-wrapper'. Searching whole page.")
-            # Fallback or alternative selectors might be needed here
-            product_wrapper = soup # Search whole document as fallback
-
-        # --- Find individual book items *within* the wrapper (or fallback soup) ---
-        book_containers = product_wrapper.find_all('div', class_='product-list-item') # Adjust class if needed
-        # If the primary selector fails, try another common one
-        if not book_containers:
-             book_containers = product_wrapper.find_all('div', class_='col-product')
-
-        print(f"Found {len(book_containers)} potential book container(s) in search results.")
-
-        if not book_containers and product_wrapper == soup : # Only report error if not found anywhere
-             error_message = "No book containers found using known selectors in search results."
-
-
-        for container in book_containers:
-            book_data = {}
-            title_link_tag = container.select_one('div.book-properties h2 a')
-
-            if title_link_tag:
-                book_data['title'] = title_link_tag.get_text(strip=True)
-                relative_url = title_link_tag.get('href')
-                if relative_url:
-                    book_data['url'] = urllib.parse.urljoin('https://www.knygos.lt', relative_url)
-                else:
-                    book_data['url'] = None # Handle cases where URL might be missing
-                book_data['price'] = title_link_tag.get('data-cta-price', 'N/A') # Default to N/A
-                book_data['product_id'] = title_link_tag.get('data-cta-product-id', 'N/A') # Default to N/A
-
-                # Simple representation for display
-                book_data['display_text'] = f"{book_data['title']} ({book_data['price']} EUR)"
-
-                if book_data.get('title') and book_data.get('url'): # Ensure we have title and URL
-                    books_found.append(book_data)
-            # else: # Optional: print if a container didn't yield data
-            #     print("Container found, but title/link tag missing inside.")
-
-
-    except requests.exceptions.Timeout:
-        error_message = f"Search request timed out after 15 seconds."
-        print(error_message)
-    except requests.exceptions.RequestException as e:
-        error_message = f"Search network error: {e}"
-        print(error_message)
-    except Exception as e:
-        error_message = f"Search scraping error: {e}"
-        print(error_message) # Log the full error
-
-    # Return both results and error status
-    return books_found, error_message
-
-
-# --- Scraper for Individual Book Page & Price History Update ---
-def update_book_info(book_data):
-    """
-    Fetches the individual book page, tries to update its price,
-    and records price history.
-
-    Args:
-        book_data (dict): Dictionary containing at least 'url' and 'title'.
-                          Should also contain 'price_history' list (or it will be created).
-
-    Returns:
-        dict: Updated book_data with new price, display_text, and potentially
-              updated price_history. Includes 'error' key if update failed.
-    """
-    # Ensure book_data is a dictionary (safety check)
-    if not isinstance(book_data, dict):
-        print(f"Error: Received invalid book_data type: {type(book_data)}")
-        return {'error': 'Invalid data format', 'title':'Unknown', 'price':'Error', 'url':'N/A', 'product_id':'N/A', 'price_history':[]}
-
-
-    # Initialize price_history if it doesn't exist or is not a list
-    if 'price_history' not in book_data or not isinstance(book_data.get('price_history'), list):
-         book_data['price_history'] = []
-
-    # Use a stable identifier for messages
-    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
-
-    if not book_data.get('url'):
-        book_data['error'] = "Missing URL"
-        book_data['price'] = 'Error'
-        book_data['display_text'] = f"{book_identifier} (Update Error: No URL)"
-        return book_data
-
-    try:
-        print(f"Updating book: {str(book_identifier)[:50]}... URL: {book_data['url']}")
-        response = requests.get(book_data['url'], headers=HEADERS, timeout=10)
-        response.raise_for_status() # Check for 4xx/5xx errors
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # --- !!! CRITICAL: SELECTOR FOR PRICE ON PRODUCT PAGE !!! ---
-        # This is a GUESS. You MUST inspect the HTML source of a real
-        # knygos.lt book page to find the correct selector for the price.
-        price_element = soup.select_one('div.product-price span.price, meta[itemprop="price"], span[itemprop="price"]') # Example selector - ADJUST!
-
-        # --- Price History Recording Logic ---
-        current_date_str = datetime.today().strftime('%Y-%m-%d') # Get current date as YYYY-MM-DD
-        new_price = None
-        price_updated = False
-
-        if price_element:
-            temp_price = 'N/A'
-            if price_element.name == 'meta':
-                temp_price = price_element.get('content', 'N/A').strip()
-            else:
-                # Extract text, remove currency symbols, use dot as decimal separator
-                temp_price = price_element.get_text(strip=True).replace('€', '').replace(',', '.').strip()
-
-            # Validate and store the numeric price
-            try:
-                numeric_price = float(temp_price)
-                new_price = f"{numeric_price:.2f}" # Store price with consistent formatting (2 decimal places)
-                price_updated = True
-                print(f"  -> Found price: {new_price}")
-            except (ValueError, TypeError):
-                 print(f"  -> Found price element but content is not a valid number: '{temp_price}'")
-                 book_data['price'] = 'Parse Error'
-                 book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Price Format)"
-                 book_data.setdefault('error', "Price format error") # Use setdefault
-
-        else:
-            # Price element not found
-            print("  -> Price element not found on page.")
-            book_data['price'] = 'Not Found' # More specific than 'N/A'
-            book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Price Missing)"
-            book_data.setdefault('error', "Price element not found") # Use setdefault
-
-        # Record price if successfully updated
-        if price_updated and new_price is not None:
-             book_data['price'] = new_price # Update the main price field
-             # Ensure title exists before creating display text
-             book_title_for_display = book_data.get('title', 'Unknown Title')
-             book_data['display_text'] = f"{book_title_for_display} ({book_data['price']} EUR)"
-
-             # Check if history is empty or if date/price differs from the last entry
-             last_entry = book_data['price_history'][-1] if book_data['price_history'] else None
-             # Compare date string and price string
-             if not last_entry or last_entry[0] != current_date_str or last_entry[1] != new_price:
-                  print(f"  -> Recording price {new_price} for date {current_date_str}")
-                  book_data['price_history'].append([current_date_str, new_price])
-             else:
-                  print(f"  -> Price {new_price} already recorded for today {current_date_str}")
-             # Remove potential 'error' key if price was successfully updated now
-             book_data.pop('error', None)
-
-    except requests.exceptions.HTTPError as e:
-         error_msg = f"HTTP Error {e.response.status_code}"
-         price_status = f'HTTP {e.response.status_code}'
-         if e.response.status_code == 404:
-            error_msg = "Page not found (404)"
-            price_status = 'Not Found (404)'
-         print(f"  -> Update failed: {error_msg} for {book_identifier}")
-         book_data['price'] = price_status
-         book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} ({price_status})"
-         book_data['error'] = error_msg # Store the error status
-    except requests.exceptions.Timeout:
-        error_msg = "Timeout"
-        print(f"  -> Update timed out for {book_identifier}")
-        book_data['price'] = 'Timeout'
-        book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Timeout)"
-        book_data['error'] = error_msg
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Network Error: {e}"
-        print(f"  -> Update failed: {error_msg} for {book_identifier}")
-        book_data['price'] = 'Network Error'
-        book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Network)"
-        book_data['error'] = error_msg
-    except Exception as e:
-        error_msg = f"Unknown update error: {e}"
-        print(f"  -> Update failed: {error_msg} for {book_identifier}")
-        book_data['price'] = 'Update Error'
-        book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Unknown)"
-        book_data['error'] = error_msg
-
-    # Ensure essential keys exist even on error
-    book_data.setdefault('title', 'Unknown Title')
-    book_data.setdefault('price', 'Error')
-    book_data.setdefault('url', 'N/A')
-    book_data.setdefault('product_id', 'N/A')
-    book_data.setdefault('display_text', f"{book_data['title']} ({book_data['price']})") # Ensure display text reflects current status
-
-    return book_data
+from scraper_core import (
+    INTERESTED_BOOKS_FILE, INTERESTED_BOOKS_FULL_PATH, SCRIPT_DIR,
+    SEARCH_MAX_PAGES, book_key, update_book_info, write_books_json,
+)
+from refresh_engine import RefreshEngine, DEFAULT_WORKERS
+from bulk_refresh import BulkRefresher
+from fetch_policy import FetchPolicy
+from parse_pool import ParsePool, default_parse_workers
+from http_cache import HttpCache
+from search_cache import SearchCache, cached_search_pages
+from sqlite_store import SQLiteStore, WATCHLIST_DB_FILE
+from price_journal import PriceJournal
+from price_analytics import ANALYTICS_METRICS, PriceAnalytics, analytics_sort_value, format_metric
+from price_chart import PriceChart, CHART_MAX_SERIES
+from watch_rules import WatchRules, AlertLog, ALERT_LOG_FILE
+from watchlist_export import EXPORT_FORMATS, export_books, history_path_for, iter_import
+from refresh_scheduler import RefreshScheduler
+from streaming_fetch import stream_stats
+from metrics import request_metrics
+from profiling import create_profiler
+
+REFRESH_WORKERS = DEFAULT_WORKERS # Maximum concurrent price refreshes (the adaptive limit starts lower)
+SEARCH_RESULT_LIMIT = 0 # Default "Max results" for a search (0 = no limit besides pages)
+STORAGE_BACKEND = "json" # "json", "sqlite" (interested_books.db) or "journal" (snapshot + append-only journal)
+REFRESH_BACKEND = "threads" # "threads" (RefreshEngine) or "asyncio" (AsyncRefreshEngine, needs aiohttp)
+BULK_REFRESH = True # Threads backend: read prices from shared search listing pages first (see bulk_refresh.py)
+PARSE_WORKERS = default_parse_workers() # Processes parsing fetched pages (0 = parse on the fetch threads; see parse_pool.py)
+INTERESTED_COLUMNS = ( # (column id, heading, width)
+    ('title', "Title", 220),
+    ('price', "Price", 70),
+    ('last_change', "Last Change", 90),
+    ('status', "Status", 70),
+) + tuple((name, label, 75) for name, label in ANALYTICS_METRICS) # Filled in by the background analytics
+ROW_INSERT_CHUNK = 2000 # Rows added per idle callback when (re)building a large interested list
+UPDATE_POLL_MS = 16 # Refresh results are applied at most once per frame (~60 Hz)
+UPDATE_BATCH_SIZE = 200 # Max refresh events handled per frame, so the UI thread never stalls
+SLOW_FETCH_SECONDS = 5 # Rows whose fetch takes longer than this are marked as slow
+SCHEDULED_REFRESH = True # On startup only refresh books that are likely stale (see refresh_scheduler.py)
+METRICS_FILE = "refresh_metrics.json" # Per-request metrics of the last refresh, next to the script (None = don't write)
+PROFILE_MODE = None # "sampling" or "cprofile" profiles each refresh and search into profiles/ (see profiling.py)
+ANALYTICS_DELAY_MS = 300 # Analytics (needs numpy) start this long after the list is shown or refreshed
 
 
 # --- Tkinter GUI Application ---
 class BookScraperApp:
-    def __init__(self, root):
+    def __init__(self, root, auto_load=True):
         self.root = root
         self.root.title("Knygos.lt Scraper")
-        self.root.geometry("850x650") # Slightly wider
+        self.root.geometry("1400x650") # Wide enough for the interested columns
 
         self.search_results = [] # Holds results from the latest search
+        self.search_error = None # Error message of the latest search, if any
         # Use product_id or URL as the key for stability during updates
         self.interested_books_by_id = {} # {product_id_or_url: book_data_dict}
                                         # book_data_dict includes 'price_history' list
+                                        # The same key is the row id in the interested tree
+        self.pending_rows = deque() # Keys still to be inserted while a large list is being shown
+        self.sort_column = 'title'
+        self.sort_reverse = False
 
         self.search_queue = queue.Queue()
         self.update_queue = queue.Queue() # Queue for refresh results
 
         self.update_tasks_total = 0
         self.update_tasks_done = 0
+        self.refresh_error = None # Why the running refresh stopped early, if it did
+        self.refreshing = {} # {key: [start time, status shown]} for fetches in progress
+        self.scheduler = RefreshScheduler()
+        self.profiler = None # Profiler of the running search or refresh when PROFILE_MODE is set
+        self.price_analytics = PriceAnalytics() # Keeps each book's PriceSeries between runs
+        self.analytics = {} # {key: {metric: value}} from the last analytics run
+        self.analytics_queue = queue.Queue()
+        self.analytics_state = None # None, 'scheduled', 'running' or 'rerun' (changed while running)
+        self.analytics_columns = {name for name, _ in ANALYTICS_METRICS}
+        self.chart = None # Embedded PriceChart, created on the first "Show Price History"
+        self.chart_visible = False
+        self.chart_update_pending = False
+        try:
+            self.watch = WatchRules.load() # Global/per-book alert rules + their running state
+        except (OSError, ValueError) as e:
+            print(f"Could not load the watch rules, using the defaults: {e}")
+            self.watch = WatchRules()
+        self.alert_log = AlertLog()
+        self.alerts = {} # {key: message of the last alert} for rows highlighted in this session
+        self.run_alert_count = 0 # Alerts triggered by the running refresh
+
+        self.http_cache = HttpCache() # Validators + extracted prices from previous runs
+        self.search_cache = SearchCache() # Recent searches (memory LRU + on-disk tier)
+        self.parse_pool = ParsePool(PARSE_WORKERS) if PARSE_WORKERS > 0 else None # Processes start on the first fetch
+        # With the SQLite backend every change is written through immediately
+        self.store = SQLiteStore() if STORAGE_BACKEND == "sqlite" else None
+        self.journal = PriceJournal() if STORAGE_BACKEND == "journal" else None
+        if self.journal is not None:
+            self.journal.start_background_compaction()
 
 
         # Styling
@@ -293,12 +131,20 @@ class BookScraperApp:
         self.search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.search_button = ttk.Button(top_frame, text="Search", command=self.start_search)
         self.search_button.pack(side=tk.LEFT, padx=5)
+        ttk.Label(top_frame, text="Pages:").pack(side=tk.LEFT, padx=(10, 2))
+        self.search_pages_var = tk.IntVar(value=SEARCH_MAX_PAGES)
+        ttk.Spinbox(top_frame, from_=1, to=50, width=4, textvariable=self.search_pages_var).pack(side=tk.LEFT)
+        ttk.Label(top_frame, text="Max results:").pack(side=tk.LEFT, padx=(10, 2))
+        self.search_limit_var = tk.IntVar(value=SEARCH_RESULT_LIMIT)
+        ttk.Spinbox(top_frame, from_=0, to=5000, increment=10, width=6, textvariable=self.search_limit_var).pack(side=tk.LEFT) # 0 = no limit
 
         # --- Middle Frame: Results and Interested Lists ---
         # Configure columns for middle frame to allow resizing
         middle_frame.columnconfigure(0, weight=1) # Results frame column
         middle_frame.columnconfigure(1, weight=0) # Action frame column (fixed width)
         middle_frame.columnconfigure(2, weight=1) # Interested frame column
+        middle_frame.rowconfigure(0, weight=1) # Lists
+        middle_frame.rowconfigure(1, weight=1) # Price chart, when shown
 
         # Results List
         results_frame = ttk.LabelFrame(middle_frame, text="Search Results", padding="10")
@@ -331,29 +177,51 @@ class BookScraperApp:
         interested_frame.rowconfigure(0, weight=1) # Allow listbox to expand vertically
         interested_frame.columnconfigure(0, weight=1) # Allow listbox to expand horizontally
 
-        self.interested_listbox = tk.Listbox(interested_frame, width=50, height=20, selectmode=tk.SINGLE) # Change to SINGLE selection for history graph
-        self.interested_listbox.grid(row=0, column=0, sticky="nsew")
-        interested_scrollbar_y = ttk.Scrollbar(interested_frame, orient=tk.VERTICAL, command=self.interested_listbox.yview)
+        # Row ids are the book keys, so a selected row maps straight back to its book
+        self.interested_tree = ttk.Treeview(interested_frame, columns=[column for column, _, _ in INTERESTED_COLUMNS],
+                                            show='headings', height=20, selectmode='extended')
+        for column, heading, width in INTERESTED_COLUMNS:
+            self.interested_tree.heading(column, text=heading + (" \u25b2" if column == self.sort_column else ""),
+                                         command=functools.partial(self.sort_interested, column))
+            self.interested_tree.column(column, width=width, stretch=(column == 'title'),
+                                        anchor='w' if column == 'title' else 'center')
+        self.interested_tree.tag_configure('error', foreground='red')
+        self.interested_tree.tag_configure('refreshing', foreground='gray45')
+        self.interested_tree.tag_configure('slow', foreground='dark orange')
+        self.interested_tree.tag_configure('alert', background='#fff2a8') # A watch rule fired in this session
+        self.interested_tree.grid(row=0, column=0, sticky="nsew")
+        interested_scrollbar_y = ttk.Scrollbar(interested_frame, orient=tk.VERTICAL, command=self.interested_tree.yview)
         interested_scrollbar_y.grid(row=0, column=1, sticky="ns")
-        self.interested_listbox.config(yscrollcommand=interested_scrollbar_y.set)
-        self.interested_listbox.bind('<Double-1>', self.remove_selected_from_interested) # Double click still removes
+        self.interested_tree.config(yscrollcommand=interested_scrollbar_y.set)
+        self.interested_tree.bind('<Double-1>', self.remove_selected_from_interested) # Double click still removes
+        self.interested_tree.bind('<<TreeviewSelect>>', self.schedule_chart_update)
 
         # History Button (below interested list)
         self.history_button = ttk.Button(interested_frame, text="Show Price History", command=self.show_history_graph)
         self.history_button.grid(row=1, column=0, columnspan=2, pady=(10, 0), sticky="ew") # Place below listbox
 
+        # Price chart (below both lists); the matplotlib canvas inside is created on first use
+        self.chart_frame = ttk.LabelFrame(middle_frame, text="Price History", padding="5")
+
 
         # --- Bottom Frame: Save/Load Buttons & Status Label ---
         self.load_button = ttk.Button(bottom_frame, text="Load File...", command=self.prompt_load_interested) # Manual load
         self.load_button.pack(side=tk.LEFT, padx=5)
         self.save_button = ttk.Button(bottom_frame, text="Save Interested", command=self.save_interested)
         self.save_button.pack(side=tk.LEFT, padx=5)
+        self.purge_cache_button = ttk.Button(bottom_frame, text="Clear Cache", command=self.purge_http_cache)
+        self.purge_cache_button.pack(side=tk.LEFT, padx=5)
+        self.refresh_all_button = ttk.Button(bottom_frame, text="Refresh All", command=self.refresh_all_interested)
+        self.refresh_all_button.pack(side=tk.LEFT, padx=5)
+        self.alert_below_button = ttk.Button(bottom_frame, text="Alert Below...", command=self.prompt_alert_below)
+        self.alert_below_button.pack(side=tk.LEFT, padx=5)
 
         self.status_label = ttk.Label(bottom_frame, text="Initializing...", anchor='w') # Anchor left
         self.status_label.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
 
         # --- Initial Load & Refresh ---
-        self.root.after(100, self.load_and_update_interested) # Start auto-load after GUI is set up
+        if auto_load:
+            self.root.after(100, self.load_and_update_interested) # Start auto-load after GUI is set up
 
     # --- Search Handling ---
     def start_search(self):
@@ -361,49 +229,80 @@ class BookScraperApp:
         if not query:
             messagebox.showwarning("Input Error", "Please enter a search term.")
             return
+        try:
+            max_pages = max(1, int(self.search_pages_var.get()))
+            max_results = max(0, int(self.search_limit_var.get())) or None
+        except (tk.TclError, ValueError):
+            messagebox.showwarning("Input Error", "Pages and max results must be whole numbers.")
+            return
         self.status_label.config(text=f"Searching for '{query}'...")
         self.search_button.config(state=tk.DISABLED) # Disable button during search
         self.results_listbox.delete(0, tk.END) # Clear previous results
         self.search_results = [] # Clear internal results list
+        self.search_error = None
+        self.start_profile('search')
 
         # Start scraper in a new thread
-        self.search_thread = threading.Thread(target=self.run_search_thread, args=(query,), daemon=True)
+        self.search_thread = threading.Thread(target=self.run_search_thread, args=(query, max_pages, max_results), daemon=True)
         self.search_thread.start()
 
         # Schedule queue check
         self.root.after(100, self.check_search_queue)
 
-    def run_search_thread(self, query):
-        """Runs the search scraper and puts results in the queue."""
-        results, error = scrape_knygos_lt(query)
-        self.search_queue.put((results, error))
+    def run_search_thread(self, query, max_pages, max_results):
+        """Runs the paginated search and puts each page's batch in the queue."""
+        try:
+            for batch, error in cached_search_pages(self.search_cache, query, max_pages=max_pages, max_results=max_results,
+                                                    parse_pool=self.parse_pool):
+                self.search_queue.put(('batch', batch, error))
+        finally:
+            self.search_queue.put(('done', [], None))
 
     def check_search_queue(self):
-        """Checks the queue for search results."""
+        """Shows any search batches that have arrived; keeps polling until the search is done."""
+        finished = False
         try:
-            results, error = self.search_queue.get_nowait()
-            # Process results in the main thread
-            self.display_search_results(results, error)
-            self.search_button.config(state=tk.NORMAL) # Re-enable button
+            while True:
+                kind, batch, error = self.search_queue.get_nowait()
+                if kind == 'done':
+                    finished = True
+                    break
+                # Process results in the main thread
+                self.append_search_results(batch, error)
         except queue.Empty:
-            # If queue is empty, check again later
+            pass
+
+        if finished:
+            self.finish_search()
+            self.search_button.config(state=tk.NORMAL) # Re-enable button
+            self.finish_profile('search')
+        else:
             self.root.after(100, self.check_search_queue) # Check again later
 
-    def display_search_results(self, results, error):
-        """Updates the results listbox and status label."""
-        self.results_listbox.delete(0, tk.END)
-        self.search_results = results
+    def append_search_results(self, batch, error):
+        """Adds one page of results to the listbox as soon as it arrives."""
+        self.search_results.extend(batch)
+        for book in batch:
+             # Use the pre-formatted display text
+            self.results_listbox.insert(tk.END, book.get('display_text', 'Error displaying book'))
 
         if error:
+            self.search_error = error
             self.status_label.config(text=f"Search Error: {error}")
-            messagebox.showerror("Search Error", error)
-        elif not results:
-            self.status_label.config(text="Search complete. No books found.")
+            if not self.search_results: # Only interrupt the user if nothing could be shown
+                messagebox.showerror("Search Error", error)
+        else:
+            self.status_label.config(text=f"Searching... {len(self.search_results)} book(s) so far.")
+
+    def finish_search(self):
+        """Updates the status label once all result pages have been processed."""
+        if self.search_error:
+            return # Keep the error visible
+        cache_stats = self.search_cache.stats_text()
+        if not self.search_results:
+            self.status_label.config(text=f"Search complete. No books found. ({cache_stats})")
         else:
-            self.status_label.config(text=f"Search complete. Found {len(results)} book(s).")
-            for book in results:
-                 # Use the pre-formatted display text
-                self.results_listbox.insert(tk.END, book.get('display_text', 'Error displaying book'))
+            self.status_label.config(text=f"Search complete. Found {len(self.search_results)} book(s). ({cache_stats})")
 
 
     # --- Interested List Management ---
@@ -413,16 +312,15 @@ class BookScraperApp:
 
         added_count = 0
         for index in selected_indices:
-            selected_display_text = self.results_listbox.get(index)
-            # Find the full book data using display text (less robust but simple here)
-            book_data = next((b for b in self.search_results if b.get('display_text') == selected_display_text), None)
+            # Listbox rows are appended in the same order as search_results
+            book_data = self.search_results[index] if index < len(self.search_results) else None
 
             if book_data:
                  # Use product_id or URL as the primary key for stability
                  # Prefer product_id if available
-                book_key = book_data.get('product_id') if book_data.get('product_id') != 'N/A' else book_data.get('url')
+                key = book_key(book_data)
 
-                if book_key and book_key not in self.interested_books_by_id:
+                if key and key not in self.interested_books_by_id:
                     # --- Initialize price history when adding ---
                     book_data['price_history'] = []
                     # Try to add initial price point if available and valid
@@ -439,184 +337,557 @@ class BookScraperApp:
                             pass # Don't add if price is 'N/A' or invalid
                     # --- End initialization ---
 
-                    self.interested_books_by_id[book_key] = book_data.copy() # Store a copy
-                    # Add to listbox and immediately refresh view (simple approach)
-                    self.refresh_interested_listbox()
+                    self.interested_books_by_id[key] = book_data.copy() # Store a copy
+                    if self.store is not None:
+                        self.store.upsert_book(book_data)
+                    if self.journal is not None:
+                        self.journal.record_upsert(book_data)
+                    self.add_interested_row(key) # Only the new row is touched
                     added_count += 1
 
         if added_count > 0:
             self.status_label.config(text=f"Added {added_count} book(s) to interested list.")
+            self.request_analytics()
         # Keep items in results list after adding
 
     def remove_selected_from_interested(self, event=None): # Added event=None for double-click binding
-        selected_indices = self.interested_listbox.curselection()
-        if not selected_indices: return
-
-        removed_count = 0
-        # Iterate backwards when deleting multiple items by index
-        # Since we rebuild the listbox from the dict, it's safer to find the key
-        # corresponding to the selection and remove from the dictionary, then refresh.
-        keys_to_remove = []
-        for index in selected_indices:
-            book_display_text = self.interested_listbox.get(index)
-            # Find the key (product_id or URL) associated with this display text
-            found_key = None
-            for key, data in self.interested_books_by_id.items():
-                 # Need a reliable way to map listbox item back to dict key
-                 # Matching display_text is fragile if it includes changing price/status
-                 # Let's match on title + URL/ID as a slightly more robust heuristic
-                 # Or, ideally, store the key alongside the text in the listbox (more complex)
-                 # Simple approach: Assume title is unique enough for now in the context of deletion
-                 if data.get('display_text') == book_display_text:
-                     found_key = key
-                     break
-            if found_key:
-                keys_to_remove.append(found_key)
+        if event is not None and self.interested_tree.identify_region(event.x, event.y) != 'cell':
+            return # Double click on a heading or separator, not on a book
+        keys_to_remove = [key for key in self.interested_tree.selection() if key in self.interested_books_by_id]
+        if not keys_to_remove: return
 
         for key in keys_to_remove:
-            if key in self.interested_books_by_id:
-                del self.interested_books_by_id[key]
-                removed_count += 1
-
-        if removed_count > 0:
-            self.refresh_interested_listbox() # Refresh view after removing from dict
-            self.status_label.config(text=f"Removed {removed_count} book(s) from interested list.")
+            del self.interested_books_by_id[key]
+            self.refreshing.pop(key, None)
+            if self.store is not None:
+                self.store.remove_book(key)
+            if self.journal is not None:
+                self.journal.record_remove(key)
+            self.watch.forget(key)
+            self.alerts.pop(key, None)
+        self.interested_tree.delete(*keys_to_remove)
+        self.status_label.config(text=f"Removed {len(keys_to_remove)} book(s) from interested list.")
 
 
     # --- Load & Update Logic ---
-    def load_and_update_interested(self):
-        """Loads from fixed file and starts background updates."""
+    def read_saved_interested(self):
+        """
+        Reads the saved watchlist from the configured storage backend.
+
+        Returns:
+            list: Book dicts, or None if nothing has been saved yet.
+        """
+        if self.store is not None:
+            if len(self.store) == 0 and os.path.exists(INTERESTED_BOOKS_FULL_PATH):
+                # First run with SQLite: migrate the existing JSON file
+                count = self.store.import_json(INTERESTED_BOOKS_FULL_PATH)
+                print(f"Migrated {count} book(s) from {INTERESTED_BOOKS_FILE} to {WATCHLIST_DB_FILE}.")
+            return self.store.load_books() or None
+        if self.journal is not None:
+            return self.journal.load() # Snapshot + replayed journal tail
+
         # Use the full path calculated earlier
         if not os.path.exists(INTERESTED_BOOKS_FULL_PATH):
-            self.status_label.config(text=f"'{INTERESTED_BOOKS_FILE}' not found in script directory. Add books and save.")
-            return
-
-        self.status_label.config(text=f"Loading interested books from {INTERESTED_BOOKS_FILE}...")
-        self.interested_listbox.delete(0, tk.END) # Clear display
+            return None
+        # Open using the full path
+        with open(INTERESTED_BOOKS_FULL_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f) # Expecting a list of dicts
+
+    def show_saved_interested(self):
+        """
+        Loads the saved watchlist and displays it with the last known prices.
+
+        Returns:
+            list: Books to refresh, or None if nothing could be loaded.
+        """
+        storage_name = WATCHLIST_DB_FILE if self.store is not None else INTERESTED_BOOKS_FILE
+        self.status_label.config(text=f"Loading interested books from {storage_name}...")
         self.interested_books_by_id.clear()       # Clear internal data
+        self.refresh_interested_tree()            # Clear display
 
         try:
-            # Open using the full path
-            with open(INTERESTED_BOOKS_FULL_PATH, 'r', encoding='utf-8') as f:
-                loaded_books_data_list = json.load(f) # Expecting a list of dicts
-
-            if not loaded_books_data_list or not isinstance(loaded_books_data_list, list):
-                 self.status_label.config(text="Interested books file is empty or has invalid format.")
-                 return
-
-            self.update_tasks_total = 0
-            self.update_tasks_done = 0
-            valid_books_to_update = []
-
-            # Populate dictionary and prepare update list
-            for book_data in loaded_books_data_list:
-                 if isinstance(book_data, dict):
-                     # Use product_id or URL as key
-                     key = book_data.get('product_id') if book_data.get('product_id') != 'N/A' else book_data.get('url')
-                     if key:
-                        # Ensure essential fields and history list exist
-                        book_data.setdefault('price_history', [])
-                        book_data.setdefault('title', 'Unknown Title')
-                        book_data.setdefault('price', 'N/A')
-                        book_data.setdefault('url', 'N/A')
-                        book_data.setdefault('product_id', 'N/A')
-                        book_data.setdefault('display_text', f"{book_data['title']} ({book_data['price']})")
-
-                        self.interested_books_by_id[key] = book_data # Store loaded data
-                        valid_books_to_update.append(book_data) # Add to list for updating
-                     else:
-                        print(f"Skipping book data with no valid key (product_id or url): {book_data.get('title')}")
-                 else:
-                    print(f"Skipping invalid entry in JSON file: {book_data}")
-
-
-            self.update_tasks_total = len(valid_books_to_update)
-            if self.update_tasks_total == 0:
-                self.status_label.config(text="Load complete. No valid books found to update.")
-                return # Nothing to update
-
-            self.status_label.config(text=f"Loaded {len(self.interested_books_by_id)} books. Starting price refresh for {self.update_tasks_total}...")
-
-            # Start update thread for each valid book
-            for book_data in valid_books_to_update:
-                 update_thread = threading.Thread(target=self.run_update_thread, args=(book_data.copy(),), daemon=True) # Pass a copy
-                 update_thread.start()
-
-            # Start checking the update queue
-            self.root.after(100, self.check_update_queue)
-
-
+            loaded_books_data_list = self.read_saved_interested()
         except json.JSONDecodeError:
             messagebox.showerror("Load Error", f"File '{INTERESTED_BOOKS_FILE}' is corrupted or not valid JSON.")
             self.status_label.config(text="Error loading interested books (invalid format).")
+            return None
         except FileNotFoundError:
-             messagebox.showerror("Load Error", f"File not found: {INTERESTED_BOOKS_FULL_PATH}")
-             self.status_label.config(text="Saved interested books file not found.")
+            messagebox.showerror("Load Error", f"File not found: {INTERESTED_BOOKS_FULL_PATH}")
+            self.status_label.config(text="Saved interested books file not found.")
+            return None
         except Exception as e:
             messagebox.showerror("Load Error", f"Failed to load file '{INTERESTED_BOOKS_FILE}': {e}")
             self.status_label.config(text="Error loading interested books.")
+            return None
+
+        if loaded_books_data_list is None:
+            self.status_label.config(text=f"'{storage_name}' not found in script directory. Add books and save.")
+            return None
+
+        if not loaded_books_data_list or not isinstance(loaded_books_data_list, list):
+             self.status_label.config(text="Interested books file is empty or has invalid format.")
+             return None
+
+        valid_books = []
+        # Populate dictionary and prepare update list
+        for book_data in loaded_books_data_list:
+             if isinstance(book_data, dict):
+                 # Use product_id or URL as key
+                 key = book_key(book_data)
+                 if key:
+                    # Ensure essential fields and history list exist
+                    book_data.setdefault('price_history', [])
+                    book_data.setdefault('title', 'Unknown Title')
+                    book_data.setdefault('price', 'N/A')
+                    book_data.setdefault('url', 'N/A')
+                    book_data.setdefault('product_id', 'N/A')
+                    book_data.setdefault('display_text', f"{book_data['title']} ({book_data['price']})")
+
+                    self.interested_books_by_id[key] = book_data # Store loaded data
+                    valid_books.append(book_data) # Add to list for updating
+                 else:
+                    print(f"Skipping book data with no valid key (product_id or url): {book_data.get('title')}")
+             else:
+                print(f"Skipping invalid entry in JSON file: {book_data}")
 
-    def run_update_thread(self, book_data):
-        """Runs the update function and puts results in the update queue."""
-        # Ensure the book_data passed is the one to be updated
-        updated_data = update_book_info(book_data)
-        self.update_queue.put(updated_data)
+        # Show the last known prices right away; the refresh updates them later
+        self.refresh_interested_tree()
+        self.request_analytics()
+        return valid_books
 
-    def check_update_queue(self):
-        """Checks the queue for updated book info."""
-        updated = False
+    def load_and_update_interested(self):
+        """Displays the saved books immediately, then refreshes the stale ones in the background."""
+        self.start_profile('refresh') # Covers loading the file as well
+        valid_books = self.show_saved_interested()
+        if valid_books is None:
+            self.finish_profile('refresh')
+            return
+        if SCHEDULED_REFRESH:
+            books_to_update, skipped = self.scheduler.select(valid_books)
+        else:
+            books_to_update, skipped = valid_books, []
+        self.start_refresh(books_to_update, skipped_count=len(skipped))
+
+    def refresh_all_interested(self):
+        """Refreshes every book in the list now, whether or not it is due."""
+        if self.update_tasks_done < self.update_tasks_total:
+            messagebox.showinfo("Refresh", "A price refresh is already running.")
+            return
+        self.start_refresh(list(self.interested_books_by_id.values()))
+
+    def start_refresh(self, books_to_update, skipped_count=0):
+        """Starts the background refresh of `books_to_update`."""
+        self.update_tasks_total = len(books_to_update)
+        self.update_tasks_done = 0
+        self.refresh_error = None
+        self.run_alert_count = 0
+        self.refreshing.clear()
+        self.start_profile('refresh')
+        if self.update_tasks_total == 0:
+            if skipped_count:
+                self.status_label.config(text=f"Loaded {skipped_count} books. All prices are recent, nothing to refresh (use Refresh All to force).")
+            else:
+                self.status_label.config(text="Load complete. No valid books found to update.")
+            self.finish_profile('refresh')
+            return # Nothing to update
+
+        status = f"Loaded {len(self.interested_books_by_id)} books (last known prices). Refreshing {self.update_tasks_total}"
+        if skipped_count:
+            status += f", {skipped_count} still recent"
+        self.status_label.config(text=status + "...")
+
+        # Refresh on a single background thread driving a bounded worker pool
+        update_thread = threading.Thread(target=self.run_update_thread, args=(books_to_update,), daemon=True)
+        update_thread.start()
+
+        # Start checking the update queue
+        self.root.after(UPDATE_POLL_MS, self.check_update_queue)
+
+    def run_update_thread(self, books):
+        """
+        Refreshes the books with the worker pool, putting start and result events in the update queue.
+
+        If the engine cannot be built or fails part-way, an ('abort', message)
+        event follows the results already queued, so check_update_queue still
+        finishes the run instead of waiting for books that will never come.
+        """
+        request_metrics.reset() # The metrics file describes this run only
+        stream_stats.reset() # So does the streaming summary printed at the end
         try:
-            while not self.update_queue.empty(): # Process all available updates
-                updated_data = self.update_queue.get_nowait()
-                self.update_tasks_done += 1
-                updated = True
-
-                # Use product_id or URL as the key - must match how it was stored initially
-                key = updated_data.get('product_id') if updated_data.get('product_id') != 'N/A' else updated_data.get('url')
-
-                if key and key in self.interested_books_by_id:
-                    # Update internal dictionary with the refreshed data (including history)
-                    self.interested_books_by_id[key] = updated_data
-                elif key:
-                     print(f"Warning: Received update for unknown key: {key} (Title: {updated_data.get('title')})")
-                else:
-                     print(f"Warning: Received update for book with no key: {updated_data.get('title')}")
-
-                # Update status label immediately
-                progress = f"Updating prices: {self.update_tasks_done}/{self.update_tasks_total} done."
-                self.status_label.config(text=progress)
-
-
-            if self.update_tasks_done >= self.update_tasks_total:
-                # All updates finished, now refresh the listbox view cleanly
-                print("All update tasks complete. Refreshing listbox.")
-                self.refresh_interested_listbox()
-                self.status_label.config(text=f"Price refresh complete for {self.update_tasks_total} book(s).")
-                # No need to reschedule check_update_queue
+            if REFRESH_BACKEND == "asyncio":
+                from async_fetch import AsyncRefreshEngine # Imported lazily, aiohttp is optional
+                engine = AsyncRefreshEngine(cache=self.http_cache, journal=self.journal)
             else:
-                # If queue was processed but tasks remain, check again later
-                self.root.after(200, self.check_update_queue)
+                # Retries, adaptive concurrency and the circuit breaker are shared by all workers of the run
+                policy = FetchPolicy(max_concurrency=REFRESH_WORKERS)
+                engine = RefreshEngine(workers=REFRESH_WORKERS,
+                                       update_func=functools.partial(update_book_info, cache=self.http_cache,
+                                                                     journal=self.journal, policy=policy,
+                                                                     parse_pool=self.parse_pool))
+                if BULK_REFRESH:
+                    engine = BulkRefresher(engine, policy=policy, journal=self.journal, parse_pool=self.parse_pool)
+            # Engines copy each book before updating
+            engine.run(books,
+                       progress_callback=lambda done, total, updated_data: self.update_queue.put(('done', updated_data)),
+                       start_callback=lambda book_data: self.update_queue.put(('start', book_key(book_data), time.monotonic())))
+        except Exception as e:
+            print(f"Price refresh failed: {e}")
+            self.update_queue.put(('abort', str(e) or type(e).__name__))
+        try:
+            self.http_cache.save()
+        except OSError as e:
+            print(f"Could not save HTTP cache: {e}")
+        if METRICS_FILE:
+            try:
+                request_metrics.write_json(os.path.join(SCRIPT_DIR, METRICS_FILE))
+            except OSError as e:
+                print(f"Could not save refresh metrics: {e}")
 
-        except queue.Empty:
-             # Should not happen with while loop unless called when queue is empty AND tasks remain
-             if self.update_tasks_done < self.update_tasks_total:
-                  self.root.after(200, self.check_update_queue)
+    def check_update_queue(self):
+        """
+        Applies queued refresh events to the interested tree, once per frame.
+
+        At most UPDATE_BATCH_SIZE events are taken per call. Events for the same
+        book within a batch are coalesced into a single row update, and SQLite
+        writes are grouped into one transaction per batch.
+        """
+        started = {}
+        finished = {}
+        for _ in range(UPDATE_BATCH_SIZE):
+            try:
+                event = self.update_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'start':
+                started[event[1]] = event[2]
+                continue
+            if event[0] == 'abort':
+                # Last event of a failed run: the books without a result are not coming
+                self.refresh_error = event[1]
+                self.update_tasks_done = self.update_tasks_total
+                break
+
+            updated_data = event[1]
+            self.update_tasks_done += 1
+            # Use product_id or URL as the key - must match how it was stored initially
+            key = book_key(updated_data)
+            if key and key in self.interested_books_by_id:
+                finished[key] = updated_data # A later result for the same book replaces an earlier one
+            elif key:
+                 print(f"Warning: Received update for unknown key: {key} (Title: {updated_data.get('title')})")
+            else:
+                 print(f"Warning: Received update for book with no key: {updated_data.get('title')}")
+
+        for key, start_time in started.items():
+            if key not in finished and key in self.interested_books_by_id:
+                self.refreshing[key] = [start_time, "Refreshing..."]
+                self.update_interested_row(key, status="Refreshing...")
+        alerts = []
+        for key, updated_data in finished.items():
+            # Update internal dictionary with the refreshed data (including history)
+            self.refreshing.pop(key, None)
+            self.interested_books_by_id[key] = updated_data
+            book_alerts = self.watch.observe(key, updated_data) # Only the new history entries are evaluated
+            if book_alerts:
+                self.alerts[key] = book_alerts[-1]['message']
+                alerts.extend(book_alerts)
+            self.update_interested_row(key)
+        if alerts:
+            self.run_alert_count += len(alerts)
+            try:
+                self.alert_log.append(alerts)
+            except OSError as e:
+                print(f"Could not write the alert log: {e}")
+            for alert in alerts:
+                print(f"ALERT {alert['title']}: {alert['message']}")
+        if finished and self.store is not None:
+            self.store.upsert_books(finished.values()) # Incremental save of the changed books only
+        slow_count = self.mark_slow_rows()
+
+        if self.update_tasks_done >= self.update_tasks_total:
+            # All updates finished; rows were updated as results arrived
+            print("All update tasks complete.")
+            for key in self.refreshing: # Results that came back under a different key
+                if key in self.interested_books_by_id:
+                    self.update_interested_row(key)
+            self.refreshing.clear()
+            if self.refresh_error is not None:
+                status = f"Price refresh stopped early: {self.refresh_error}. Books without a result keep their last known price."
+            else:
+                status = f"Price refresh complete for {self.update_tasks_total} book(s)."
+            streamed = stream_stats.summary()
+            if streamed['requests']:
+                status += f" Streamed {streamed['bytes_read'] // 1024} KB, saved {streamed['bytes_saved'] // 1024} KB."
+            if self.run_alert_count:
+                status += f" {self.run_alert_count} price alert(s), highlighted and logged to {ALERT_LOG_FILE}."
+            try:
+                self.watch.save_state()
+            except OSError as e:
+                print(f"Could not save the watch rule state: {e}")
+            self.status_label.config(text=status)
+            self.finish_profile('refresh')
+            self.request_analytics()
+            self.schedule_chart_update() # The charted books may have new prices
+            return # No need to reschedule check_update_queue
+
+        if started or finished:
+            progress = f"Updating prices: {self.update_tasks_done}/{self.update_tasks_total} done."
+            if slow_count:
+                progress += f" {slow_count} slow."
+            self.status_label.config(text=progress)
+        # Drain a backlog on the next idle moment, otherwise wait for the next frame
+        self.root.after(1 if not self.update_queue.empty() else UPDATE_POLL_MS, self.check_update_queue)
+
+    # --- Profiling ---
+    def start_profile(self, label):
+        """Starts profiling a 'search' or 'refresh' run if PROFILE_MODE is set and no other run is profiled."""
+        if PROFILE_MODE and self.profiler is None:
+            self.profiler = create_profiler(PROFILE_MODE, label=label).start()
+
+    def finish_profile(self, label):
+        """Stops the profile started for `label` and writes its files."""
+        if self.profiler is None or self.profiler.label != label:
+            return
+        profiler, self.profiler = self.profiler, None
+        profiler.stop()
+        try:
+            paths = profiler.write()
+            print(f"Profile of the {label} written to: {', '.join(paths)}")
+        except OSError as e:
+            print(f"Could not write the {label} profile: {e}")
+
+    # --- Price Analytics ---
+    def request_analytics(self):
+        """Recomputes the analytics columns in the background, ANALYTICS_DELAY_MS from now."""
+        if self.analytics_state is None:
+            self.analytics_state = 'scheduled'
+            self.root.after(ANALYTICS_DELAY_MS, self.start_analytics)
+        elif self.analytics_state == 'running':
+            self.analytics_state = 'rerun' # The books changed during the run, compute again afterwards
+
+    def start_analytics(self):
+        if self.pending_rows: # Let the list finish drawing first
+            self.root.after(ANALYTICS_DELAY_MS, self.start_analytics)
+            return
+        self.analytics_state = 'running'
+        # Refresh engines update a copy of each book and its price_history (scraper_core.copy_for_update),
+        # so the lists read by the analytics thread are never appended to; results replace the dicts
+        books = list(self.interested_books_by_id.values())
+        threading.Thread(target=self.run_analytics_thread, args=(books,), daemon=True).start()
+        self.root.after(UPDATE_POLL_MS, self.check_analytics_queue)
+
+    def run_analytics_thread(self, books):
+        """Computes the analytics of every book (one NumPy batch) and queues the result."""
+        try:
+            self.analytics_queue.put(self.price_analytics.compute(books, book_key))
+        except Exception as e: # No numpy or unexpected data: the analytics columns stay empty
+            print(f"Could not compute price analytics: {e}")
+            self.analytics_queue.put(None)
 
+    def check_analytics_queue(self):
+        try:
+            analytics = self.analytics_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(UPDATE_POLL_MS, self.check_analytics_queue)
+            return
+        rerun = self.analytics_state == 'rerun'
+        self.analytics_state = None
+        if analytics is not None:
+            changed = deque(key for key, metrics in analytics.items() if self.analytics.get(key) != metrics)
+            self.analytics = analytics
+            self.update_analytics_rows(changed)
+        if rerun:
+            self.request_analytics()
+
+    def update_analytics_rows(self, keys):
+        """Redraws the rows whose analytics changed, ROW_INSERT_CHUNK per idle callback, then re-sorts if needed."""
+        for _ in range(min(ROW_INSERT_CHUNK, len(keys))):
+            key = keys.popleft()
+            if key in self.interested_books_by_id:
+                state = self.refreshing.get(key)
+                self.update_interested_row(key, status=state[1] if state else None)
+        if keys:
+            self.root.after(1, self.update_analytics_rows, keys)
+        elif self.sort_column in self.analytics_columns and not self.pending_rows:
+            self.interested_tree.set_children('', *self.sorted_interested_keys())
+
+    def mark_slow_rows(self):
+        """
+        Marks rows whose fetch has been running longer than SLOW_FETCH_SECONDS.
+
+        Returns:
+            int: Number of slow fetches.
+        """
+        now = time.monotonic()
+        slow_count = 0
+        for key, state in self.refreshing.items():
+            elapsed = now - state[0]
+            if elapsed < SLOW_FETCH_SECONDS:
+                continue
+            slow_count += 1
+            status = f"Slow ({int(elapsed)}s)"
+            if status != state[1]: # Only touch the row when the shown seconds change
+                state[1] = status
+                self.update_interested_row(key, status=status)
+        return slow_count
+
+
+    # --- Interested Tree ---
+    @staticmethod
+    def last_change_date(history):
+        """Date of the last price change (or of the first observation if the price never changed)."""
+        try:
+            since, current_price = history[-1]
+            for date_str, price in reversed(history):
+                if price != current_price:
+                    break
+                since = date_str
+            return since
+        except (IndexError, TypeError, ValueError):
+            return ''
+
+    def interested_row_values(self, book_data, status=None):
+        """Column values (see INTERESTED_COLUMNS) for one book. `status` overrides the status column."""
+        price = book_data.get('price', 'N/A')
+        if status is None:
+            if book_data.get('error') == "Timeout":
+                status = "Timeout"
+            elif book_data.get('error'):
+                status = "Error"
+            elif price == 'N/A':
+                status = "No price"
+            else:
+                status = "OK"
+        metrics = self.analytics.get(book_key(book_data)) or {}
+        return (book_data.get('title', 'Unknown Title'), price,
+                self.last_change_date(book_data.get('price_history') or []), status,
+                *(format_metric(name, metrics.get(name)) for name, _ in ANALYTICS_METRICS))
+
+    def interested_sort_value(self, key):
+        """Sort key of a book for the current sort column."""
+        book_data = self.interested_books_by_id[key]
+        if self.sort_column == 'price':
+            try:
+                return (0, float(book_data.get('price')))
+            except (TypeError, ValueError):
+                return (1, 0.0) # Books without a price after the priced ones
+        if self.sort_column == 'title':
+            return (0, str(book_data.get('title', '')).lower())
+        if self.sort_column == 'last_change':
+            return (0, self.last_change_date(book_data.get('price_history') or []))
+        if self.sort_column in self.analytics_columns:
+            return analytics_sort_value(self.analytics.get(key), self.sort_column)
+        return (0, self.interested_row_values(book_data)[3])
+
+    def sorted_interested_keys(self):
+        return sorted(self.interested_books_by_id, key=self.interested_sort_value, reverse=self.sort_reverse)
+
+    def interested_row_tags(self, key, status=None):
+        """Tags of a row: fetch state (refreshing/slow/error) plus 'alert' if a watch rule fired."""
+        if status is not None:
+            tags = ('slow',) if status.startswith("Slow") else ('refreshing',)
+        else:
+            tags = ('error',) if self.interested_books_by_id[key].get('error') else ()
+        return tags + ('alert',) if key in self.alerts else tags
+
+    def insert_interested_row(self, key, index='end'):
+        book_data = self.interested_books_by_id[key]
+        self.interested_tree.insert('', index, iid=key, values=self.interested_row_values(book_data),
+                                    tags=self.interested_row_tags(key))
+
+    def update_interested_row(self, key, status=None):
+        """
+        Redraws one row after its book changed. The row keeps its position until the next sort.
+
+        Args:
+            key (str): Book key (row id).
+            status (str, optional): Temporary status for a fetch in progress
+                                    ("Refreshing..." or "Slow (12s)").
+        """
+        if self.interested_tree.exists(key):
+            book_data = self.interested_books_by_id[key]
+            self.interested_tree.item(key, values=self.interested_row_values(book_data, status),
+                                      tags=self.interested_row_tags(key, status))
+
+    def refresh_interested_tree(self):
+        """
+        Rebuilds the whole interested tree from the internal dictionary (after a load).
+
+        Rows are inserted in chunks of ROW_INSERT_CHUNK from idle callbacks, so a
+        watchlist with tens of thousands of books does not freeze the window.
+        """
+        self.interested_tree.delete(*self.interested_tree.get_children())
+        starting = not self.pending_rows
+        self.pending_rows = deque(self.sorted_interested_keys())
+        if starting:
+            self.insert_pending_rows()
+
+    def insert_pending_rows(self):
+        for _ in range(min(ROW_INSERT_CHUNK, len(self.pending_rows))):
+            key = self.pending_rows.popleft()
+            if key in self.interested_books_by_id and not self.interested_tree.exists(key):
+                self.insert_interested_row(key)
+        if self.pending_rows:
+            self.root.after(1, self.insert_pending_rows)
+
+    def add_interested_row(self, key):
+        """Inserts the row of a newly added book at its sorted position."""
+        if self.pending_rows:
+            self.pending_rows.append(key) # Still building the list, it is inserted with the rest
+            return
+        children = self.interested_tree.get_children()
+        value = self.interested_sort_value(key)
+        low, high = 0, len(children)
+        while low < high: # Binary search over the rows, which are in sorted order
+            middle = (low + high) // 2
+            middle_value = self.interested_sort_value(children[middle])
+            if (middle_value > value) if self.sort_reverse else (middle_value < value):
+                low = middle + 1
+            else:
+                high = middle
+        self.insert_interested_row(key, low)
+
+    def sort_interested(self, column):
+        """Sorts by a column; clicking the same heading again reverses the order."""
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        for name, heading, _ in INTERESTED_COLUMNS:
+            arrow = (" \u25bc" if self.sort_reverse else " \u25b2") if name == column else ""
+            self.interested_tree.heading(name, text=heading + arrow)
+        if self.pending_rows:
+            self.refresh_interested_tree()
+        else:
+            # Reorders the existing rows in one call; the selection is kept
+            self.interested_tree.set_children('', *self.sorted_interested_keys())
 
-    def refresh_interested_listbox(self):
-        """Clears and repopulates the interested listbox from the internal dictionary."""
-        self.interested_listbox.delete(0, tk.END)
-        # Sort items alphabetically by display text before inserting (optional)
-        sorted_keys = sorted(self.interested_books_by_id.keys(),
-                             key=lambda k: self.interested_books_by_id[k].get('display_text', ''))
 
-        for key in sorted_keys:
-            book_data = self.interested_books_by_id[key]
-            display_text = book_data.get('display_text', 'Error displaying book')
-            self.interested_listbox.insert(tk.END, display_text)
-            # Optional: Add color coding based on status/error?
-            # if book_data.get('error'):
-            #     self.interested_listbox.itemconfig(tk.END, {'fg': 'red'})
+    # --- Watch Rules ---
+    def prompt_alert_below(self):
+        """Sets (or with 0 removes) a 'below X EUR' watch rule for the selected interested books."""
+        keys = [key for key in self.interested_tree.selection() if key in self.interested_books_by_id]
+        if not keys:
+            messagebox.showwarning("Selection Error", "Please select a book from the 'Interested Books' list.")
+            return
+        current = next((rule['price'] for rule in self.watch.book_rules.get(keys[0], []) if rule['type'] == 'below'), None)
+        price = simpledialog.askfloat("Alert Below", f"Alert when the price of the {len(keys)} selected book(s) "
+                                      "falls below (EUR, 0 = no alert):",
+                                      initialvalue=current, minvalue=0, parent=self.root)
+        if price is None:
+            return # Cancelled
+        for key in keys:
+            rules = [rule for rule in self.watch.book_rules.get(key, []) if rule['type'] != 'below']
+            if price > 0:
+                rules.append({'type': 'below', 'price': price})
+            self.watch.set_book_rules(key, rules)
+        try:
+            self.watch.save_rules()
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Could not save the watch rules: {e}")
+            return
+        if price > 0:
+            self.status_label.config(text=f"Alert below {price:.2f} EUR set for {len(keys)} book(s); checked on each refresh.")
+        else:
+            self.status_label.config(text=f"Price alert removed from {len(keys)} book(s).")
 
 
     # --- Manual Load / Save ---
@@ -624,19 +895,24 @@ class BookScraperApp:
         """Loads interested books from a user-selected file (manual action)."""
         filepath = filedialog.askopenfilename(
              defaultextension=".json",
-             filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+             filetypes=[("JSON files", "*.json"), ("CSV export", "*.csv"), ("Parquet export", "*.parquet"),
+                        ("Arrow export", "*.arrow *.feather"), ("All files", "*.*")],
              initialdir=SCRIPT_DIR, # Start Browse in script directory
              title="Load Interested Books File"
         )
         if not filepath: return # User cancelled
 
         self.status_label.config(text=f"Loading interested books from {os.path.basename(filepath)}...")
-        self.interested_listbox.delete(0, tk.END)
         self.interested_books_by_id.clear()
+        self.refresh_interested_tree()
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                loaded_books_data_list = json.load(f) # Expecting a list of dicts
+            if os.path.splitext(filepath)[1].lower() in EXPORT_FORMATS:
+                # Books file plus its .history file, as written by Save Interested / watchlist_export.py
+                loaded_books_data_list = list(iter_import(filepath))
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    loaded_books_data_list = json.load(f) # Expecting a list of dicts
 
             if not loaded_books_data_list or not isinstance(loaded_books_data_list, list):
                  self.status_label.config(text="Selected file is empty or invalid.")
@@ -646,7 +922,7 @@ class BookScraperApp:
             count = 0
             for book_data in loaded_books_data_list:
                  if isinstance(book_data, dict):
-                     key = book_data.get('product_id') if book_data.get('product_id') != 'N/A' else book_data.get('url')
+                     key = book_key(book_data)
                      if key:
                             # Ensure display text exists/is correct based on loaded data
                             book_data.setdefault('price_history', [])
@@ -661,7 +937,11 @@ class BookScraperApp:
                  else:
                       print(f"Skipping invalid entry during manual load: {book_data}")
 
-            self.refresh_interested_listbox() # Refresh view from dictionary
+            if self.store is not None:
+                self.store.replace_all(self.interested_books_by_id.values()) # Imported file becomes the watchlist
+            if self.journal is not None:
+                self.journal.write_snapshot(self.interested_books_by_id.values())
+            self.refresh_interested_tree() # Refresh view from dictionary
             self.status_label.config(text=f"Loaded {count} interested books from {os.path.basename(filepath)}.")
 
         except FileNotFoundError:
@@ -676,14 +956,15 @@ class BookScraperApp:
 
 
     def save_interested(self):
-        """Saves the *current* interested books list to a JSON file."""
+        """Saves the *current* interested books list to a JSON file, or exports it as CSV/Parquet/Arrow."""
         if not self.interested_books_by_id:
             messagebox.showinfo("Save", "Interested list is empty. Nothing to save.")
             return
 
         filepath = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            filetypes=[("JSON files", "*.json"), ("CSV export", "*.csv"), ("Parquet export", "*.parquet"),
+                       ("Arrow export", "*.arrow *.feather"), ("All files", "*.*")],
             initialfile=INTERESTED_BOOKS_FULL_PATH, # Use the calculated full path as default suggestion
             initialdir=SCRIPT_DIR, # Start Browse in script directory
             title="Save Interested Books As..."
@@ -693,123 +974,76 @@ class BookScraperApp:
         try:
             # Save the values (book data dictionaries) from the interested_books dict
             books_to_save = list(self.interested_books_by_id.values())
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(books_to_save, f, ensure_ascii=False, indent=4)
+            if os.path.splitext(filepath)[1].lower() in EXPORT_FORMATS:
+                # Books table + flattened price history table (e.g. books.csv and books.history.csv)
+                stats = export_books(books_to_save, filepath)
+                self.status_label.config(
+                    text=f"Exported {stats['books']} book(s) to {os.path.basename(filepath)} and "
+                         f"{stats['history_rows']} price(s) to {os.path.basename(history_path_for(filepath))}")
+                return
+            write_books_json(books_to_save, filepath) # Atomic: never leaves a half-written file
             self.status_label.config(text=f"Interested books saved to {os.path.basename(filepath)}")
         except Exception as e:
             messagebox.showerror("Save Error", f"Failed to save file: {e}")
             self.status_label.config(text="Error saving interested books.")
 
+    def purge_http_cache(self):
+        """Deletes all cached validators/prices and searches so everything is fetched again."""
+        try:
+            self.http_cache.purge()
+            self.search_cache.clear()
+            self.status_label.config(text="HTTP and search caches cleared.")
+        except OSError as e:
+            messagebox.showerror("Cache Error", f"Failed to clear cache: {e}")
+
     # --- Graphing Method ---
     def show_history_graph(self):
-        """Displays a price history graph for the selected interested book."""
-        selected_indices = self.interested_listbox.curselection()
-
-        if not selected_indices:
+        """Shows the embedded price chart for the selected interested books, or hides it if shown."""
+        if self.chart_visible:
+            self.chart_frame.grid_remove()
+            self.chart_visible = False
+            self.history_button.config(text="Show Price History")
+            return
+        if not self.interested_tree.selection():
             messagebox.showwarning("Selection Error", "Please select a book from the 'Interested Books' list.")
             return
-        # No check for multiple selections needed as listbox mode is SINGLE
-
-        selected_index = selected_indices[0]
-        selected_display_text = self.interested_listbox.get(selected_index)
-
-        # Find the book data using the display text (less robust, find key instead)
-        book_data = None
-        found_key = None
-        # Iterate through dictionary to find the key corresponding to the selected display text
-        # This mapping is fragile if display text changes format or isn't unique
-        for key, data in self.interested_books_by_id.items():
-             if data.get('display_text') == selected_display_text:
-                  book_data = data
-                  found_key = key # Keep track of the key if needed
-                  break
-
-        if not book_data:
-             # Fallback: Try matching title part? More complex.
-             messagebox.showerror("Error", f"Could not find internal data for '{selected_display_text}'. Try refreshing/reloading.")
-             return
-
-        history = book_data.get('price_history', [])
-        book_title = book_data.get('title', 'Unknown Book')
-
-        # Filter out potential invalid entries before checking length
-        valid_history = []
-        for entry in history:
-            if isinstance(entry, list) and len(entry) == 2:
-                try:
-                    # Attempt conversion to ensure data is usable
-                    datetime.strptime(entry[0], '%Y-%m-%d')
-                    float(entry[1])
-                    valid_history.append(entry)
-                except (ValueError, TypeError):
-                    print(f"Skipping invalid history entry for {book_title}: {entry}")
-            else:
-                 print(f"Skipping malformed history entry for {book_title}: {entry}")
-
-
-        if not valid_history or len(valid_history) < 2:
-             messagebox.showinfo("Price History", f"Not enough valid price history recorded for '{book_title}' to plot a line graph (Need at least 2 points). Found {len(valid_history)} valid points.")
-             # Optionally, show a message even with 1 point?
-             # if len(valid_history) == 1:
-             #     messagebox.showinfo("Price History", f"Only one price point recorded for '{book_title}': {valid_history[0][1]} EUR on {valid_history[0][0]}.")
-             return
-
-        # Prepare data for plotting
-        dates = []
-        prices = []
-        try:
-            # Use the filtered valid_history
-            for entry in valid_history:
-                 # entry = ['YYYY-MM-DD', 'price_str']
-                 date_obj = datetime.strptime(entry[0], '%Y-%m-%d').date() # Convert string to date object
-                 price_float = float(entry[1]) # Convert price string to float
-                 dates.append(date_obj)
-                 prices.append(price_float)
-        except Exception as e: # Catch any parsing error missed by filtering
-             messagebox.showerror("History Data Error", f"Critical error parsing price history data: {e}")
-             return
-
-        # Plotting using Matplotlib
+        if self.chart is None:
+            try:
+                self.chart = PriceChart(self.chart_frame)
+            except Exception as e: # matplotlib missing or no Tk backend
+                messagebox.showerror("Graphing Error", f"An error occurred while creating the graph: {e}")
+                return
+        self.chart_frame.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=5, pady=5)
+        self.chart_visible = True
+        self.history_button.config(text="Hide Price History")
+        self.update_chart()
+
+    def schedule_chart_update(self, event=None):
+        """Redraws the chart for the new selection once the pending events are handled."""
+        if self.chart_visible and not self.chart_update_pending:
+            self.chart_update_pending = True # Several selection events in a row cause one redraw
+            self.root.after_idle(self.update_chart)
+
+    def update_chart(self):
+        """Overlays the price history of the selected books (the focused one first) in the chart."""
+        self.chart_update_pending = False
+        if not self.chart_visible:
+            return
+        selection = list(self.interested_tree.selection())
+        focused = self.interested_tree.focus()
+        if focused in selection: # The focused row gets the first colour
+            selection.remove(focused)
+            selection.insert(0, focused)
+        books = [(key, self.interested_books_by_id[key].get('title', 'Unknown Book'),
+                  self.interested_books_by_id[key].get('price_history') or [])
+                 for key in selection if key in self.interested_books_by_id]
         try:
-            # Check available styles, provide fallbacks
-            available_styles = plt.style.available
-            if 'seaborn-v0_8-darkgrid' in available_styles:
-                 plt.style.use('seaborn-v0_8-darkgrid')
-            elif 'seaborn-darkgrid' in available_styles:
-                 plt.style.use('seaborn-darkgrid')
-            elif 'ggplot' in available_styles:
-                 plt.style.use('ggplot')
-            else:
-                 print("Preferred styles not found, using default Matplotlib style.")
-                 # Use default
-
-            fig, ax = plt.subplots(figsize=(10, 5)) # Create figure and axes
-
-            ax.plot_date(dates, prices, linestyle='-', label=f'{book_title}') # Use plot_date for date objects
-
-            # Formatting the plot
-            ax.set_title(f"Price History for '{book_title}'")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Price (EUR)")
-            ax.grid(True, which='both', linestyle='--', linewidth=0.5) # Add grid
-
-            # Format x-axis dates nicely
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=4, maxticks=10)) # Auto-locate ticks reasonably
-            fig.autofmt_xdate(rotation=30, ha='right') # Auto-rotate date labels
-
-            # Add interactivity (zoom/pan) automatically enabled by plt.show() usually
-            # Add value labels to points (optional, can clutter if many points)
-            # for i, txt in enumerate(prices):
-            #    ax.annotate(f"{txt:.2f}", (dates[i], prices[i]), textcoords="offset points", xytext=(0,5), ha='center')
-
-
-            plt.tight_layout() # Adjust layout to prevent labels overlapping
-            # plt.legend() # Legend might be redundant if only one line
-            plt.show() # Display the plot in a new window
-
+            self.chart.plot(books)
         except Exception as e:
-             messagebox.showerror("Graphing Error", f"An error occurred while generating the graph: {e}")
+            messagebox.showerror("Graphing Error", f"An error occurred while generating the graph: {e}")
+            return
+        if len(books) > CHART_MAX_SERIES:
+            self.status_label.config(text=f"Chart shows the first {CHART_MAX_SERIES} of {len(books)} selected books.")
 
 
 # --- Run the Application ---
@@ -0,0 +1,195 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from refresh_engine import RefreshEngine
+from scraper_core import (copy_for_update, fetch_search_page, finalize_book_data, parse_search_results,
+                          prepare_book_data, record_price)
+
+# --- Configuration ---
+BULK_MIN_GROUP = 2 # Due books that must share a search query before its listing pages are used
+BULK_MAX_PAGES = 5 # Listing pages read per query at most
+
+
+def _product_id(book_data):
+    product_id = str(book_data.get('product_id') or '').strip()
+    return product_id if product_id and product_id != 'N/A' else None
+
+
+# --- Bulk Refresh from Listing Pages ---
+class BulkRefresher:
+    """
+    Refreshes a watchlist from search listing pages where possible.
+
+    Every item on a knygos.lt search results page carries its price and
+    product id (data-cta-price / data-cta-product-id on the title link), so
+    one listing request can refresh dozens of books. Due books are grouped by
+    the query they were found with ('search_query', recorded by
+    scraper_core.iter_search_pages). For each query shared by at least
+    min_group books, listing pages are read until all of the group's books
+    have been seen, the results run out or max_pages is reached. Any item on
+    those pages whose product id matches a due book is applied, even if the
+    book belongs to another group.
+
+    Books that no listing page covered (no search_query, no product id, a
+    small group, or not found on the pages read) are refreshed per product
+    page by the fallback RefreshEngine. run() has the same signature and
+    return value as RefreshEngine.run.
+    """
+
+    def __init__(self, engine=None, policy=None, journal=None, min_group=BULK_MIN_GROUP, max_pages=BULK_MAX_PAGES,
+                 parse_pool=None):
+        """
+        Args:
+            engine (RefreshEngine, optional): Fallback for books not found on a listing page.
+            policy (fetch_policy.FetchPolicy, optional): Retries/backoff for listing requests.
+            journal (price_journal.PriceJournal, optional): Receives every successful price check.
+            min_group (int): Books sharing a query needed to read its listing pages.
+            max_pages (int): Listing pages read per query at most.
+            parse_pool (parse_pool.ParsePool, optional): Parses listing pages in worker processes.
+        """
+        self.engine = engine or RefreshEngine()
+        self.policy = policy
+        self.journal = journal
+        self.min_group = max(1, min_group)
+        self.max_pages = max(1, max_pages)
+        self.parse_pool = parse_pool
+        self.stats = {'listing_requests': 0, 'listing_matched': 0, 'fallback': 0}
+        self._lock = threading.Lock()
+
+    def plan(self, books):
+        """
+        Picks the listing queries worth reading.
+
+        Returns:
+            dict: {query: [indices of the books found with it]}, largest groups first.
+        """
+        groups = {}
+        for index, book_data in enumerate(books):
+            query = (book_data.get('search_query') or '').strip()
+            if query and _product_id(book_data):
+                groups.setdefault(query, []).append(index)
+        selected = [(query, indices) for query, indices in groups.items() if len(indices) >= self.min_group]
+        selected.sort(key=lambda item: -len(item[1])) # They save the most requests
+        return dict(selected)
+
+    def run(self, books, progress_callback=None, start_callback=None):
+        """
+        Refreshes every book, from listing pages first and per product page for the rest.
+
+        Args:
+            books (list): Book data dicts. Each one is copied before being updated.
+            progress_callback (callable, optional): Called as
+                progress_callback(done, total, updated_book) as each book finishes.
+            start_callback (callable, optional): Called as start_callback(book)
+                when the listing query or product fetch covering a book starts.
+
+        Returns:
+            list: Updated book data dicts in the same order as `books`.
+        """
+        books = list(books)
+        total = len(books)
+        results = [None] * total
+        self.stats = {'listing_requests': 0, 'listing_matched': 0, 'fallback': 0}
+        if total == 0:
+            return results
+
+        indices_by_id = {}
+        for index, book_data in enumerate(books):
+            product_id = _product_id(book_data)
+            if product_id:
+                indices_by_id.setdefault(product_id, []).append(index)
+        done = 0
+
+        def report(index, updated):
+            nonlocal done
+            with self._lock:
+                results[index] = updated
+                done += 1
+                finished = done
+            if progress_callback:
+                progress_callback(finished, total, updated)
+
+        def apply_items(items):
+            for item in items:
+                price = item.get('price')
+                if not price or price == 'N/A':
+                    continue
+                for index in indices_by_id.get(_product_id(item), ()):
+                    with self._lock:
+                        if results[index] is not None:
+                            continue
+                        results[index] = False # Claimed; filled in by report()
+                    updated = self._apply_listing_price(books[index], price)
+                    if updated is None:
+                        with self._lock:
+                            results[index] = None # Invalid price, leave it to the product page
+                        continue
+                    with self._lock:
+                        self.stats['listing_matched'] += 1
+                    report(index, updated)
+
+        def scan(query, indices):
+            if start_callback:
+                for index in indices:
+                    start_callback(books[index])
+            session = self.engine.session_factory() # Same kind of pooled session as the fallback workers
+            try:
+                for page in range(1, self.max_pages + 1):
+                    with self._lock:
+                        if all(results[index] is not None for index in indices):
+                            return # Every book of the group has been found
+                    try:
+                        content = fetch_search_page(query, page, session=session, policy=self.policy)
+                        items, _ = parse_search_results(content, parse_pool=self.parse_pool)
+                    except Exception as e: # Network, HTTP or parse errors all mean: use product pages
+                        print(f"  -> Listing '{query}' page {page} failed ({e}), falling back to product pages.")
+                        return
+                    with self._lock:
+                        self.stats['listing_requests'] += 1
+                    apply_items(items)
+                    if not items:
+                        return # Past the last page of results
+            finally:
+                session.close()
+
+        plan = self.plan(books)
+        if plan:
+            with ThreadPoolExecutor(max_workers=min(self.engine.workers, len(plan))) as executor:
+                for future in [executor.submit(scan, query, indices) for query, indices in plan.items()]:
+                    future.result()
+
+        remaining = [index for index in range(total) if results[index] is None]
+        self.stats['fallback'] = len(remaining)
+        if remaining:
+            print(f"Listing pages covered {total - len(remaining)} of {total} book(s); "
+                  f"fetching {len(remaining)} product page(s).")
+
+            def fallback_progress(_done, _total, updated):
+                nonlocal done
+                with self._lock:
+                    done += 1
+                    finished = done
+                if progress_callback:
+                    progress_callback(finished, total, updated)
+
+            updated_books = self.engine.run([books[index] for index in remaining],
+                                            progress_callback=fallback_progress, start_callback=start_callback)
+            for index, updated in zip(remaining, updated_books):
+                results[index] = updated
+        return results
+
+    def _apply_listing_price(self, book_data, price):
+        """
+        Records a listing price on a copy of book_data.
+
+        Returns:
+            dict: The updated copy, or None if the price was not a valid number.
+        """
+        updated, should_fetch = prepare_book_data(copy_for_update(book_data))
+        if not should_fetch:
+            return None
+        if not record_price(updated, price):
+            return None
+        if self.journal is not None:
+            self.journal.record_observation(updated) # record_price succeeded, so last_checked moved
+        return finalize_book_data(updated)
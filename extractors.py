@@ -0,0 +1,546 @@
+import html
+import importlib.util
+import os
+import re
+import sys
+
+# Parser libraries are imported by the backend that uses them, on the first
+# fetch, so importing this module (and the GUI) stays fast.
+
+
+def _installed(module_name):
+    """True if a top-level module can be imported, without importing it."""
+    return importlib.util.find_spec(module_name) is not None
+
+
+HAS_LXML = _installed("lxml") # Optional C-accelerated backend
+HAS_SELECTOLAX = _installed("selectolax") # Optional C-accelerated backend
+
+# --- Configuration ---
+EXTRACTOR_BACKEND = "auto" # "auto", "bs4", "lxml", "selectolax" or "regex"
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Product page selectors (see extract_product_price in scraper_core)
+PRICE_SELECTORS = ('div.product-price span.price', 'meta[itemprop="price"]', 'span[itemprop="price"]')
+PRICE_SELECTOR = ', '.join(PRICE_SELECTORS)
+PRODUCT_ID_SELECTOR = '[data-cta-product-id], meta[itemprop="sku"], meta[itemprop="productID"]'
+TITLE_SELECTOR = 'meta[property="og:title"], h1'
+
+
+def _clean_price_text(text):
+    """Normalises visible price text ('8,45 €') to '8.45'."""
+    return text.replace('€', '').replace(',', '.').strip()
+
+
+def _price_selector(tag, itemprop):
+    """Which of PRICE_SELECTORS found a price element, reported as 'price_selector'."""
+    if tag == 'meta':
+        return PRICE_SELECTORS[1]
+    return PRICE_SELECTORS[2] if itemprop == 'price' else PRICE_SELECTORS[0]
+
+
+def _has_class_xpath(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+# --- Backends ---
+class Bs4Extractor:
+    """Reference backend: BeautifulSoup with the pure-Python html.parser."""
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def parse(self, content):
+        """Builds the document the *_fields methods work on (timed separately as 'parse')."""
+        return self._soup(content, 'html.parser')
+
+    def extract_product(self, content):
+        """
+        Extracts the fields we need from a product page.
+
+        Returns:
+            dict: {'price': str or None, 'title': str or None, 'product_id': str or None,
+                   'price_selector': str or None}. 'price' is the raw (unvalidated)
+                  price string, 'price_selector' the entry of PRICE_SELECTORS that found it.
+        """
+        return self.product_fields(self.parse(content))
+
+    def product_fields(self, soup):
+        info = {'price': None, 'title': None, 'product_id': None, 'price_selector': None}
+
+        price_element = soup.select_one(PRICE_SELECTOR)
+        if price_element:
+            info['price_selector'] = _price_selector(price_element.name, price_element.get('itemprop'))
+            if price_element.name == 'meta':
+                info['price'] = price_element.get('content', 'N/A').strip()
+            else:
+                info['price'] = _clean_price_text(price_element.get_text(strip=True))
+
+        id_element = soup.select_one(PRODUCT_ID_SELECTOR)
+        if id_element:
+            info['product_id'] = (id_element.get('data-cta-product-id') or id_element.get('content') or '').strip() or None
+
+        title_element = soup.select_one(TITLE_SELECTOR)
+        if title_element:
+            if title_element.name == 'meta':
+                info['title'] = title_element.get('content', '').strip() or None
+            else:
+                info['title'] = title_element.get_text(strip=True) or None
+        return info
+
+    def extract_search_items(self, content):
+        """
+        Extracts raw result items from a search results page.
+
+        Returns:
+            list: Dicts with 'title', 'href', 'price' and 'product_id' (None if missing).
+            int: Number of item containers found (with or without a title link).
+            bool: True if neither the product wrapper nor any item container was found.
+        """
+        return self.search_fields(self.parse(content))
+
+    def search_fields(self, soup):
+        product_wrapper = soup.find('div', class_='products-holder-wrapper')
+        wrapper_missing = not product_wrapper
+        if wrapper_missing:
+            product_wrapper = soup # Search whole document as fallback
+
+        book_containers = product_wrapper.find_all('div', class_='product-list-item')
+        if not book_containers:
+            book_containers = product_wrapper.find_all('div', class_='col-product')
+
+        items = []
+        for container in book_containers:
+            title_link_tag = container.select_one('div.book-properties h2 a')
+            if title_link_tag:
+                items.append({
+                    'title': title_link_tag.get_text(strip=True),
+                    'href': title_link_tag.get('href'),
+                    'price': title_link_tag.get('data-cta-price'),
+                    'product_id': title_link_tag.get('data-cta-product-id'),
+                })
+        return items, len(book_containers), wrapper_missing and not book_containers
+
+
+class LxmlExtractor:
+    """C-accelerated backend built on lxml.html and XPath."""
+    name = "lxml"
+
+    _PRICE_XPATH = (f"//div[{_has_class_xpath('product-price')}]//span[{_has_class_xpath('price')}]"
+                    " | //meta[@itemprop='price'] | //span[@itemprop='price']")
+    _ID_XPATH = "//*[@data-cta-product-id] | //meta[@itemprop='sku'] | //meta[@itemprop='productID']"
+    _TITLE_XPATH = "//meta[@property='og:title'] | //h1"
+
+    def __init__(self):
+        if not HAS_LXML:
+            raise RuntimeError("The 'lxml' extractor backend needs the 'lxml' package.")
+        import lxml.html
+        self._fromstring = lxml.html.fromstring
+
+    @staticmethod
+    def _text(element):
+        return ''.join(part.strip() for part in element.itertext())
+
+    def parse(self, content):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return self._fromstring(content) if content.strip() else None
+
+    def extract_product(self, content):
+        return self.product_fields(self.parse(content))
+
+    def product_fields(self, tree):
+        info = {'price': None, 'title': None, 'product_id': None, 'price_selector': None}
+        if tree is None:
+            return info
+
+        found = tree.xpath(self._PRICE_XPATH) # Union results come back in document order
+        if found:
+            element = found[0]
+            info['price_selector'] = _price_selector(element.tag, element.get('itemprop'))
+            if element.tag == 'meta':
+                info['price'] = element.get('content', 'N/A').strip()
+            else:
+                info['price'] = _clean_price_text(self._text(element))
+
+        found = tree.xpath(self._ID_XPATH)
+        if found:
+            element = found[0]
+            info['product_id'] = (element.get('data-cta-product-id') or element.get('content') or '').strip() or None
+
+        found = tree.xpath(self._TITLE_XPATH)
+        if found:
+            element = found[0]
+            if element.tag == 'meta':
+                info['title'] = element.get('content', '').strip() or None
+            else:
+                info['title'] = self._text(element) or None
+        return info
+
+    def extract_search_items(self, content):
+        return self.search_fields(self.parse(content))
+
+    def search_fields(self, tree):
+        if tree is None:
+            return [], 0, True
+        wrappers = tree.xpath(f"//div[{_has_class_xpath('products-holder-wrapper')}]")
+        wrapper_missing = not wrappers
+        scope = tree if wrapper_missing else wrappers[0]
+
+        book_containers = scope.xpath(f".//div[{_has_class_xpath('product-list-item')}]")
+        if not book_containers:
+            book_containers = scope.xpath(f".//div[{_has_class_xpath('col-product')}]")
+
+        items = []
+        for container in book_containers:
+            links = container.xpath(f".//div[{_has_class_xpath('book-properties')}]//h2//a")
+            if links:
+                link = links[0]
+                items.append({
+                    'title': self._text(link),
+                    'href': link.get('href'),
+                    'price': link.get('data-cta-price'),
+                    'product_id': link.get('data-cta-product-id'),
+                })
+        return items, len(book_containers), wrapper_missing and not book_containers
+
+
+class SelectolaxExtractor:
+    """C-accelerated backend built on selectolax (Lexbor engine, Modest on old releases)."""
+    name = "selectolax"
+
+    def __init__(self):
+        if not HAS_SELECTOLAX:
+            raise RuntimeError("The 'selectolax' extractor backend needs the 'selectolax' package.")
+        try:
+            from selectolax.lexbor import LexborHTMLParser as parser # selectolax 0.3.x and 1.x
+        except ImportError:
+            try:
+                from selectolax.parser import HTMLParser as parser # Older releases, Modest engine only
+            except ImportError as e:
+                raise RuntimeError(f"The installed 'selectolax' package could not be loaded: {e}") from e
+        self._parser = parser
+
+    @staticmethod
+    def _first(tree, selector):
+        """First match of a selector group in document order."""
+        matches = tree.css(selector)
+        return matches[0] if matches else None
+
+    def parse(self, content):
+        return self._parser(content)
+
+    def extract_product(self, content):
+        return self.product_fields(self.parse(content))
+
+    def product_fields(self, tree):
+        info = {'price': None, 'title': None, 'product_id': None, 'price_selector': None}
+
+        node = self._first(tree, PRICE_SELECTOR)
+        if node is not None:
+            info['price_selector'] = _price_selector(node.tag, node.attributes.get('itemprop'))
+            if node.tag == 'meta':
+                info['price'] = (node.attributes.get('content') or 'N/A').strip()
+            else:
+                info['price'] = _clean_price_text(node.text(deep=True, separator='', strip=True))
+
+        node = self._first(tree, PRODUCT_ID_SELECTOR)
+        if node is not None:
+            attrs = node.attributes
+            info['product_id'] = (attrs.get('data-cta-product-id') or attrs.get('content') or '').strip() or None
+
+        node = self._first(tree, TITLE_SELECTOR)
+        if node is not None:
+            if node.tag == 'meta':
+                info['title'] = (node.attributes.get('content') or '').strip() or None
+            else:
+                info['title'] = node.text(deep=True, separator='', strip=True) or None
+        return info
+
+    def extract_search_items(self, content):
+        return self.search_fields(self.parse(content))
+
+    def search_fields(self, tree):
+        wrapper = tree.css_first('div.products-holder-wrapper')
+        wrapper_missing = wrapper is None
+        scope = tree if wrapper_missing else wrapper
+
+        book_containers = scope.css('div.product-list-item')
+        if not book_containers:
+            book_containers = scope.css('div.col-product')
+
+        items = []
+        for container in book_containers:
+            link = container.css_first('div.book-properties h2 a')
+            if link is not None:
+                attrs = link.attributes
+                items.append({
+                    'title': link.text(deep=True, separator='', strip=True),
+                    'href': attrs.get('href'),
+                    'price': attrs.get('data-cta-price'),
+                    'product_id': attrs.get('data-cta-product-id'),
+                })
+        return items, len(book_containers), wrapper_missing and not book_containers
+
+
+def _attr_is(name, value):
+    """Regex for an attribute with exactly this value, quoted or not."""
+    return rb'\s' + name + rb'\s*=\s*(?:"' + value + rb'"|\'' + value + rb'\'|' + value + rb'(?=[\s/>]))'
+
+
+def _attr_has_class(class_name):
+    """Regex for a class attribute containing this class, quoted or not."""
+    return (rb'\sclass\s*=\s*(?:"(?:[^"]*\s)?' + class_name + rb'(?:\s[^"]*)?"'
+            rb'|\'(?:[^\']*\s)?' + class_name + rb'(?:\s[^\']*)?\'|' + class_name + rb'(?=[\s/>]))')
+
+
+_ATTR_VALUE = rb'(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))' # Quoted or unquoted, value in group 1, 2 or 3
+
+
+class RegexExtractor:
+    """
+    Fast path for product pages: regular expressions over the raw bytes,
+    without building any document tree. Only handles the product fields;
+    search pages are delegated to the best tree-based backend available.
+
+    Price elements are taken in document order like PRICE_SELECTOR; a
+    div.product-price only counts if a price element sits before its matching
+    </div>, and span text runs to the matching </span>. Pages whose tags do
+    not balance are handed to the tree-based backend instead of guessing.
+    """
+    name = "regex"
+
+    _PRICE_TAG_RE = re.compile(
+        rb'(?P<meta><meta\b[^>]*' + _attr_is(rb'itemprop', rb'price') + rb'[^>]*>)'
+        rb'|(?P<itemprop_span><span\b[^>]*' + _attr_is(rb'itemprop', rb'price') + rb'[^>]*>)'
+        rb'|(?P<div><div\b[^>]*' + _attr_has_class(rb'product-price') + rb'[^>]*>)',
+        re.IGNORECASE)
+    _INNER_PRICE_TAG_RE = re.compile(
+        rb'(?P<meta><meta\b[^>]*' + _attr_is(rb'itemprop', rb'price') + rb'[^>]*>)'
+        rb'|(?P<itemprop_span><span\b[^>]*' + _attr_is(rb'itemprop', rb'price') + rb'[^>]*>)'
+        rb'|(?P<class_span><span\b[^>]*' + _attr_has_class(rb'price') + rb'[^>]*>)',
+        re.IGNORECASE)
+    _NESTING_RE = {tag: re.compile(rb'<(/?)' + tag + rb'\b[^>]*>', re.IGNORECASE) for tag in (b'div', b'span')}
+    _CONTENT_RE = re.compile(rb'\scontent\s*=\s*' + _ATTR_VALUE, re.IGNORECASE)
+    _ID_RE = re.compile(
+        rb'\sdata-cta-product-id\s*=\s*' + _ATTR_VALUE +
+        rb'|<meta\b[^>]*(?:' + _attr_is(rb'itemprop', rb'sku') + rb'|' + _attr_is(rb'itemprop', rb'productID') + rb')[^>]*>',
+        re.IGNORECASE)
+    _TITLE_RE = re.compile(
+        rb'<meta\b[^>]*' + _attr_is(rb'property', rb'og:title') + rb'[^>]*>|<h1\b[^>]*>(?P<h1_text>.*?)</h1>',
+        re.IGNORECASE | re.DOTALL)
+    _STRIP_TAGS_RE = re.compile(rb'<[^>]+>')
+
+    def __init__(self):
+        self._tree_fallback = None
+
+    def _fallback(self):
+        if self._tree_fallback is None:
+            self._tree_fallback = get_extractor("auto")
+        return self._tree_fallback
+
+    @staticmethod
+    def _attr_value(match):
+        value = next((group for group in match.groups()[:3] if group is not None), None)
+        return None if value is None else html.unescape(value.decode('utf-8', 'replace'))
+
+    @classmethod
+    def _content_attr(cls, tag_bytes):
+        match = cls._CONTENT_RE.search(tag_bytes)
+        return cls._attr_value(match) if match else None
+
+    @classmethod
+    def _inner_text(cls, fragment):
+        # Mirrors get_text(strip=True): strip each text piece between tags and join them
+        pieces = cls._STRIP_TAGS_RE.split(fragment)
+        return ''.join(html.unescape(piece.decode('utf-8', 'replace')).strip() for piece in pieces)
+
+    @classmethod
+    def _closing_tag(cls, content, pos, tag):
+        """Start of the tag's matching end tag for an element opened just before pos, or None."""
+        depth = 1
+        for match in cls._NESTING_RE[tag].finditer(content, pos):
+            depth += -1 if match.group(1) else 1
+            if depth == 0:
+                return match.start()
+        return None
+
+    def _price_element(self, content):
+        """
+        First price element in document order.
+
+        Returns:
+            tuple: (kind, match) with kind 'meta', 'itemprop_span' or 'class_span';
+                   (None, None) if there is none; None if the tags do not balance.
+        """
+        pos = 0
+        while True:
+            match = self._PRICE_TAG_RE.search(content, pos)
+            if not match:
+                return None, None
+            if match.lastgroup != 'div':
+                return match.lastgroup, match
+            div_end = self._closing_tag(content, match.end(), b'div')
+            if div_end is None:
+                return None
+            inner = self._INNER_PRICE_TAG_RE.search(content, match.end(), div_end)
+            if inner:
+                return inner.lastgroup, inner
+            pos = match.end() # No price inside this div; later elements may still match
+
+    def parse(self, content):
+        # No document tree: the regular expressions run over the raw bytes
+        return content.encode('utf-8') if isinstance(content, str) else content
+
+    def extract_product(self, content):
+        return self.product_fields(self.parse(content))
+
+    def product_fields(self, content):
+        info = {'price': None, 'title': None, 'product_id': None, 'price_selector': None}
+
+        found = self._price_element(content)
+        if found is None:
+            return self._fallback().extract_product(content)
+        kind, match = found
+        if kind == 'meta':
+            info['price_selector'] = _price_selector('meta', 'price')
+            value = self._content_attr(match.group(0))
+            info['price'] = (value if value is not None else 'N/A').strip()
+        elif kind is not None:
+            span_end = self._closing_tag(content, match.end(), b'span')
+            if span_end is None:
+                return self._fallback().extract_product(content)
+            info['price_selector'] = _price_selector('span', 'price' if kind == 'itemprop_span' else None)
+            info['price'] = _clean_price_text(self._inner_text(content[match.end():span_end]))
+
+        match = self._ID_RE.search(content)
+        if match:
+            value = self._attr_value(match)
+            if value is None: # Matched the meta alternative
+                value = self._content_attr(match.group(0))
+            info['product_id'] = (value or '').strip() or None
+
+        match = self._TITLE_RE.search(content)
+        if match:
+            if match.group('h1_text') is not None:
+                info['title'] = self._inner_text(match.group('h1_text')) or None
+            else:
+                info['title'] = (self._content_attr(match.group(0)) or '').strip() or None
+        return info
+
+    def extract_search_items(self, content):
+        return self.search_fields(content)
+
+    def search_fields(self, content):
+        # Search pages need a tree, so the fallback's parse is part of this step
+        return self._fallback().extract_search_items(content)
+
+
+_BACKENDS = {
+    "bs4": Bs4Extractor,
+    "lxml": LxmlExtractor,
+    "selectolax": SelectolaxExtractor,
+    "regex": RegexExtractor,
+}
+_AUTO_ORDER = ("selectolax", "lxml", "bs4") # Fastest first; bs4 is a hard dependency
+_instances = {}
+
+
+def available_backends():
+    """Names of the backends that load on this machine (installed and importable)."""
+    names = []
+    for name in _BACKENDS:
+        try:
+            get_extractor(name)
+        except RuntimeError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_extractor(name=None):
+    """
+    Returns a (shared) extractor instance.
+
+    Args:
+        name (str, optional): Backend name, defaults to EXTRACTOR_BACKEND.
+                              "auto" picks selectolax, then lxml, then bs4,
+                              skipping any that is not installed or fails to load.
+    """
+    name = name or EXTRACTOR_BACKEND
+    if name in _instances:
+        return _instances[name]
+    if name == "auto":
+        for candidate in _AUTO_ORDER:
+            try:
+                extractor = get_extractor(candidate)
+            except RuntimeError:
+                continue
+            _instances["auto"] = extractor
+            return extractor
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown extractor backend '{name}'. Choose from: {', '.join(_BACKENDS)}")
+    _instances[name] = _BACKENDS[name]()
+    return _instances[name]
+
+
+# --- Cross-check Mode ---
+def cross_check(content, kind="product", backends=None):
+    """
+    Runs the same page through several backends and compares their output.
+
+    Args:
+        content (bytes): Raw HTML.
+        kind (str): "product" or "search".
+        backends (list, optional): Backend names, defaults to all available.
+
+    Returns:
+        dict: {backend_name: result} for each backend.
+        bool: True if every backend produced the same result.
+    """
+    results = {}
+    for name in backends or available_backends():
+        extractor = get_extractor(name)
+        if kind == "product":
+            results[name] = extractor.extract_product(content)
+        else:
+            items, container_count, _ = extractor.extract_search_items(content)
+            results[name] = {'container_count': container_count, 'items': items}
+    values = list(results.values())
+    return results, all(value == values[0] for value in values[1:])
+
+
+def cross_check_fixtures(directory=FIXTURES_DIR, backends=None):
+    """
+    Cross-checks every saved fixture page. Files named 'search_*.html' are
+    treated as search result pages, all other '*.html' files as product pages.
+
+    Returns:
+        list: (filename, agree, results) tuples, one per fixture.
+    """
+    report = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.html'):
+            continue
+        with open(os.path.join(directory, filename), 'rb') as f:
+            content = f.read()
+        kind = "search" if filename.startswith("search_") else "product"
+        results, agree = cross_check(content, kind=kind, backends=backends)
+        report.append((filename, agree, results))
+    return report
+
+
+if __name__ == "__main__":
+    # Usage: python extractors.py [fixtures_directory]
+    fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR
+    print(f"Backends: {', '.join(available_backends())}")
+    mismatches = 0
+    for filename, agree, results in cross_check_fixtures(fixtures_dir):
+        print(f"{'OK  ' if agree else 'DIFF'} {filename}")
+        if not agree:
+            mismatches += 1
+            for name, result in results.items():
+                print(f"    {name}: {result}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,289 @@
+import random
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from metrics import request_metrics
+
+# --- Configuration ---
+MAX_RETRIES = 3 # Extra attempts after the first one for timeouts, connection errors and RETRY_STATUSES
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+BACKOFF_BASE = 0.5 # Seconds; the backoff cap doubles with every attempt
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 120.0 # Longest Retry-After we are willing to honour
+INITIAL_CONCURRENCY = 4 # Requests in flight when a run starts; grows up to the worker count
+LATENCY_TARGET = 3.0 # Seconds; slower responses are treated as a sign of congestion
+AIMD_INCREASE = 1.0 # Concurrency added per full window of good responses
+AIMD_DECREASE = 0.5 # Concurrency multiplier after a congestion signal
+BREAKER_FAILURE_THRESHOLD = 8 # Consecutive failures that open a host's circuit
+BREAKER_RESET_TIMEOUT = 30.0 # Seconds an open circuit waits before letting one probe request through
+BREAKER_MAX_PAUSE = 300.0 # Give up on the host (fail the remaining books fast) after this long down
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while a host is considered down."""
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX, rng=random):
+    """Exponential backoff with full jitter: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value, now=None, cap=RETRY_AFTER_MAX):
+    """
+    Parses a Retry-After header (delay in seconds or an HTTP date).
+
+    Returns:
+        float: Seconds to wait (at most `cap`), or None if missing or unparsable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if retry_at is None:
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - (now or datetime.now(timezone.utc))).total_seconds()
+    return min(cap, max(0.0, seconds))
+
+
+# --- Adaptive Concurrency (AIMD) ---
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts like TCP congestion control.
+
+    Every good response adds AIMD_INCREASE / limit, so the limit grows by about
+    one per window of successful requests. A congestion signal (timeout,
+    connection error, retryable status or a response slower than
+    LATENCY_TARGET) multiplies it by AIMD_DECREASE, at most once per second so
+    a burst of failures from the same window only counts once.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=1, maximum=16, latency_target=LATENCY_TARGET):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = float('-inf')
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Blocks until a request may start."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, congested=False):
+        """Ends a request and adjusts the limit from its outcome."""
+        with self._cond:
+            self.in_flight -= 1
+            if congested or (latency is not None and latency > self.latency_target):
+                now = time.monotonic()
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(self.minimum, self.limit * AIMD_DECREASE)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.maximum, self.limit + AIMD_INCREASE / self.limit)
+            self._cond.notify_all()
+
+
+# --- Per-host Circuit Breaker ---
+class CircuitBreaker:
+    """
+    Stops sending requests to a host that is clearly down.
+
+    After BREAKER_FAILURE_THRESHOLD consecutive failures the circuit opens and
+    callers of before_request() wait (the run pauses) for BREAKER_RESET_TIMEOUT.
+    Then a single probe request is let through: success closes the circuit,
+    failure opens it again. If the host stays down for longer than
+    BREAKER_MAX_PAUSE, before_request() raises CircuitOpenError so the rest of
+    the run fails fast instead of waiting forever.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT,
+                 max_pause=BREAKER_MAX_PAUSE):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_pause = max_pause
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0 # Times the circuit has opened
+        self._opened_at = None
+        self._outage_started = None
+        self._probe_in_flight = False
+        self._cond = threading.Condition()
+
+    def before_request(self):
+        """Returns when a request may be sent; blocks while the circuit is open."""
+        with self._cond:
+            while True:
+                if self.state == self.CLOSED:
+                    return
+                now = time.monotonic()
+                if now - self._outage_started > self.max_pause:
+                    raise CircuitOpenError(f"Host unavailable for over {self.max_pause:.0f}s (circuit open)")
+                if self.state == self.OPEN:
+                    if now >= self._opened_at + self.reset_timeout:
+                        self.state = self.HALF_OPEN
+                        self._probe_in_flight = True
+                        return # This caller is the probe
+                    self._cond.wait(self._opened_at + self.reset_timeout - now)
+                elif not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return
+                else:
+                    self._cond.wait(self.reset_timeout) # Wait for the probe's outcome
+
+    def record_success(self):
+        with self._cond:
+            if self.state != self.CLOSED:
+                print("  -> Host is responding again, resuming.")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._outage_started = None
+            self._probe_in_flight = False
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    print(f"  -> {self.failures} failures in a row, pausing requests for {self.reset_timeout:.0f}s.")
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                if self._outage_started is None:
+                    self._outage_started = self._opened_at
+                self._probe_in_flight = False
+                self._cond.notify_all()
+
+    def abandon_request(self):
+        """
+        A request ended without telling whether the host is up (an unexpected
+        exception). If it was the half-open probe, the next waiting caller
+        becomes the probe instead of every caller waiting out reset_timeout.
+        """
+        with self._cond:
+            if self._probe_in_flight:
+                self._probe_in_flight = False
+                self._cond.notify_all()
+
+
+# --- Fetch Policy ---
+class FetchPolicy:
+    """
+    Retries, adaptive concurrency and per-host circuit breakers for one refresh run.
+
+    Pass it to update_book_info (policy=...) and every product-page request
+    goes through get(). Share one instance between all workers of a run; its
+    counters describe the whole run.
+    """
+
+    def __init__(self, max_concurrency=16, initial_concurrency=INITIAL_CONCURRENCY, max_retries=MAX_RETRIES,
+                 breaker_factory=CircuitBreaker, sleep=time.sleep, rng=random):
+        self.limiter = AdaptiveLimiter(initial=initial_concurrency, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.breaker_factory = breaker_factory
+        self.sleep = sleep
+        self.rng = rng
+        self.requests = 0
+        self.retries = 0
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        """The circuit breaker of the URL's host."""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = self.breaker_factory()
+            return self._breakers[host]
+
+    def get(self, http, url, **kwargs):
+        """
+        http.get(url, **kwargs) with retries.
+
+        Timeouts, connection errors and RETRY_STATUSES responses are retried up
+        to max_retries times with jittered exponential backoff, waiting at least
+        as long as a Retry-After header asks. The last response is returned even
+        if its status is an error, so the caller can report it.
+
+        Raises:
+            requests.exceptions.RequestException: The last error once retries
+                are exhausted, or CircuitOpenError if the host stays down.
+        """
+        breaker = self.breaker(url)
+        attempt = 0
+        while True:
+            breaker.before_request()
+            self.limiter.acquire()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = http.get(url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                error = e
+            except BaseException:
+                self.limiter.release()
+                breaker.abandon_request()
+                raise
+            latency = time.monotonic() - started
+            with self._lock:
+                self.requests += 1
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                self.limiter.release(latency)
+                breaker.record_success()
+                return response
+
+            self.limiter.release(latency, congested=True)
+            breaker.record_failure()
+            if attempt >= self.max_retries:
+                if response is not None:
+                    return response
+                raise error
+
+            delay = backoff_delay(attempt, rng=self.rng)
+            if response is not None:
+                reason = f"HTTP {response.status_code}"
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                response.close()
+            else:
+                reason = type(error).__name__
+            with self._lock:
+                self.retries += 1
+            request_metrics.record_retry(reason)
+            print(f"  -> {reason}, retrying in {delay:.1f}s (attempt {attempt + 2}/{self.max_retries + 1})")
+            self.sleep(delay)
+            attempt += 1
+
+    def summary(self):
+        """Counters of the run so far."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'concurrency': round(self.limiter.limit, 2),
+            'concurrency_decreases': self.limiter.decreases,
+            'circuit_opened': sum(breaker.opened for breaker in breakers),
+        }
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from scraper_core import SCRIPT_DIR
+
+# --- Configuration ---
+HTTP_CACHE_FILE = "http_cache.json" # Stored next to the script, like interested_books.json
+HTTP_CACHE_FULL_PATH = os.path.join(SCRIPT_DIR, HTTP_CACHE_FILE)
+HTTP_CACHE_MAX_ENTRIES = 20000 # Least recently used entries are evicted beyond this
+HTTP_CACHE_DEFAULT_TTL = 0 # Seconds a response without Cache-Control/Expires counts as fresh (0 = always revalidate)
+
+
+def _parse_max_age(cache_control):
+    """Returns (max_age_seconds or None, no_store, no_cache) from a Cache-Control header."""
+    max_age = None
+    no_store = no_cache = False
+    for directive in (cache_control or '').split(','):
+        name, _, value = directive.strip().partition('=')
+        name = name.strip().lower()
+        if name == 'no-store':
+            no_store = True
+        elif name == 'no-cache':
+            no_cache = True
+        elif name in ('max-age', 's-maxage') and max_age is None:
+            try:
+                max_age = int(value.strip().strip('"'))
+            except ValueError:
+                pass
+    return max_age, no_store, no_cache
+
+
+# --- Persistent HTTP Cache ---
+class HttpCache:
+    """
+    Persistent cache of HTTP validators and extracted prices, keyed by URL.
+
+    Only the small result of parsing (the raw price string) is kept, not the
+    page body: a fresh entry or a 304 Not Modified answer is enough to reuse
+    the price without downloading or parsing the page again. Entries are kept
+    in least-recently-used order and evicted beyond `max_entries`.
+    Safe to share between RefreshEngine worker threads.
+    """
+
+    def __init__(self, path=HTTP_CACHE_FULL_PATH, max_entries=HTTP_CACHE_MAX_ENTRIES, default_ttl=HTTP_CACHE_DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict() # {url: entry_dict}, oldest use first
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0 # Served fresh from cache, no request made
+        self.revalidations = 0 # 304 Not Modified answers
+        self.misses = 0
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Persistence ---
+    def load(self):
+        """Loads entries from disk, ignoring a missing or unreadable file."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable HTTP cache '{self.path}': {e}")
+            return
+        if not isinstance(stored, list):
+            return
+        with self._lock:
+            self._entries.clear()
+            for entry in stored: # Stored oldest use first
+                if isinstance(entry, dict) and entry.get('url'):
+                    self._entries[entry['url']] = entry
+            self._evict()
+
+    def save(self):
+        """Writes the cache to disk atomically if anything changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = list(self._entries.values())
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def purge(self):
+        """Removes every entry, both in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = False
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # --- Lookup & Revalidation ---
+    def lookup(self, url):
+        """
+        Returns the cache entry for `url` (marking it recently used), or None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            self._dirty = True
+            return dict(entry)
+
+    def is_fresh(self, entry):
+        """True if the entry may be used without contacting the server."""
+        fresh = entry.get('expires_at', 0) > time.time()
+        if fresh:
+            with self._lock:
+                self.hits += 1
+        return fresh
+
+    @staticmethod
+    def validator_headers(entry):
+        """Returns If-None-Match / If-Modified-Since headers for a conditional GET."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _expires_at(self, headers, now):
+        max_age, no_store, no_cache = _parse_max_age(headers.get('Cache-Control'))
+        if no_cache:
+            return now, no_store
+        if max_age is not None:
+            return now + max_age, no_store
+        expires = headers.get('Expires')
+        if expires:
+            try:
+                return parsedate_to_datetime(expires).timestamp(), no_store
+            except (TypeError, ValueError):
+                return now, no_store # Invalid Expires means already expired
+        return now + self.default_ttl, no_store
+
+    def store(self, url, headers, price):
+        """
+        Stores validators and the extracted price of a full (200) response.
+
+        Args:
+            url (str): Requested URL.
+            headers (Mapping): Response headers (case-insensitive mapping).
+            price (str): Raw price string found on the page, or None if missing.
+        """
+        now = time.time()
+        expires_at, no_store = self._expires_at(headers, now)
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        with self._lock:
+            if no_store or (not etag and not last_modified and expires_at <= now):
+                # Nothing that would let us skip a future download
+                if self._entries.pop(url, None) is not None:
+                    self._dirty = True
+                return
+            self._entries[url] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'expires_at': expires_at,
+                'fetched_at': now,
+                'price': price,
+            }
+            self._entries.move_to_end(url)
+            self._dirty = True
+            self._evict()
+
+    def revalidated(self, url, headers):
+        """Refreshes freshness (and any new validators) after a 304 Not Modified."""
+        now = time.time()
+        expires_at, _ = self._expires_at(headers, now)
+        with self._lock:
+            self.revalidations += 1
+            entry = self._entries.get(url)
+            if entry is None:
+                return
+            entry['expires_at'] = expires_at
+            entry['fetched_at'] = now
+            entry['etag'] = headers.get('ETag') or entry.get('etag')
+            entry['last_modified'] = headers.get('Last-Modified') or entry.get('last_modified')
+            self._entries.move_to_end(url)
+            self._dirty = True
+
+    def _evict(self):
+        """Drops least recently used entries beyond max_entries. Caller holds the lock."""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._dirty = True
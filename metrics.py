@@ -0,0 +1,328 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# --- Configuration ---
+TIMING_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Seconds
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304) # Response body bytes
+PHASES = ('connect', 'ttfb', 'download', 'parse', 'extract')
+METRICS_HOST = "127.0.0.1" # The Prometheus endpoint is only reachable from this machine
+METRICS_PORT = 9464
+METRICS_PREFIX = "knygos_"
+
+
+# --- Histogram ---
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style, upper bounds inclusive). Not thread-safe on its own."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimated q-quantile (0..1), interpolated linearly inside the bucket
+        like Prometheus' histogram_quantile. None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with ('+Inf', count)."""
+        pairs = []
+        total = 0
+        for bound, bucket_count in zip(self.buckets + ('+Inf',), self.counts):
+            total += bucket_count
+            pairs.append((bound, total))
+        return pairs
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': _round(self.quantile(0.5)),
+            'p99': _round(self.quantile(0.99)),
+            'max': _round(self.max),
+            'buckets': {str(bound): total for bound, total in self.cumulative()},
+        }
+
+
+def _round(value):
+    return round(value, 6) if value is not None else None
+
+
+# --- Per-request Metrics ---
+class RequestMetrics:
+    """
+    Thread-safe counters and histograms of every page fetched in the process.
+
+    Each request is split into phases:
+      connect   opening a new TCP/TLS connection (reused keep-alive connections
+                record nothing; only sessions from refresh_engine.create_session
+                are timed, see TimedHTTPAdapter)
+      ttfb      from sending the request until the response headers arrived
+                (includes connect when a new connection was needed)
+      download  reading the body
+      parse     building the document tree (the streaming scanner for streamed pages)
+      extract   running the selectors over the tree
+    Pages are counted by kind ('search' or 'product'), responses by HTTP status,
+    failures by error type, retries by reason and found prices by the entry of
+    extractors.PRICE_SELECTORS that matched.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.timings = {} # (kind, phase) -> Histogram
+            self.sizes = {} # kind -> Histogram
+            self.responses = {} # (kind, status) -> count
+            self.errors = {} # (kind, error) -> count
+            self.retries = {} # reason -> count
+            self.selectors = {} # price selector -> count
+
+    def observe(self, kind, phase, seconds):
+        """Records the duration of one phase of a request."""
+        with self._lock:
+            histogram = self.timings.get((kind, phase))
+            if histogram is None:
+                histogram = self.timings[(kind, phase)] = Histogram(TIMING_BUCKETS)
+            histogram.observe(seconds)
+
+    def record_response(self, kind, status, ttfb=None):
+        """Records the status (and time to first byte) of a received response."""
+        with self._lock:
+            self.responses[(kind, status)] = self.responses.get((kind, status), 0) + 1
+        if ttfb is not None:
+            self.observe(kind, 'ttfb', ttfb)
+
+    def record_body(self, kind, size, download=None):
+        """Records the bytes read for a response body and how long reading them took."""
+        with self._lock:
+            histogram = self.sizes.get(kind)
+            if histogram is None:
+                histogram = self.sizes[kind] = Histogram(SIZE_BUCKETS)
+            histogram.observe(size)
+        if download is not None:
+            self.observe(kind, 'download', download)
+
+    def record_error(self, kind, error):
+        """Records a request that got no usable response, e.g. 'timeout' or 'network'."""
+        with self._lock:
+            self.errors[(kind, error)] = self.errors.get((kind, error), 0) + 1
+
+    def record_retry(self, reason):
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def record_selector(self, selector):
+        """Records which price selector matched (None when no price was found)."""
+        selector = selector or 'none'
+        with self._lock:
+            self.selectors[selector] = self.selectors.get(selector, 0) + 1
+
+    def summary(self):
+        """Everything recorded since the last reset, as a JSON-serialisable dict."""
+        with self._lock:
+            pages = {}
+            for (kind, status), count in self.responses.items():
+                pages.setdefault(kind, {}).setdefault('statuses', {})[str(status)] = count
+            for (kind, error), count in self.errors.items():
+                pages.setdefault(kind, {}).setdefault('errors', {})[error] = count
+            for kind, histogram in self.sizes.items():
+                entry = pages.setdefault(kind, {})
+                entry['bytes'] = int(histogram.sum)
+                entry['size'] = histogram.snapshot()
+            for (kind, phase), histogram in sorted(self.timings.items(), key=lambda item: PHASES.index(item[0][1])):
+                pages.setdefault(kind, {}).setdefault('timings', {})[phase] = histogram.snapshot()
+            return {
+                'since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'seconds': round(time.time() - self.started, 3),
+                'pages': pages,
+                'retries': dict(self.retries),
+                'price_selectors': dict(self.selectors),
+            }
+
+    def write_json(self, path):
+        """Writes summary() to a JSON file (replaced atomically)."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def prometheus_text(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+
+        def sample(name, labels, value):
+            label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            lines.append(f"{METRICS_PREFIX}{name}{{{label_text}}} {value}" if label_text
+                         else f"{METRICS_PREFIX}{name} {value}")
+
+        def histogram_samples(name, labels, histogram):
+            for bound, total in histogram.cumulative():
+                sample(f"{name}_bucket", {**labels, 'le': bound}, total)
+            sample(f"{name}_sum", labels, histogram.sum)
+            sample(f"{name}_count", labels, histogram.count)
+
+        with self._lock:
+            header("responses_total", "counter", "Responses received, by page kind and HTTP status.")
+            for (kind, status), count in sorted(self.responses.items(), key=str):
+                sample("responses_total", {'kind': kind, 'status': status}, count)
+            header("request_errors_total", "counter", "Requests that got no usable response, by error type.")
+            for (kind, error), count in sorted(self.errors.items()):
+                sample("request_errors_total", {'kind': kind, 'error': error}, count)
+            header("retries_total", "counter", "Requests retried by the fetch policy, by reason.")
+            for reason, count in sorted(self.retries.items()):
+                sample("retries_total", {'reason': reason}, count)
+            header("price_selector_total", "counter", "Product pages by the price selector that matched.")
+            for selector, count in sorted(self.selectors.items()):
+                sample("price_selector_total", {'selector': selector}, count)
+            header("response_bytes", "histogram", "Response body size in bytes.")
+            for kind, histogram in sorted(self.sizes.items()):
+                histogram_samples("response_bytes", {'kind': kind}, histogram)
+            header("request_phase_seconds", "histogram", "Duration of each request phase in seconds.")
+            for (kind, phase), histogram in sorted(self.timings.items()):
+                histogram_samples("request_phase_seconds", {'kind': kind, 'phase': phase}, histogram)
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host=METRICS_HOST, port=METRICS_PORT):
+        """
+        Serves prometheus_text() at http://host:port/metrics on a daemon thread.
+
+        Returns:
+            ThreadingHTTPServer: Call shutdown() on it to stop serving.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_metrics = RequestMetrics() # Shared by every fetch in the process
+
+
+# --- Request Timing Helpers ---
+class ResponseTimer:
+    """
+    requests response hook that notes when the response headers arrived.
+    requests calls it before reading the body, so time.perf_counter() -
+    timer.headers_at after get() returns is the download time of a
+    non-streamed response. Pass it as hooks=timer.hooks_for(http).
+    """
+
+    def __init__(self):
+        self.headers_at = None
+
+    def hooks_for(self, http):
+        """
+        The hooks= argument for http.get(): the session's own response hooks plus this timer.
+
+        Per-request hooks replace a session's hooks of the same event in
+        requests, so they are repeated here to keep them running.
+        """
+        hooks = getattr(http, 'hooks', None) # A dict on sessions; the requests module has a 'hooks' submodule instead
+        session_hooks = (hooks.get('response') if isinstance(hooks, dict) else None) or []
+        if callable(session_hooks):
+            session_hooks = [session_hooks]
+        return {'response': [*session_hooks, self]}
+
+    def __call__(self, response, *args, **kwargs):
+        self.headers_at = time.perf_counter()
+        return response
+
+    def since_headers(self):
+        return time.perf_counter() - self.headers_at if self.headers_at is not None else None
+
+
+# --- Connect Timing ---
+class _TimedConnect:
+    """Mixin for urllib3 connections that records how long opening the socket (and TLS) took."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            request_metrics.observe(self.metrics_kind, 'connect', time.perf_counter() - started)
+
+
+class _TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    metrics_kind = 'product'
+
+
+class _TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    metrics_kind = 'product'
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections are timed as the 'connect' phase of product requests."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
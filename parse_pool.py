@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+import extractors
+
+# --- Configuration ---
+PARSE_START_METHOD = "spawn" # Safe with worker threads and Tk on every platform ("forkserver" starts faster on POSIX)
+PARSE_MAX_DEFAULT_WORKERS = 8 # Upper bound of default_parse_workers()
+
+
+def default_parse_workers():
+    """
+    Parser processes worth starting on this machine.
+
+    One per core, up to PARSE_MAX_DEFAULT_WORKERS; 0 on a single core, where
+    a separate process only adds the cost of sending the page across.
+    """
+    cores = os.cpu_count() or 1
+    return min(cores, PARSE_MAX_DEFAULT_WORKERS) if cores > 1 else 0
+
+
+# --- Worker Process Side ---
+# Top-level functions so the executor can pickle them by name.
+def _init_worker(backend):
+    extractors.EXTRACTOR_BACKEND = backend
+
+
+def _warm_up():
+    extractors.get_extractor() # Imports the parser library once per process
+    return os.getpid()
+
+
+def _parse_product(content):
+    extractor = extractors.get_extractor()
+    started = time.perf_counter()
+    document = extractor.parse(content)
+    parsed = time.perf_counter()
+    info = extractor.product_fields(document)
+    return info, parsed - started, time.perf_counter() - parsed
+
+
+def _parse_search(content):
+    extractor = extractors.get_extractor()
+    started = time.perf_counter()
+    document = extractor.parse(content)
+    parsed = time.perf_counter()
+    fields = extractor.search_fields(document)
+    return fields, parsed - started, time.perf_counter() - parsed
+
+
+# --- Parser Process Pool ---
+class ParsePool:
+    """
+    Parses fetched HTML in worker processes, outside the GIL.
+
+    Fetch threads (RefreshEngine, BulkRefresher, iter_search_pages) hand the
+    raw response bytes to a ProcessPoolExecutor and get back only the small
+    dicts the extractors produce, so parsing runs on as many cores as there
+    are workers while the other fetch threads keep downloading. Give the
+    fetch side at least as many threads as there are parser processes.
+
+    Each worker uses the extractor backend that was configured
+    (extractors.EXTRACTOR_BACKEND) when the pool was started. Processes are
+    started on first use; a pool whose worker died is replaced on the next
+    call. Pass it as parse_pool= to scraper_core.update_book_info,
+    parse_search_results, iter_search_pages or BulkRefresher.
+    """
+
+    def __init__(self, workers=None, backend=None, start_method=PARSE_START_METHOD):
+        """
+        Args:
+            workers (int, optional): Parser processes; defaults to default_parse_workers() (at least 1).
+            backend (str, optional): Extractor backend of the workers; defaults to
+                                     extractors.EXTRACTOR_BACKEND at start time.
+            start_method (str): multiprocessing start method of the workers.
+        """
+        self.workers = max(1, int(workers if workers is not None else default_parse_workers()))
+        self.backend = backend
+        self.start_method = start_method
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker, initargs=(self.backend or extractors.EXTRACTOR_BACKEND,))
+            return self._executor
+
+    def _run(self, func, content):
+        from concurrent.futures.process import BrokenProcessPool
+        executor = self._get_executor()
+        try:
+            return executor.submit(func, content).result()
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None # Start fresh processes on the next call
+            executor.shutdown(wait=False)
+            raise
+
+    def warm_up(self):
+        """Starts every worker process and loads its parser now instead of on the first page."""
+        executor = self._get_executor()
+        return len({future.result() for future in [executor.submit(_warm_up) for _ in range(self.workers)]})
+
+    def product_fields(self, content):
+        """
+        Parses a product page in a worker process.
+
+        Args:
+            content (bytes): Raw HTML of the page.
+
+        Returns:
+            tuple: (fields dict as returned by Extractor.product_fields, parse seconds, extract seconds).
+        """
+        return self._run(_parse_product, content)
+
+    def search_fields(self, content):
+        """
+        Parses a search results page in a worker process.
+
+        Returns:
+            tuple: ((items, container count, nothing found) as returned by
+                   Extractor.search_fields, parse seconds, extract seconds).
+        """
+        return self._run(_parse_search, content)
+
+    def close(self):
+        """Stops the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,323 @@
+import argparse
+import itertools
+import json
+import sys
+from array import array
+from datetime import date
+
+from price_series import PriceSeries, _date_to_ordinal, _price_to_cents
+
+# --- Configuration ---
+AVERAGE_DAYS = 30 # Window of the moving average, in calendar days
+VOLATILITY_DAYS = 90 # Daily price changes used for the volatility
+DROP_DAYS = 30 # Biggest drop from a price seen at most this many days earlier
+MAX_GRID_DAYS = 3660 # History older than this (~10 years) only counts for the all-time low/high
+ANALYTICS_METRICS = ( # (key, label) of every value computed per book
+    ('low', "Low"),
+    ('high', "High"),
+    ('vs_low', "vs Low %"),
+    ('average', f"{AVERAGE_DAYS}d Avg"),
+    ('volatility', "Volatility %"),
+    ('max_drop', f"Max {DROP_DAYS}d Drop %"),
+)
+
+
+def _import_numpy():
+    try:
+        import numpy as np # Optional and slow to import, so only loaded here
+    except ImportError:
+        raise RuntimeError("Price analytics need the 'numpy' package.") from None
+    return np
+
+
+def _rolling_max(grid, window):
+    """
+    In place: every cell becomes the max of itself and the window - 1 cells to its left.
+
+    Doubles the covered span on each pass, so it takes log2(window) passes over
+    the grid instead of one per day. NaN cells are ignored.
+    """
+    np = _import_numpy()
+    span = 1
+    while span < window:
+        step = min(span, window - span)
+        np.fmax(grid[:, step:], grid[:, :-step], out=grid[:, step:]) # NumPy buffers the overlapping views
+        span += step
+    return grid
+
+
+# --- Watchlist Analytics ---
+class PriceAnalytics:
+    """
+    Price statistics of a whole watchlist, computed in one NumPy batch.
+
+    Every book's price_history is converted to a PriceSeries once and kept,
+    keyed by book key; later calls only convert the books whose history
+    changed (new entries are appended to the cached series). compute() then
+    joins the series buffers into flat arrays and works on all books at once:
+      low / high   all-time lowest and highest price (EUR)
+      vs_low       current price above the all-time low, in %
+      average      mean daily price over the last average_days days
+      volatility   standard deviation of the daily price changes over the
+                   last volatility_days days, in %
+      max_drop     biggest fall from a price seen at most drop_days days
+                   earlier to a later price, in % of the earlier price
+    The time-based values use a books x days grid where each book's last
+    known price carries forward to the following days (and up to today).
+    Values that cannot be computed for a book are None.
+    """
+
+    def __init__(self, average_days=AVERAGE_DAYS, volatility_days=VOLATILITY_DAYS, drop_days=DROP_DAYS,
+                 max_grid_days=MAX_GRID_DAYS):
+        self.average_days = max(1, average_days)
+        self.volatility_days = max(2, volatility_days)
+        self.drop_days = max(1, drop_days)
+        self.max_grid_days = max(self.average_days, self.volatility_days + 1, self.drop_days + 1, max_grid_days)
+        self._series = {} # key -> (history length, last entry, PriceSeries)
+        self._day_of = {} # date string -> day ordinal, shared by every book
+        self._cents_of = {} # price string -> cents, shared by every book
+
+    def _convert(self, history):
+        """
+        PriceSeries of a whole history, converted in bulk.
+
+        Every book is checked on the same few thousand dates at a few hundred
+        distinct prices, so each distinct string is parsed once (and kept for
+        the next book) and the per-entry work is a dict lookup done by
+        np.fromiter. Histories with a malformed entry take the entry-by-entry
+        path of PriceSeries.from_history, which skips just that entry.
+        """
+        np = _import_numpy()
+        flat = list(itertools.chain.from_iterable(history))
+        if len(flat) == 2 * len(history):
+            try:
+                days = self._lookup(np, self._day_of, flat[0::2], _date_to_ordinal)
+                cents = self._lookup(np, self._cents_of, flat[1::2], _price_to_cents)
+            except (ValueError, TypeError, OverflowError):
+                pass
+            else:
+                run_starts = np.flatnonzero(cents[1:] != cents[:-1]).astype(np.int32) + 1 # Where the price changes
+                if len(cents):
+                    run_starts = np.concatenate((np.zeros(1, dtype=np.int32), run_starts))
+                return PriceSeries(array('i', days.tobytes()), array('i', run_starts.tobytes()),
+                                   array('i', cents[run_starts].tobytes()))
+        return PriceSeries.from_history(history, skip_invalid=True, strict=False)
+
+    @staticmethod
+    def _lookup(np, memo, values, convert):
+        """int32 array of convert(value) for every value, parsing only the strings not in memo yet."""
+        try:
+            return np.fromiter(map(memo.__getitem__, values), dtype=np.int32, count=len(values))
+        except KeyError:
+            for value in set(values).difference(memo):
+                memo[value] = convert(value, strict=False)
+            return np.fromiter(map(memo.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def series_for(self, key, history):
+        """
+        The cached PriceSeries of a book, updated if its history changed.
+
+        Args:
+            key (str): Book key.
+            history (list): The book's price_history.
+
+        Returns:
+            PriceSeries: Malformed entries are skipped.
+        """
+        history = history or []
+        cached = self._series.get(key)
+        if cached is not None:
+            length, last_entry, series = cached
+            if length == len(history) and (not length or history[-1] == last_entry):
+                return series
+            if 0 < length < len(history) and history[length - 1] == last_entry: # Only new entries at the end
+                for entry in history[length:]:
+                    try:
+                        series.append(*entry, strict=False)
+                    except (ValueError, TypeError):
+                        pass
+                self._series[key] = (len(history), history[-1], series)
+                return series
+        series = self._convert(history)
+        self._series[key] = (len(history), history[-1] if history else None, series)
+        return series
+
+    def compute(self, books, key_func, today=None):
+        """
+        Computes ANALYTICS_METRICS for every book.
+
+        Cached series of books that are not in `books` are dropped, so pass
+        the whole watchlist every time.
+
+        Args:
+            books (iterable): Book data dicts.
+            key_func (callable): Returns the key of a book (e.g. scraper_core.book_key).
+            today (date, optional): Last day of the grid; defaults to today.
+
+        Returns:
+            dict: {key: {metric: value or None}}.
+
+        Raises:
+            RuntimeError: If numpy is not installed.
+        """
+        np = _import_numpy()
+        keys = []
+        series_list = []
+        for book_data in books:
+            key = key_func(book_data)
+            keys.append(key)
+            series_list.append(self.series_for(key, book_data.get('price_history')))
+        self._series = {key: self._series[key] for key in keys}
+        count = len(keys)
+        if not count:
+            return {}
+
+        # Flat arrays of every observation and every run, book after book
+        counts = np.fromiter((len(series.days) for series in series_list), dtype=np.int64, count=count)
+        run_counts = np.fromiter((len(series.run_cents) for series in series_list), dtype=np.int64, count=count)
+        days = np.frombuffer(b''.join(series.days.tobytes() for series in series_list), dtype=np.int32)
+        run_starts = np.frombuffer(b''.join(series.run_starts.tobytes() for series in series_list), dtype=np.int32)
+        run_cents = np.frombuffer(b''.join(series.run_cents.tobytes() for series in series_list), dtype=np.int32)
+        empty = np.full(count, np.nan)
+        result = {'low': empty.copy(), 'high': empty.copy(), 'vs_low': empty.copy(), 'average': empty.copy(),
+                  'volatility': empty.copy(), 'max_drop': empty.copy()}
+
+        has_data = counts > 0
+        if has_data.any():
+            obs_offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            run_offsets = np.concatenate(([0], np.cumsum(run_counts)[:-1]))
+            book_of_run = np.repeat(np.arange(count), run_counts)
+            run_first_obs = run_starts + obs_offsets[book_of_run] # Index in `days` where each run starts
+
+            # All-time values only need the runs
+            first_runs = run_offsets[has_data]
+            low = np.minimum.reduceat(run_cents, first_runs)
+            high = np.maximum.reduceat(run_cents, first_runs)
+            result['low'][has_data] = low / 100
+            result['high'][has_data] = high / 100
+
+            # Daily grid, books x days, with each price carried forward until the next observation
+            end_day = max(int(days.max()), (today or date.today()).toordinal())
+            start_day = max(int(days.min()), end_day - self.max_grid_days + 1)
+            width = end_day - start_day + 1
+            backwards = np.flatnonzero(np.diff(days) < 0) + 1
+            if np.isin(backwards, obs_offsets).all(): # Every history is in date order
+                # The price only changes where a run starts, so the runs alone describe the grid
+                point_books, point_days, point_cents = book_of_run, days[run_first_obs], run_cents
+            else:
+                run_lengths = np.diff(np.append(run_first_obs, len(days)))
+                point_books = np.repeat(np.arange(count), counts)
+                order = np.lexsort((days, point_books)) # Stable, so same-day entries keep their order
+                point_books, point_days = point_books[order], days[order]
+                point_cents = np.repeat(run_cents, run_lengths)[order]
+            cells = point_books * width + np.clip(point_days - start_day, 0, width - 1) # Older history lands on day 0
+            latest = np.append(cells[1:] != cells[:-1], True) # Last price of each book and day
+            cells, point_books = cells[latest], point_books[latest]
+            # Each row is a NaN segment up to the book's first price, then every price
+            # repeated until the next one, so a single np.repeat builds the whole grid
+            per_book = np.bincount(point_books, minlength=count)
+            nan_slots = np.arange(count) + np.concatenate(([0], np.cumsum(per_book)[:-1]))
+            price_slots = np.arange(len(cells)) + point_books + 1
+            values = np.full(count + len(cells), np.nan, dtype=np.float32)
+            values[price_slots] = point_cents[latest]
+            starts = np.empty(count + len(cells), dtype=np.int64)
+            starts[nan_slots] = np.arange(count) * width
+            starts[price_slots] = cells
+            grid = np.repeat(values, np.diff(np.append(starts, count * width))).reshape(count, width)
+
+            current = grid[:, -1] # Latest price by date
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result['vs_low'] = np.where(result['low'] > 0, (current / 100 - result['low']) / result['low'] * 100, np.nan)
+
+            window = grid[:, -self.average_days:]
+            known = (~np.isnan(window)).sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result['average'] = np.where(known > 0, np.nansum(window, axis=1) / known / 100, np.nan)
+
+                changes = np.diff(np.log(grid[:, -(self.volatility_days + 1):]), axis=1)
+                known = (~np.isnan(changes)).sum(axis=1)
+                mean = np.nansum(changes, axis=1) / known
+                variance = np.nansum((changes - mean[:, None]) ** 2, axis=1) / (known - 1)
+                result['volatility'] = np.where(known > 1, np.sqrt(variance) * 100, np.nan)
+
+                peaks = _rolling_max(grid.copy(), self.drop_days + 1)
+                drops = np.fmax.reduce((peaks - grid) / peaks, axis=1)
+                result['max_drop'] = drops * 100
+
+        rounded = {name: np.round(values.astype(np.float64), 2 if name in ('low', 'high', 'average') else 1).tolist()
+                   for name, values in result.items()}
+        return {key: {name: (None if values[index] != values[index] else values[index]) # NaN -> None
+                      for name, values in rounded.items()}
+                for index, key in enumerate(keys)}
+
+
+def format_metric(name, value):
+    """Display text of one metric: EUR with two decimals, percentages with one, '' if missing."""
+    if value is None:
+        return ''
+    return f"{value:.2f}" if name in ('low', 'high', 'average') else f"{value:.1f}"
+
+
+def analytics_sort_value(metrics, name):
+    """Sort key for one metric; books without the value sort after the others."""
+    value = (metrics or {}).get(name)
+    return (1, 0.0) if value is None else (0, value)
+
+
+# --- Headless Report ---
+def main(argv=None):
+    from refresh_cli import load_watchlist
+    from scraper_core import INTERESTED_BOOKS_FULL_PATH, book_key
+
+    parser = argparse.ArgumentParser(description="Print price analytics of the saved watchlist (no network access).")
+    parser.add_argument("--storage", choices=("json", "sqlite", "journal"), default="json")
+    parser.add_argument("--file", default=None,
+                        help="Watchlist file (default: interested_books.json, or interested_books.db for sqlite).")
+    parser.add_argument("--sort", choices=[name for name, _ in ANALYTICS_METRICS], default='vs_low',
+                        help="Metric to sort by (default: vs_low, the books closest to their all-time low first).")
+    parser.add_argument("--reverse", action="store_true", help="Sort in descending order.")
+    parser.add_argument("--top", type=int, default=0, help="Only show this many books (0 = all).")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table.")
+    args = parser.parse_args(argv)
+
+    path = args.file
+    if path is None:
+        if args.storage == "sqlite":
+            from sqlite_store import WATCHLIST_DB_FULL_PATH
+            path = WATCHLIST_DB_FULL_PATH
+        else:
+            path = INTERESTED_BOOKS_FULL_PATH
+    try:
+        books, handle = load_watchlist(args.storage, path)
+    except (OSError, ValueError) as e:
+        print(f"Could not load the watchlist: {e}", file=sys.stderr)
+        return 2
+    if handle is not None:
+        handle.close()
+
+    try:
+        analytics = PriceAnalytics().compute(books, book_key)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    missing = [book_data for book_data in books if analytics[book_key(book_data)][args.sort] is None]
+    books = [book_data for book_data in books if analytics[book_key(book_data)][args.sort] is not None]
+    books.sort(key=lambda book_data: analytics[book_key(book_data)][args.sort], reverse=args.reverse)
+    books += missing # Books without the value come last in either direction
+    if args.top > 0:
+        books = books[:args.top]
+    if args.json:
+        print(json.dumps([{'key': book_key(book_data), 'title': book_data.get('title'),
+                           'price': book_data.get('price'), **analytics[book_key(book_data)]}
+                          for book_data in books], ensure_ascii=False))
+        return 0
+    print(f"{'Title':<40}{'Price':>8}" + "".join(f"{label:>16}" for _, label in ANALYTICS_METRICS))
+    for book_data in books:
+        metrics = analytics[book_key(book_data)]
+        cells = "".join(f"{format_metric(name, metrics[name]) or '-':>16}" for name, _ in ANALYTICS_METRICS)
+        print(f"{str(book_data.get('title', ''))[:39]:<40}{book_data.get('price', 'N/A'):>8}{cells}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
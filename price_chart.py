@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from datetime import date
+
+from price_series import PriceSeries
+
+# --- Configuration ---
+CHART_MAX_POINTS = 1000 # Points drawn per book at most; longer histories are downsampled keeping min/max
+CHART_MAX_SERIES = 8 # Selected books overlaid in one chart at most
+CHART_CACHE_SIZE = 256 # Books whose prepared points are kept for quick re-selection
+CHART_MARKER_POINTS = 60 # Series with at most this many points also get a marker per point
+CHART_STYLES = ('seaborn-v0_8-darkgrid', 'seaborn-darkgrid', 'ggplot') # First one available is used
+
+
+def downsample_minmax(xs, ys, max_points=CHART_MAX_POINTS):
+    """
+    Reduces a series to at most max_points points for display.
+
+    The points are split into max_points // 4 buckets of consecutive points
+    and each bucket keeps its first, last, lowest and highest point (M4
+    downsampling), in their original order. Every local minimum and maximum
+    that a bucket's pixel column could show survives, so spikes and drops
+    stay visible.
+
+    Args:
+        xs, ys: NumPy arrays of equal length. Points out of x order are
+                sorted first (stably, so equal xs keep their order).
+        max_points (int): Upper bound of the returned points.
+
+    Returns:
+        tuple: (xs, ys) NumPy arrays; the inputs themselves if already short enough.
+    """
+    import numpy as np # Comes with matplotlib, only needed once a chart is drawn
+
+    count = len(xs)
+    buckets = max(1, max_points // 4)
+    if count <= max_points or count <= 4:
+        return xs, ys
+    if (np.diff(xs) < 0).any():
+        order = np.argsort(xs, kind='stable')
+        xs, ys = xs[order], ys[order]
+    bucket = np.arange(count) * buckets // count
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:], count) - 1
+    order = np.lexsort((ys, bucket)) # By bucket, then by price
+    keep = np.unique(np.concatenate((starts, ends, order[starts], order[ends])))
+    return xs[keep], ys[keep]
+
+
+def step_points(series):
+    """
+    Points of a price series drawn as a step line: one per price change.
+
+    Prices only change where a run starts, so those points (plus the last
+    observation, to draw the final step) describe the whole history exactly,
+    however many daily observations it has. A history that is out of date
+    order or has several entries for one day (edited or merged by hand) is
+    first sorted by day, keeping the last price recorded for each day.
+
+    Returns:
+        tuple: (day ordinals in ascending order, prices in EUR) NumPy arrays.
+    """
+    import numpy as np
+
+    days, run_starts, run_cents = series.as_numpy()
+    if not len(days):
+        return np.empty(0), np.empty(0)
+    if (np.diff(days) <= 0).any():
+        cents = np.repeat(run_cents, np.diff(np.append(run_starts, len(days))))
+        order = np.argsort(days, kind='stable') # Same-day entries keep their recorded order
+        days, cents = days[order], cents[order]
+        last_of_day = np.append(days[1:] != days[:-1], True)
+        days, cents = days[last_of_day], cents[last_of_day]
+        run_starts = np.flatnonzero(np.diff(cents, prepend=cents[0] - 1))
+        run_cents = cents[run_starts]
+    xs = days[run_starts].astype(np.float64)
+    ys = run_cents / 100
+    if days[-1] > xs[-1]:
+        xs = np.append(xs, days[-1]) # The current price lasts until the last check
+        ys = np.append(ys, ys[-1])
+    return xs, ys
+
+
+# --- Embedded Price Chart ---
+class PriceChart:
+    """
+    Price history chart embedded in a Tk container, reused for every selection.
+
+    The matplotlib Figure, its axes and one Line2D per overlaid book are
+    created once; plot() only swaps the line data and redraws through
+    draw_idle(), so switching the selection costs a single repaint. Each
+    book's points (step points, downsampled with downsample_minmax) are
+    cached by book key until its history changes.
+    """
+
+    def __init__(self, parent, max_points=CHART_MAX_POINTS, max_series=CHART_MAX_SERIES):
+        """
+        Args:
+            parent (tk.Widget): Container the canvas and toolbar are packed into.
+            max_points (int): Points drawn per book at most.
+            max_series (int): Books overlaid at most.
+
+        Raises:
+            ImportError: If matplotlib is not installed.
+        """
+        # Imported here: matplotlib takes longer to load than the rest of the app
+        import matplotlib.dates as mdates
+        import matplotlib.style
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+        for style in CHART_STYLES:
+            if style in matplotlib.style.available:
+                matplotlib.style.use(style)
+                break
+        self.max_points = max_points
+        self.max_series = max_series
+        self._epoch = mdates.date2num(date(1970, 1, 1)) - date(1970, 1, 1).toordinal() # Day ordinal -> date number
+        self._points = OrderedDict() # key -> (history length, last entry, xs, ys)
+
+        self.figure = Figure(figsize=(10, 3), dpi=100)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_ylabel("Price (EUR)")
+        self.ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+        self.ax.xaxis_date()
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=4, maxticks=10))
+        self.lines = [self.ax.plot([], [], drawstyle='steps-post', visible=False)[0] for _ in range(max_series)]
+        self.figure.subplots_adjust(left=0.06, right=0.98, top=0.88, bottom=0.14) # Fixed: a layout engine re-measures every label on each draw
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, parent, pack_toolbar=False) # Zoom and pan
+        self.toolbar.pack(side='bottom', fill='x')
+        self.canvas.get_tk_widget().pack(side='top', fill='both', expand=True)
+
+    def points(self, key, history):
+        """Cached (date numbers, prices) of one book, ready to draw."""
+        history = history or []
+        cached = self._points.get(key)
+        if cached is not None and cached[0] == len(history) and (not history or cached[1] == history[-1]):
+            self._points.move_to_end(key)
+            return cached[2], cached[3]
+        series = PriceSeries.from_history(history, skip_invalid=True, strict=False)
+        xs, ys = step_points(series)
+        xs, ys = downsample_minmax(xs + self._epoch, ys, self.max_points)
+        self._points[key] = (len(history), history[-1] if history else None, xs, ys)
+        if len(self._points) > CHART_CACHE_SIZE:
+            self._points.popitem(last=False)
+        return xs, ys
+
+    def plot(self, books):
+        """
+        Shows the price history of the given books, replacing what was shown.
+
+        Args:
+            books (list): (key, title, price_history) tuples; only the first
+                          max_series are drawn.
+
+        Returns:
+            int: Books drawn.
+        """
+        titles = []
+        for key, title, history in books[:self.max_series]:
+            xs, ys = self.points(key, history)
+            if not len(xs):
+                continue # Nothing valid to draw for this book
+            line = self.lines[len(titles)]
+            line.set_data(xs, ys)
+            line.set_label(title)
+            line.set_marker('o' if len(xs) <= CHART_MARKER_POINTS else '')
+            line.set_visible(True)
+            titles.append(title)
+        drawn = len(titles)
+        for line in self.lines[drawn:]:
+            line.set_visible(False)
+            line.set_label('_hidden') # Labels starting with _ are left out of the legend
+
+        if drawn == 1:
+            self.ax.set_title(f"Price History for '{titles[0]}'")
+        elif drawn:
+            self.ax.set_title(f"Price History ({drawn} books)")
+        else:
+            self.ax.set_title("No price history for the selected book(s)")
+        legend = self.ax.get_legend()
+        if drawn > 1:
+            self.ax.legend(loc='upper left', fontsize='small')
+        elif legend is not None:
+            legend.remove()
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+        self.toolbar.update() # The new data is the toolbar's "home" view
+        self.canvas.draw_idle()
+        return drawn
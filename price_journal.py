@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from scraper_core import INTERESTED_BOOKS_FULL_PATH, book_key, dump_books_json
+
+# --- Configuration ---
+JOURNAL_SUFFIX = ".journal" # interested_books.json.journal next to the snapshot
+COMPACT_INTERVAL = 300 # Seconds between background compaction checks
+COMPACT_MIN_BYTES = 256 * 1024 # Journal size that triggers a background compaction
+JOURNAL_FSYNC = True # fsync after each append, so an observation survives a crash
+
+
+# --- Append-only Price History Journal ---
+class PriceJournal:
+    """
+    Price history persisted as a snapshot plus an append-only journal.
+
+    The snapshot is a normal interested_books.json file. Every change after it
+    (a new price observation, an added or removed book) is appended to the
+    journal as one JSON line, so a refresh of thousands of books writes a few
+    KB instead of rewriting the whole file. Loading reads the snapshot and
+    replays the journal; compaction folds the journal back into a new snapshot.
+
+    A crash can at worst leave a truncated last journal line, which is skipped
+    on load; the snapshot itself is only ever replaced atomically. How an
+    interrupted compaction is finished or rolled back is described in compact().
+    """
+
+    def __init__(self, snapshot_path=INTERESTED_BOOKS_FULL_PATH):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + JOURNAL_SUFFIX
+        self._compacting_path = self.journal_path + ".compacting" # Rotated journal being folded in
+        self._compacted_path = snapshot_path + ".compacted" # New snapshot, complete once _folded_path exists
+        self._folded_path = self.journal_path + ".folded" # Rotated journal already in _compacted_path
+        self._lock = threading.Lock() # Guards the journal file handle
+        self._compact_lock = threading.Lock() # One compaction at a time
+        self._file = None
+        self._stop_event = threading.Event()
+        self._compact_thread = None
+
+    # --- Appending ---
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, 'a+', encoding='utf-8')
+                if self._file.tell() > 0:
+                    self._file.seek(self._file.tell() - 1)
+                    if self._file.read(1) != "\n":
+                        self._file.write("\n") # Terminate a line torn by an earlier crash
+            self._file.write(line)
+            self._file.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(self._file.fileno())
+
+    def record_observation(self, book_data, date_str=None, price=None):
+        """
+        Appends one price observation for a book.
+
+        Also called for checks that found the price unchanged, so the book's
+        'last_checked' (used by refresh_scheduler) survives a reload.
+
+        Args:
+            book_data (dict): The refreshed book (used for its key and title).
+            date_str (str, optional): 'YYYY-MM-DD', defaults to the last history entry's date.
+            price (str, optional): Price string, defaults to the last history entry's price.
+        """
+        key = book_key(book_data)
+        if not key:
+            return
+        if date_str is None or price is None:
+            history = book_data.get('price_history') or []
+            if not history:
+                return
+            date_str, price = history[-1]
+        self._append({'op': 'observe', 'key': key, 'date': date_str, 'price': price,
+                      'title': book_data.get('title'), 'checked': book_data.get('last_checked')})
+
+    def record_upsert(self, book_data):
+        """Appends a whole book (used when a book is added to the watchlist)."""
+        key = book_key(book_data)
+        if key:
+            self._append({'op': 'upsert', 'key': key, 'book': book_data})
+
+    def record_remove(self, key):
+        """Appends the removal of a book."""
+        self._append({'op': 'remove', 'key': key})
+
+    def close(self):
+        """Stops background compaction and closes the journal file."""
+        self.stop_background_compaction()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # --- Loading ---
+    @staticmethod
+    def _apply(books_by_key, record):
+        op = record.get('op')
+        key = record.get('key')
+        if op == 'upsert' and isinstance(record.get('book'), dict):
+            books_by_key[key] = record['book']
+        elif op == 'remove':
+            books_by_key.pop(key, None)
+        elif op == 'observe' and key in books_by_key:
+            book_data = books_by_key[key]
+            history = book_data.setdefault('price_history', [])
+            entry = [record['date'], record['price']]
+            if not history or history[-1] != entry: # Same rule as record_price: no duplicate entries
+                history.append(entry)
+            book_data['price'] = record['price']
+            book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} ({record['price']} EUR)"
+            book_data.pop('error', None)
+            if record.get('checked'):
+                book_data['last_checked'] = record['checked']
+
+    def _replay(self, path, books_by_key):
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"Skipping unreadable journal line {line_number} in {path} (interrupted write?)")
+                    continue
+                self._apply(books_by_key, record)
+                applied += 1
+        return applied
+
+    def _recover(self):
+        """Finishes or rolls back a compaction that was interrupted (see compact)."""
+        if os.path.exists(self._folded_path):
+            if os.path.exists(self._compacted_path): # Stopped before the snapshot was swapped
+                os.replace(self._compacted_path, self.snapshot_path)
+            os.remove(self._folded_path)
+        elif os.path.exists(self._compacted_path):
+            os.remove(self._compacted_path) # Possibly incomplete; the rotated journal is replayed instead
+
+    def _read_state(self, include_current=True):
+        """Snapshot + pending journals as an ordered {key: book_data} dict."""
+        self._recover()
+        books_by_key = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            for book_data in snapshot if isinstance(snapshot, list) else []:
+                if isinstance(book_data, dict) and book_key(book_data):
+                    books_by_key[book_key(book_data)] = book_data
+
+        if os.path.exists(self._compacting_path):
+            self._replay(self._compacting_path, books_by_key)
+        if include_current:
+            self._replay(self.journal_path, books_by_key)
+        return books_by_key
+
+    def load(self):
+        """
+        Loads the watchlist: the snapshot with every journal record replayed on top.
+
+        Returns:
+            list: Book dicts in the interested_books.json format, or None if
+                  neither a snapshot nor a journal exists.
+        """
+        if not any(os.path.exists(path) for path in (self.snapshot_path, self.journal_path, self._compacting_path,
+                                                     self._folded_path)):
+            return None
+        with self._compact_lock: # Don't read while a compaction swaps files
+            return list(self._read_state().values())
+
+    # --- Compaction ---
+    def journal_size(self):
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+    def compact(self):
+        """
+        Folds the journal into a new snapshot.
+
+        The journal is first rotated aside, so appends can continue while the
+        new snapshot is built from the old snapshot plus the rotated journal.
+        Renames mark each step, so a crash at any point is resolved on the
+        next load without comparing file times:
+          1. journal -> .compacting       (replayed on top of the old snapshot)
+          2. new snapshot -> .compacted   (written and fsynced in full)
+          3. .compacting -> .folded       (the new snapshot now holds its records)
+          4. .compacted -> snapshot, then .folded is removed
+        A leftover .compacted without .folded is discarded; with .folded it
+        replaces the snapshot.
+
+        Returns:
+            int: Number of books in the new snapshot.
+        """
+        with self._compact_lock:
+            with self._lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                if os.path.exists(self.journal_path) and not os.path.exists(self._compacting_path):
+                    os.replace(self.journal_path, self._compacting_path)
+
+            books_by_key = self._read_state(include_current=False)
+            with open(self._compacted_path, 'w', encoding='utf-8') as f:
+                count = dump_books_json(books_by_key.values(), f)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self._compacting_path):
+                os.replace(self._compacting_path, self._folded_path)
+            os.replace(self._compacted_path, self.snapshot_path)
+            if os.path.exists(self._folded_path):
+                os.remove(self._folded_path)
+            print(f"Compacted price journal into {os.path.basename(self.snapshot_path)} ({count} books) at {datetime.now():%H:%M:%S}.")
+            return count
+
+    def write_snapshot(self, books):
+        """
+        Replaces the snapshot with `books` and discards the journal (e.g. after a manual load).
+
+        `books` may be a generator; it is written one book at a time. Returns the number written.
+        """
+        with self._compact_lock:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                count = dump_books_json(books, f)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                os.replace(tmp_path, self.snapshot_path)
+                for path in (self.journal_path, self._compacting_path, self._folded_path, self._compacted_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+        return count
+
+    def start_background_compaction(self, interval=COMPACT_INTERVAL, min_bytes=COMPACT_MIN_BYTES):
+        """Starts a daemon thread that compacts whenever the journal grows past min_bytes."""
+        if self._compact_thread is not None:
+            return
+
+        def run():
+            while not self._stop_event.wait(interval):
+                if self.journal_size() >= min_bytes:
+                    try:
+                        self.compact()
+                    except (OSError, ValueError) as e:
+                        print(f"Background journal compaction failed: {e}")
+
+        self._stop_event.clear()
+        self._compact_thread = threading.Thread(target=run, daemon=True)
+        self._compact_thread.start()
+
+    def stop_background_compaction(self):
+        if self._compact_thread is not None:
+            self._stop_event.set()
+            self._compact_thread.join(timeout=5)
+            self._compact_thread = None
@@ -0,0 +1,160 @@
+import struct
+from array import array
+from datetime import date
+
+_HEADER = struct.Struct('<II') # (observation count, run count)
+
+
+def _price_to_cents(price_str, strict=True):
+    """'8.45' -> 845. In strict mode raises ValueError for anything that would not round-trip."""
+    cents = round(float(price_str) * 100)
+    if strict and _cents_to_price(cents) != price_str:
+        raise ValueError(f"price '{price_str}' is not in the canonical 0.00 format")
+    return cents
+
+
+def _cents_to_price(cents):
+    return f"{cents / 100:.2f}"
+
+
+def _date_to_ordinal(date_str, strict=True):
+    """'2025-04-04' -> proleptic Gregorian day number. In strict mode raises ValueError if not canonical."""
+    day = date.fromisoformat(date_str)
+    if strict and day.isoformat() != date_str:
+        raise ValueError(f"date '{date_str}' is not in the YYYY-MM-DD format")
+    return day.toordinal()
+
+
+# --- Compact Price History ---
+class PriceSeries:
+    """
+    Compact, array-backed form of one book's price_history.
+
+    Dates are stored as integer day ordinals in an array('i'). Prices are
+    run-length encoded: only the positions where the price changes are kept
+    (run_starts) together with the price of each run in integer cents
+    (run_cents). A book checked daily for years at a handful of distinct
+    prices therefore costs 4 bytes per observation plus 8 bytes per change,
+    instead of a Python list and two strings per observation.
+
+    Conversion to and from the JSON [[date_str, price_str], ...] lists is
+    lossless, including the original entry order.
+    """
+    __slots__ = ('days', 'run_starts', 'run_cents')
+
+    def __init__(self, days=None, run_starts=None, run_cents=None):
+        self.days = days if days is not None else array('i')
+        self.run_starts = run_starts if run_starts is not None else array('i')
+        self.run_cents = run_cents if run_cents is not None else array('i')
+
+    def __len__(self):
+        return len(self.days)
+
+    def __eq__(self, other):
+        return (isinstance(other, PriceSeries) and self.days == other.days
+                and self.run_starts == other.run_starts and self.run_cents == other.run_cents)
+
+    @property
+    def nbytes(self):
+        """Bytes used by the three buffers."""
+        return sum(buf.itemsize * len(buf) for buf in (self.days, self.run_starts, self.run_cents))
+
+    # --- Conversion ---
+    @classmethod
+    def from_history(cls, history, skip_invalid=False, strict=True):
+        """
+        Builds a series from a price_history list.
+
+        Args:
+            history (list): [[date_str, price_str], ...] as stored in the JSON file.
+            skip_invalid (bool): Drop malformed entries instead of raising.
+            strict (bool): Reject values that would not convert back to the exact
+                           same strings. Pass False when only plotting/analysing.
+
+        Raises:
+            ValueError: If an entry is malformed (or not in the canonical
+                        'YYYY-MM-DD' / '0.00' format) and skip_invalid is False.
+        """
+        series = cls()
+        for entry in history:
+            try:
+                date_str, price_str = entry
+                series.append(date_str, price_str, strict=strict)
+            except (ValueError, TypeError) as e:
+                if not skip_invalid:
+                    raise ValueError(f"Invalid price history entry {entry!r}: {e}") from None
+        return series
+
+    def to_history(self):
+        """Returns the equivalent [[date_str, price_str], ...] list."""
+        history = []
+        run_ends = list(self.run_starts[1:]) + [len(self.days)]
+        for start, end, cents in zip(self.run_starts, run_ends, self.run_cents):
+            price_str = _cents_to_price(cents)
+            history.extend([date.fromordinal(day).isoformat(), price_str] for day in self.days[start:end])
+        return history
+
+    def append(self, date_str, price_str, strict=True):
+        """Appends one observation (same format as a price_history entry)."""
+        day = _date_to_ordinal(date_str, strict)
+        cents = _price_to_cents(price_str, strict)
+        if not self.run_cents or self.run_cents[-1] != cents:
+            self.run_starts.append(len(self.days))
+            self.run_cents.append(cents)
+        self.days.append(day)
+
+    # --- Access ---
+    def dates(self):
+        """Observation dates as datetime.date objects (for plotting)."""
+        return [date.fromordinal(day) for day in self.days]
+
+    def cents(self):
+        """Price of every observation in cents, expanded from the runs."""
+        expanded = array('i')
+        run_ends = list(self.run_starts[1:]) + [len(self.days)]
+        for start, end, cents in zip(self.run_starts, run_ends, self.run_cents):
+            expanded.extend([cents] * (end - start))
+        return expanded
+
+    def prices(self):
+        """Price of every observation in EUR as floats (for plotting)."""
+        return [cents / 100 for cents in self.cents()]
+
+    def last_price_cents(self):
+        return self.run_cents[-1] if self.run_cents else None
+
+    def as_numpy(self):
+        """
+        Zero-copy NumPy views of the buffers.
+
+        Returns:
+            tuple: (days, run_starts, run_cents) as int32 ndarrays.
+        """
+        try:
+            import numpy as np # Optional and slow to import, so only loaded here
+        except ImportError:
+            raise RuntimeError("as_numpy() needs the 'numpy' package.") from None
+        return tuple(np.frombuffer(buf, dtype=np.int32) if len(buf) else np.empty(0, dtype=np.int32)
+                     for buf in (self.days, self.run_starts, self.run_cents))
+
+    # --- Binary Serialization ---
+    def to_bytes(self):
+        """Packs the series into a compact little-endian byte string."""
+        body = array('i', self.days)
+        body.extend(self.run_starts)
+        body.extend(self.run_cents)
+        if body.itemsize != 4:
+            raise RuntimeError("array('i') is not 32-bit on this platform")
+        if struct.pack('=I', 1) != struct.pack('<I', 1):
+            body.byteswap()
+        return _HEADER.pack(len(self.days), len(self.run_cents)) + body.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Inverse of to_bytes()."""
+        count, runs = _HEADER.unpack_from(data)
+        body = array('i')
+        body.frombytes(data[_HEADER.size:_HEADER.size + 4 * (count + 2 * runs)])
+        if struct.pack('=I', 1) != struct.pack('<I', 1):
+            body.byteswap()
+        return cls(body[:count], body[count:count + runs], body[count + runs:])
@@ -0,0 +1,330 @@
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from scraper_core import SCRIPT_DIR
+
+# --- Configuration ---
+PROFILE_MODES = ("sampling", "cprofile")
+SAMPLE_INTERVAL = 0.005 # Seconds between two stack samples of every thread
+PROFILE_TOP_N = 25 # Functions listed in the hotspot summary
+PROFILE_DIR = os.path.join(SCRIPT_DIR, "profiles")
+
+# Time categories. A stack is attributed to the first rule matching one of its
+# frames, looking from the innermost frame outwards; unmatched stacks are 'other'.
+#   idle     threads waiting for work (queues, locks, Tk's event loop); only
+#            checked on the innermost frame, every thread has threading.py below it
+#   network  requests/urllib3/http.client/sockets/aiohttp, including waiting for the server
+#   parse    HTML parsing and extraction (bs4, lxml, selectolax, extractors, streaming scanner)
+#   json     JSON (de)serialisation and the storage modules
+#   ui       Tkinter calls (widget updates, redraws)
+_CATEGORY_RULES = (
+    ('idle', ('/threading.py', '/queue.py', '/concurrent/futures/thread.py')),
+    ('network', ('/requests/', '/urllib3/', '/http/client.py', '/socket.py', '/ssl.py', '/selectors.py',
+                 '/aiohttp/', '/asyncio/', '/charset_normalizer/', '/idna/')),
+    ('parse', ('/bs4/', '/soupsieve/', '/lxml/', '/selectolax/', '/html/parser.py', '/_markupbase.py',
+               '/extractors.py', '/streaming_fetch.py')),
+    ('json', ('/json/', '/sqlite_store.py', '/price_journal.py', '/http_cache.py', '/search_cache.py')),
+    ('ui', ('/tkinter/',)),
+)
+# cProfile reports C functions without a file; these name fragments place them
+_BUILTIN_RULES = (
+    ('idle', ('acquire', 'wait', 'sleep', 'mainloop', "'get' of '_queue")),
+    ('network', ('socket', 'ssl', 'select', 'poll', 'getaddrinfo')),
+    ('parse', ('lxml', 'selectolax', 'regex', 're.Pattern')),
+    ('json', ('_json', 'sqlite3', 'encode_basestring')),
+    ('ui', ('tkapp', '_tkinter')),
+)
+CATEGORIES = tuple(name for name, _ in _CATEGORY_RULES) + ('other',)
+
+
+def categorize(filename, function='', innermost=True):
+    """Time category of one frame (see _CATEGORY_RULES), or None if it has none."""
+    if function == 'mainloop':
+        return 'idle' if innermost else 'ui' # Tk waiting for events, or running a callback
+    path = filename.replace('\\', '/')
+    for category, fragments in _CATEGORY_RULES:
+        if category == 'idle' and not innermost:
+            continue
+        if any(fragment in path for fragment in fragments):
+            return category
+    return None
+
+
+def _builtin_category(name):
+    for category, fragments in _BUILTIN_RULES:
+        if any(fragment in name for fragment in fragments):
+            return category
+    return 'other'
+
+
+def _frame_label(code):
+    """'module:function' as shown in the collapsed stacks and the summary."""
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+def profile_path(label):
+    """Path prefix for a new profile of a run, e.g. profiles/refresh-20240131-184501."""
+    return os.path.join(PROFILE_DIR, f"{label}-{datetime.now():%Y%m%d-%H%M%S}")
+
+
+# --- Profilers ---
+class _Profiler:
+    """Common start/stop/write handling; use as a context manager or call start()/stop()."""
+    mode = None
+
+    def __init__(self, label="run", top_n=PROFILE_TOP_N):
+        self.label = label
+        self.top_n = top_n
+        self.started = None
+        self.elapsed = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._start()
+        return self
+
+    def stop(self):
+        self._stop()
+        self.elapsed = time.perf_counter() - self.started
+
+    def category_share(self):
+        """{category: fraction of the profiled time}, every entry of CATEGORIES included."""
+        totals = self._category_totals()
+        grand_total = sum(totals.values())
+        return {category: (totals.get(category, 0) / grand_total if grand_total else 0.0) for category in CATEGORIES}
+
+    def _category_lines(self):
+        lines = ["Time by category (share of all profiled thread time):"]
+        shares = self.category_share()
+        for category, share in shares.items():
+            lines.append(f"  {category:<8} {share * 100:6.1f}%")
+        busy = 1.0 - shares['idle']
+        if busy > 0 and shares['idle']:
+            lines.append("  excluding idle: " + ", ".join(
+                f"{category} {shares[category] / busy * 100:.1f}%" for category in CATEGORIES if category != 'idle'))
+        return lines
+
+    def write(self, prefix=None):
+        """
+        Writes the profile files next to each other.
+
+        Args:
+            prefix (str, optional): Path without extension, defaults to profile_path(label).
+
+        Returns:
+            list: Paths of the written files.
+        """
+        prefix = prefix or profile_path(self.label)
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        paths = self._write_data(prefix)
+        summary_path = prefix + ".txt"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(self.summary_text())
+        return paths + [summary_path]
+
+
+class SamplingProfiler(_Profiler):
+    """
+    Low-overhead statistical profiler.
+
+    A background thread records the stack of every other thread each
+    SAMPLE_INTERVAL seconds, so worker threads, the event loop and the Tk
+    main thread are all covered without slowing down the code being profiled.
+    Writes a collapsed-stack file ('thread;outer;...;inner count' per line)
+    that flamegraph.pl, speedscope or inferno can render directly.
+    """
+    mode = "sampling"
+
+    def __init__(self, label="run", top_n=PROFILE_TOP_N, interval=SAMPLE_INTERVAL):
+        super().__init__(label, top_n)
+        self.interval = interval
+        self.stacks = Counter() # Collapsed stack -> samples
+        self.own = Counter() # Innermost frame label -> samples
+        self.cumulative = Counter() # Frame label -> samples whose stack contains it
+        self.categories = Counter()
+        self.samples = 0
+        self._labels = {} # Code object -> (label, category as innermost frame, category as outer frame)
+        self._halt = threading.Event()
+        self._thread = None
+
+    def _start(self):
+        self._halt.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def _stop(self):
+        self._halt.set()
+        self._thread.join()
+
+    def _describe(self, code):
+        described = self._labels.get(code)
+        if described is None:
+            described = self._labels[code] = (_frame_label(code), categorize(code.co_filename, code.co_name),
+                                               categorize(code.co_filename, code.co_name, innermost=False))
+        return described
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._halt.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                labels = []
+                category = None
+                while frame is not None:
+                    label, inner_category, outer_category = self._describe(frame.f_code)
+                    if category is None:
+                        category = outer_category if labels else inner_category
+                    labels.append(label)
+                    frame = frame.f_back
+                labels.reverse() # Outermost first, as flame graphs expect
+                self.stacks[";".join([thread_names.get(ident, "thread").replace(";", "_")] + labels)] += 1
+                self.own[labels[-1]] += 1
+                self.cumulative.update(set(labels))
+                self.categories[category or 'other'] += 1
+                self.samples += 1
+
+    def _category_totals(self):
+        return self.categories
+
+    def _write_data(self, prefix):
+        path = prefix + ".collapsed"
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return [path]
+
+    def summary_text(self):
+        lines = [f"Profile '{self.label}': sampling every {self.interval * 1000:.0f} ms, "
+                 f"{self.elapsed or 0:.2f}s wall, {self.samples} thread samples", ""]
+        lines += self._category_lines()
+        lines += ["", f"Top {self.top_n} functions by own samples:",
+                  f"  {'own':>7} {'own%':>6} {'cum%':>6}  function"]
+        for label, count in self.own.most_common(self.top_n):
+            lines.append(f"  {count:>7} {count / self.samples * 100:6.1f} "
+                         f"{self.cumulative[label] / self.samples * 100:6.1f}  {label}")
+        return "\n".join(lines) + "\n"
+
+
+class CProfileProfiler(_Profiler):
+    """
+    Deterministic profiler built on cProfile.
+
+    Exact call counts and per-function times, at a noticeable overhead. The
+    starting thread is profiled, and (through threading.setprofile) every
+    thread started while the profile runs, e.g. the refresh workers. The
+    profiles of all threads are merged into one .pstats file, which snakeviz,
+    gprof2dot or flameprof turn into call graphs and flame graphs.
+    """
+    mode = "cprofile"
+
+    def __init__(self, label="run", top_n=PROFILE_TOP_N):
+        super().__init__(label, top_n)
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._stats = None
+
+    def _start(self):
+        self._profiles = [cProfile.Profile()]
+        self._stats = None
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_new_thread)
+        # From 3.12 on cProfile uses sys.monitoring and already sees every thread
+        self._profiles[0].enable()
+
+    def _profile_new_thread(self, frame, event, arg):
+        # First profiler event in a new thread: give the thread its own cProfile.Profile,
+        # which replaces this hook for the rest of the thread's life
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _stop(self):
+        self._profiles[0].disable()
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)
+
+    def stats(self):
+        """pstats.Stats of all profiled threads."""
+        if self._stats is None:
+            with self._lock:
+                profiles = list(self._profiles)
+            self._stats = pstats.Stats(profiles[0], stream=io.StringIO())
+            for profile in profiles[1:]:
+                try:
+                    self._stats.add(profile)
+                except TypeError: # A thread that never made a call has no stats
+                    pass
+        return self._stats
+
+    def _category_totals(self):
+        totals = Counter()
+        for (filename, _, function), (_, _, own_time, _, _) in self.stats().stats.items():
+            if filename == '~':
+                totals[_builtin_category(function)] += own_time
+            else:
+                totals[categorize(filename, function) or 'other'] += own_time
+        return totals
+
+    def _write_data(self, prefix):
+        path = prefix + ".pstats"
+        self.stats().dump_stats(path)
+        return [path]
+
+    def summary_text(self):
+        lines = [f"Profile '{self.label}': cProfile, {self.elapsed or 0:.2f}s wall", ""]
+        lines += self._category_lines()
+        stream = io.StringIO()
+        stats = self.stats()
+        stats.stream = stream
+        stats.sort_stats('tottime').print_stats(self.top_n)
+        lines += ["", f"Top {self.top_n} functions by own time:", stream.getvalue()]
+        return "\n".join(lines)
+
+
+def create_profiler(mode, label="run", top_n=PROFILE_TOP_N):
+    """Returns an unstarted profiler for a mode in PROFILE_MODES."""
+    if mode == "sampling":
+        return SamplingProfiler(label, top_n)
+    if mode == "cprofile":
+        return CProfileProfiler(label, top_n)
+    raise ValueError(f"Unknown profile mode '{mode}'. Choose from: {', '.join(PROFILE_MODES)}")
+
+
+if __name__ == "__main__":
+    # Usage: python profiling.py [--mode sampling|cprofile] [--pages N] [--out PREFIX] QUERY
+    # Profiles a headless search; refresh runs are profiled with refresh_cli.py --profile.
+    parser = argparse.ArgumentParser(description="Profile a knygos.lt search without the GUI.")
+    parser.add_argument("query")
+    parser.add_argument("--mode", choices=PROFILE_MODES, default="sampling")
+    parser.add_argument("--pages", type=int, default=1, help="Result pages to fetch.")
+    parser.add_argument("--top", type=int, default=PROFILE_TOP_N, help="Functions listed in the summary.")
+    parser.add_argument("--out", help="Path prefix of the profile files (default: profiles/search-<time>).")
+    args = parser.parse_args()
+
+    from scraper_core import scrape_knygos_lt
+    with create_profiler(args.mode, label="search", top_n=args.top) as profiler:
+        books, error = scrape_knygos_lt(args.query, max_pages=args.pages)
+    print(f"Found {len(books)} book(s)" + (f", error: {error}" if error else ""))
+    paths = profiler.write(args.out)
+    print(profiler.summary_text())
+    print("Profile written to: " + ", ".join(paths))
@@ -0,0 +1,293 @@
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import sys
+
+# Only the scraping core is imported here: no tkinter, no matplotlib.
+from scraper_core import INTERESTED_BOOKS_FULL_PATH, book_key, update_book_info, write_books_json
+from refresh_engine import RefreshEngine, DEFAULT_WORKERS
+from bulk_refresh import BulkRefresher
+from fetch_policy import FetchPolicy, MAX_RETRIES
+from parse_pool import ParsePool, default_parse_workers
+from refresh_scheduler import RefreshScheduler, STALENESS_THRESHOLD, REFRESH_BUDGET
+from metrics import request_metrics, METRICS_HOST
+from profiling import create_profiler, PROFILE_MODES
+from watch_rules import WatchRules, AlertLog, WATCH_RULES_FULL_PATH, WATCH_STATE_FULL_PATH, ALERT_LOG_FULL_PATH
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+
+class RulesFileError(Exception):
+    """The watch rules file could not be read or is malformed."""
+
+
+# --- Watchlist Loading / Saving ---
+def load_watchlist(storage, path):
+    """
+    Loads the watchlist from the chosen storage.
+
+    Args:
+        storage (str): "json", "sqlite" or "journal".
+        path (str): JSON file (json/journal) or database file (sqlite).
+
+    Returns:
+        list: Book dicts with a usable key.
+        object: The open SQLiteStore/PriceJournal, or None for plain JSON.
+    """
+    handle = None
+    if storage == "sqlite":
+        from sqlite_store import SQLiteStore
+        handle = SQLiteStore(path)
+        books = handle.load_books()
+    elif storage == "journal":
+        from price_journal import PriceJournal
+        handle = PriceJournal(path)
+        books = handle.load() or []
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            books = json.load(f)
+        if not isinstance(books, list):
+            raise ValueError(f"{path} does not contain a list of books.")
+
+    valid_books = []
+    for book_data in books:
+        if isinstance(book_data, dict) and book_key(book_data):
+            book_data.setdefault('price_history', [])
+            book_data.setdefault('title', 'Unknown Title')
+            book_data.setdefault('price', 'N/A')
+            book_data.setdefault('url', 'N/A')
+            book_data.setdefault('product_id', 'N/A')
+            valid_books.append(book_data)
+        else:
+            print(f"Skipping invalid entry: {book_data}")
+    return valid_books, handle
+
+
+def save_watchlist(storage, path, books, handle):
+    """Saves refreshed books: atomic JSON rewrite, SQLite upserts, or nothing extra for the journal."""
+    if storage == "sqlite":
+        handle.upsert_books(books)
+    elif storage == "journal":
+        pass # Observations were appended by update_book_info as they happened
+    else:
+        write_books_json(books, path)
+
+
+def _same_price(old_price, new_price):
+    """True if two price strings name the same amount ('8.5' and '8.50' do)."""
+    try:
+        return float(old_price) == float(new_price)
+    except (TypeError, ValueError):
+        return old_price == new_price
+
+
+def summarize(before, after):
+    """
+    Compares the books before and after the refresh.
+
+    A book counts as updated only if its price changed. record_price adds a
+    dated history entry on every new day even when the price is the same, so
+    the history length says nothing about a change.
+
+    Returns:
+        dict: Counts of updated/unchanged/failed refreshed books plus the failures.
+    """
+    updated = unchanged = failed = 0
+    failures = []
+    for old, new in zip(before, after):
+        if new.get('error'):
+            failed += 1
+            failures.append({'key': book_key(new), 'title': new.get('title'), 'error': new['error']})
+        elif not _same_price(old.get('price'), new.get('price')):
+            updated += 1
+        else:
+            unchanged += 1
+    return {'updated': updated, 'unchanged': unchanged, 'failed': failed, 'failures': failures}
+
+
+# --- Command Line ---
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Refresh the prices of the saved watchlist without the GUI and print a JSON summary.")
+    parser.add_argument("--storage", choices=("json", "sqlite", "journal"), default="json",
+                        help="Where the watchlist is stored (default: json).")
+    parser.add_argument("--file", default=None,
+                        help="Watchlist file (default: interested_books.json, or interested_books.db for sqlite).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Maximum concurrent fetches; the actual number adapts to the site's responses.")
+    parser.add_argument("--parse-workers", type=int, default=default_parse_workers(),
+                        help="Processes parsing the fetched pages (default: one per core; 0 = parse on the fetch threads).")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES,
+                        help=f"Retries per book for timeouts, 429 and 5xx responses (default: {MAX_RETRIES}).")
+    parser.add_argument("--no-cache", action="store_true", help="Don't use the on-disk HTTP cache.")
+    parser.add_argument("--streaming", action="store_true", help="Stream product pages and stop at the price.")
+    parser.add_argument("--no-bulk", action="store_true",
+                        help="Fetch every book's product page instead of reading shared search listing pages first.")
+    parser.add_argument("--force", action="store_true", help="Refresh every book, not only the likely stale ones.")
+    parser.add_argument("--threshold", type=float, default=STALENESS_THRESHOLD,
+                        help=f"Refresh books whose price changed since the last check with at least this probability (default: {STALENESS_THRESHOLD}).")
+    parser.add_argument("--budget", type=int, default=REFRESH_BUDGET,
+                        help=f"Maximum books fetched in this run, 0 = no limit (default: {REFRESH_BUDGET}).")
+    parser.add_argument("--output", help="Also write the JSON summary to this file.")
+    parser.add_argument("--metrics-file",
+                        help="Write per-request metrics (phase timings, sizes, statuses, retries, selectors) to this JSON file.")
+    parser.add_argument("--metrics-port", type=int,
+                        help=f"Serve the metrics in Prometheus text format at http://{METRICS_HOST}:PORT/metrics while running.")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="Profile the load -> refresh -> save run: 'sampling' (low overhead) or 'cprofile' (exact).")
+    parser.add_argument("--profile-out",
+                        help="Path prefix of the profile files (default: profiles/refresh-<time>).")
+    parser.add_argument("--rules", default=WATCH_RULES_FULL_PATH,
+                        help="Watch rules file (default: watch_rules.json; built-in rules if it does not exist).")
+    parser.add_argument("--alert-log", default=ALERT_LOG_FULL_PATH,
+                        help="JSON-lines file the triggered alerts are appended to (default: alerts.jsonl).")
+    parser.add_argument("--alerts-only", action="store_true",
+                        help="Print only the JSON list of triggered alerts instead of the summary.")
+    parser.add_argument("--analytics", action="store_true",
+                        help="Add per-book price analytics (all-time low/high, moving average, volatility, drops) to the summary; needs numpy.")
+    parser.add_argument("--quiet", action="store_true", help="Suppress per-book progress on stderr.")
+    return parser
+
+
+def run(args):
+    """
+    Performs one load -> refresh -> save cycle.
+
+    Returns:
+        dict: The machine-readable summary.
+    """
+    started = time.perf_counter()
+    path = args.file
+    if path is None:
+        if args.storage == "sqlite":
+            from sqlite_store import WATCHLIST_DB_FULL_PATH
+            path = WATCHLIST_DB_FULL_PATH
+        else:
+            path = INTERESTED_BOOKS_FULL_PATH
+
+    request_metrics.reset()
+    try:
+        watch = WatchRules.load(rules_path=args.rules, state_path=WATCH_STATE_FULL_PATH)
+    except (OSError, ValueError, TypeError, AttributeError) as e: # Unreadable JSON or rules of the wrong shape
+        raise RulesFileError(f"{args.rules}: {e}") from e
+    books, handle = load_watchlist(args.storage, path)
+    due, skipped = RefreshScheduler(threshold=args.threshold, budget=args.budget).select(books, force=args.force)
+    loaded = time.perf_counter()
+    before = [dict(book, price_history=list(book.get('price_history', []))) for book in due]
+
+    cache = None
+    if not args.no_cache:
+        from http_cache import HttpCache
+        cache = HttpCache()
+    journal = handle if args.storage == "journal" else None
+    policy = FetchPolicy(max_concurrency=args.workers, max_retries=args.max_retries)
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers > 0 else None
+    update_func = functools.partial(update_book_info, cache=cache, journal=journal, policy=policy,
+                                    streaming=True if args.streaming else None, parse_pool=parse_pool)
+    engine = RefreshEngine(workers=args.workers, update_func=update_func)
+    bulk = None if args.no_bulk else BulkRefresher(engine, policy=policy, journal=journal, parse_pool=parse_pool)
+    alerts = []
+
+    def check_rules(_done, _total, updated_data):
+        key = book_key(updated_data)
+        if key:
+            alerts.extend(watch.observe(key, updated_data)) # Each book's new history entries only
+
+    try:
+        refreshed = (bulk or engine).run(due, progress_callback=check_rules)
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+    fetched = time.perf_counter()
+
+    # Put the refreshed copies back in their place in the watchlist
+    positions = {id(book_data): index for index, book_data in enumerate(books)}
+    for old, new in zip(due, refreshed):
+        books[positions[id(old)]] = new
+    save_watchlist(args.storage, path, books if args.storage == "json" else refreshed, handle)
+    if cache is not None:
+        cache.save()
+    if handle is not None:
+        handle.close()
+    watch.save_state()
+    AlertLog(args.alert_log).append(alerts)
+    saved = time.perf_counter()
+    if args.metrics_file:
+        request_metrics.write_json(args.metrics_file)
+
+    analytics = None
+    if args.analytics:
+        from price_analytics import PriceAnalytics # Needs numpy, so only imported when asked for
+        try:
+            analytics = PriceAnalytics().compute(books, book_key)
+        except RuntimeError as e:
+            analytics = {'error': str(e)}
+    analyzed = time.perf_counter()
+
+    summary = {'storage': args.storage, 'file': path}
+    summary.update({'books': len(books), 'refreshed': len(due), 'skipped': len(skipped)})
+    summary.update(summarize(before, refreshed))
+    summary['fetch'] = policy.summary()
+    if bulk is not None:
+        summary['bulk'] = bulk.stats
+    summary['alerts'] = alerts
+    summary['timings'] = {
+        'import_s': round(_IMPORT_SECONDS, 3),
+        'load_s': round(loaded - started, 3),
+        'refresh_s': round(fetched - loaded, 3),
+        'save_s': round(saved - fetched, 3),
+        'total_s': round(analyzed - started + _IMPORT_SECONDS, 3),
+    }
+    if analytics is not None:
+        summary['timings']['analytics_s'] = round(analyzed - saved, 3)
+        summary['analytics'] = analytics
+    return summary
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Progress messages from the scrapers go to stderr so stdout stays pure JSON
+    log_target = open(os.devnull, 'w') if args.quiet else sys.stderr
+    metrics_server = request_metrics.serve(port=args.metrics_port) if args.metrics_port else None
+    profiler = create_profiler(args.profile, label="refresh") if args.profile else None
+    try:
+        with contextlib.redirect_stdout(log_target):
+            if profiler is not None:
+                profiler.start()
+            try:
+                summary = run(args)
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+    except RulesFileError as e:
+        print(json.dumps({'error': f"Could not load the watch rules: {e}"}))
+        return 2
+    except (OSError, ValueError, sqlite3.Error) as e: # sqlite3.Error: corrupt or locked database
+        print(json.dumps({'error': f"Could not load or save the watchlist: {e}"}))
+        return 2
+    finally:
+        if args.quiet:
+            log_target.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+    if profiler is not None:
+        summary['profile'] = profiler.write(args.profile_out) # Collapsed stacks/pstats + top-N summary
+    output = json.dumps(summary['alerts'] if args.alerts_only else summary, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    # Non-zero only when nothing at all could be refreshed (e.g. the site is down)
+    return 1 if summary['failed'] and not (summary['updated'] or summary['unchanged']) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from metrics import TimedHTTPAdapter
+from scraper_core import HEADERS, copy_for_update, finalize_book_data, record_unknown_error, update_book_info
+
+# --- Configuration ---
+DEFAULT_WORKERS = 8 # Number of concurrent fetches; keeps us well below the site's throttling
+POOL_CONNECTIONS_PER_WORKER = 2 # Keep-alive connections each worker session may hold open
+
+
+def create_session(pool_size=POOL_CONNECTIONS_PER_WORKER):
+    """
+    Creates a requests.Session with a small keep-alive connection pool.
+
+    Args:
+        pool_size (int): Maximum number of connections kept open per host.
+
+    Returns:
+        requests.Session: Session with the default HEADERS applied.
+    """
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size) # Times new connections (metrics.py)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+# --- Bounded Worker-Pool Refresh Engine ---
+class RefreshEngine:
+    """
+    Refreshes many books with a fixed number of worker threads.
+
+    Each worker thread owns one pooled requests.Session, so consecutive fetches
+    from the same worker reuse the TCP/TLS connection instead of opening a new
+    socket per book. Does not depend on Tkinter and can be used from scripts.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, update_func=update_book_info, session_factory=create_session):
+        """
+        Args:
+            workers (int): Maximum number of books fetched at the same time.
+            update_func (callable): Called as update_func(book_data, session=session)
+                                    and must return the updated book_data dict.
+            session_factory (callable): Returns a new session for a worker thread.
+        """
+        self.workers = max(1, int(workers))
+        self.update_func = update_func
+        self.session_factory = session_factory
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def _get_session(self):
+        """Returns the session owned by the calling worker thread, creating it on first use."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.session_factory()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _refresh_one(self, book_data, start_callback=None):
+        if start_callback:
+            start_callback(book_data)
+        return self.update_func(book_data, session=self._get_session())
+
+    def close(self):
+        """Closes all worker sessions opened by this engine."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+    def run(self, books, progress_callback=None, start_callback=None):
+        """
+        Refreshes every book and waits for all of them to finish.
+
+        Args:
+            books (list): Book data dicts. Each one is copied (with its price
+                          history) before being updated.
+            progress_callback (callable, optional): Called as
+                progress_callback(done, total, updated_book) on the thread that
+                called run(), as soon as each book finishes (in completion
+                order), so it never runs concurrently with itself.
+            start_callback (callable, optional): Called as start_callback(book)
+                from a worker thread just before a book is fetched; several
+                workers may call it at once.
+
+        Returns:
+            list: Updated book data dicts in the same order as `books`.
+        """
+        books = list(books)
+        total = len(books)
+        results = [None] * total
+        if total == 0:
+            return results
+
+        done = 0
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.workers, total)) as executor:
+                futures = {executor.submit(self._refresh_one, copy_for_update(book), start_callback): index
+                           for index, book in enumerate(books)}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        updated = future.result()
+                    except Exception as e: # update_func is expected to catch its own errors
+                        updated = copy_for_update(books[index]) if isinstance(books[index], dict) else {}
+                        record_unknown_error(updated, e) # Keeps the last known price, like every other failure
+                        updated = finalize_book_data(updated)
+                    results[index] = updated
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total, updated)
+        finally:
+            self.close()
+        return results
+
+
+def refresh_books(books, workers=DEFAULT_WORKERS, progress_callback=None):
+    """
+    Convenience wrapper: refreshes `books` with a temporary RefreshEngine.
+
+    Returns:
+        list: Updated book data dicts in the same order as `books`.
+    """
+    return RefreshEngine(workers=workers).run(books, progress_callback=progress_callback)
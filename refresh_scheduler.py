@@ -0,0 +1,98 @@
+import math
+from datetime import date, datetime
+
+from price_series import PriceSeries
+
+# --- Configuration ---
+STALENESS_THRESHOLD = 0.2 # Refresh a book once its price has changed since the last check with this probability
+REFRESH_BUDGET = 500 # Maximum books fetched per run (0 = no limit), the stalest first
+PRIOR_CHANGES = 1.0 # Assumed price changes per PRIOR_DAYS for a book with little history
+PRIOR_DAYS = 30.0
+
+
+# --- Staleness-aware Refresh Scheduler ---
+class RefreshScheduler:
+    """
+    Decides which books are worth fetching in a run.
+
+    Each book's price is assumed to change at a steady rate, estimated from
+    its price_history as (price changes + PRIOR_CHANGES) / (days observed +
+    PRIOR_DAYS). The prior keeps new books with little history on a roughly
+    monthly rate until they have shown how volatile they are. The expected
+    staleness of a book is the probability that its price changed since it
+    was last checked, 1 - exp(-rate * days since the check). Books above the
+    threshold are due, stalest first, up to the per-run budget.
+
+    The last check time is the book's 'last_checked' field (set by
+    scraper_core.record_price), falling back to the date of its last
+    history entry.
+    """
+
+    def __init__(self, threshold=STALENESS_THRESHOLD, budget=REFRESH_BUDGET,
+                 prior_changes=PRIOR_CHANGES, prior_days=PRIOR_DAYS):
+        self.threshold = threshold
+        self.budget = budget
+        self.prior_changes = prior_changes
+        self.prior_days = prior_days
+
+    def change_rate(self, history):
+        """Estimated price changes per day for a price_history list."""
+        series = PriceSeries.from_history(history, skip_invalid=True, strict=False)
+        changes = max(0, len(series.run_cents) - 1)
+        observed_days = (series.days[-1] - series.days[0]) if len(series) else 0
+        return (changes + self.prior_changes) / (max(0, observed_days) + self.prior_days)
+
+    @staticmethod
+    def last_checked(book_data):
+        """
+        When the book's price was last fetched successfully.
+
+        Returns:
+            datetime: Or None if the book has never been checked.
+        """
+        try:
+            return datetime.fromisoformat(book_data['last_checked'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        history = book_data.get('price_history') or []
+        try:
+            return datetime.combine(date.fromisoformat(history[-1][0]), datetime.min.time())
+        except (IndexError, TypeError, ValueError):
+            return None
+
+    def staleness(self, book_data, now=None):
+        """
+        Probability (0..1) that the book's price changed since it was last checked.
+
+        Books that have never been checked or whose last refresh failed are 1.0.
+        """
+        checked = self.last_checked(book_data)
+        if checked is None or book_data.get('error'):
+            return 1.0
+        age_days = max(0.0, ((now or datetime.now()) - checked).total_seconds() / 86400)
+        return 1.0 - math.exp(-self.change_rate(book_data.get('price_history') or []) * age_days)
+
+    def select(self, books, force=False, now=None):
+        """
+        Splits a watchlist into the books to refresh in this run and the rest.
+
+        Args:
+            books (list): Book data dicts.
+            force (bool): Refresh every book, ignoring threshold and budget.
+            now (datetime, optional): Current time, defaults to datetime.now().
+
+        Returns:
+            list: Books to refresh, stalest first.
+            list: Books skipped in this run, in their original order.
+        """
+        books = list(books)
+        if force:
+            return books, []
+        now = now or datetime.now()
+        scored = [(self.staleness(book_data, now), index) for index, book_data in enumerate(books)]
+        due = sorted((item for item in scored if item[0] >= self.threshold), key=lambda item: -item[0])
+        if self.budget:
+            due = due[:self.budget]
+        due_indices = {index for _, index in due}
+        return ([books[index] for _, index in due],
+                [book_data for index, book_data in enumerate(books) if index not in due_indices])
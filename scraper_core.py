@@ -0,0 +1,666 @@
+import requests
+import json
+import re
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import os # Needed to check file existence and get script path
+from datetime import datetime # Use datetime for date handling
+
+from extractors import get_extractor
+from metrics import ResponseTimer, request_metrics
+from streaming_fetch import read_product_stream
+
+# --- Configuration ---
+SITE_ROOT = "https://www.knygos.lt" # Relative result links are resolved against this
+BASE_SEARCH_URL = SITE_ROOT + "/lt/paieska?q=" # Point both at a local stand-in to benchmark offline
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+SEARCH_PAGE_PARAM = "page" # Query parameter selecting the results page (1-based)
+SEARCH_MAX_PAGES = 5 # Default number of result pages fetched per search
+STREAMING_FETCH = False # Read product pages in chunks and stop once the price is found
+JSON_READ_CHUNK = 1 << 20 # Characters read at a time by iter_books_json
+# --- Fixed filename for auto-load/save ---
+INTERESTED_BOOKS_FILE = "interested_books.json" # Relative filename
+
+# --- Calculate Absolute Path to the JSON File ---
+# Get the directory where the script itself is located
+try:
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+except NameError: # Handle cases where __file__ might not be defined (e.g., interactive interpreter)
+    SCRIPT_DIR = os.getcwd() # Fallback to current working directory
+
+# Combine the script directory with the filename
+INTERESTED_BOOKS_FULL_PATH = os.path.join(SCRIPT_DIR, INTERESTED_BOOKS_FILE)
+# --- ---
+
+
+def book_key(book_data):
+    """Stable identifier of a book: its product_id, or its URL when the id is unknown."""
+    return book_data.get('product_id') if book_data.get('product_id') != 'N/A' else book_data.get('url')
+
+
+def dump_books_json(books, f):
+    """
+    Writes book dicts to an open text file in the interested_books.json format.
+
+    The output is the same as json.dump(list(books), f, ensure_ascii=False,
+    indent=4), but the books are encoded one at a time, so a generator of
+    books (e.g. SQLiteStore.iter_books) never has to fit in memory at once.
+
+    Returns:
+        int: Number of books written.
+    """
+    count = 0
+    f.write('[')
+    for book_data in books:
+        f.write(',\n    ' if count else '\n    ')
+        # JSON strings escape their newlines, so every line break here is indentation
+        f.write(json.dumps(book_data, ensure_ascii=False, indent=4).replace('\n', '\n    '))
+        count += 1
+    f.write('\n]' if count else ']')
+    return count
+
+
+_JSON_SPACE = re.compile(r'\s*')
+
+
+def iter_books_json(path, chunk_size=JSON_READ_CHUNK):
+    """
+    Yields the entries of a JSON list file (interested_books.json) one at a time.
+
+    The file is read in chunks and each entry is decoded as soon as it is
+    complete, so memory use is bounded by the largest single book rather
+    than by the whole watchlist.
+
+    Raises:
+        ValueError: If the file does not contain a JSON list or is malformed
+                    (json.JSONDecodeError for syntax errors).
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos = '', 0
+
+        def read_more():
+            nonlocal buffer, pos
+            chunk = f.read(max(chunk_size, len(buffer) - pos)) # Grows geometrically for entries longer than a chunk
+            if not chunk:
+                return False
+            buffer, pos = buffer[pos:] + chunk, 0
+            return True
+
+        def skip_space():
+            nonlocal pos
+            pos = _JSON_SPACE.match(buffer, pos).end()
+            while pos == len(buffer) and read_more():
+                pos = _JSON_SPACE.match(buffer, pos).end()
+
+        skip_space()
+        if buffer[pos:pos + 1] != '[':
+            raise ValueError(f"{path} does not contain a list of books.")
+        pos += 1
+        skip_space()
+        if buffer[pos:pos + 1] == ']':
+            return
+        while True:
+            while True:
+                try:
+                    entry, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not read_more():
+                        raise
+                    continue
+                # A value that ends with the buffer (e.g. a number) may continue in the next chunk
+                if end < len(buffer) or not read_more():
+                    break
+            pos = end
+            yield entry
+            skip_space()
+            separator = buffer[pos:pos + 1]
+            pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"{path} is not a valid JSON list (unexpected {separator or 'end of file'!r}).")
+            skip_space()
+
+
+def write_books_json(books, path):
+    """
+    Saves book dicts in the interested_books.json format.
+
+    Writes to a temporary file first and swaps it in with os.replace, so an
+    interrupted save never leaves a half-written watchlist behind. `books`
+    may be any iterable; it is written one book at a time.
+
+    Returns:
+        int: Number of books written.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        count = dump_books_json(books, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+# --- Scraper for Search Results ---
+def build_search_url(query, page=1):
+    """Returns the knygos.lt search URL for a query and 1-based results page."""
+    url = BASE_SEARCH_URL + urllib.parse.quote_plus(query)
+    if page > 1:
+        url += f"&{SEARCH_PAGE_PARAM}={page}"
+    return url
+
+
+def parse_search_results(content, extractor=None, parse_pool=None):
+    """
+    Extracts book entries from the HTML of a search results page.
+
+    Args:
+        content (bytes or str): Raw HTML of the search page.
+        extractor (optional): Extractor backend (see extractors.py). Defaults
+                              to the configured EXTRACTOR_BACKEND.
+        parse_pool (parse_pool.ParsePool, optional): Parse in a worker process
+                              instead of on the calling thread.
+
+    Returns:
+        list: A list of dictionaries with book info (title, price, url, product_id).
+        str: An error message if no product containers were found at all, else None.
+    """
+    books_found = []
+    error_message = None
+    if parse_pool is not None:
+        (items, container_count, nothing_found), parse_s, extract_s = parse_pool.search_fields(content)
+    else:
+        extractor = extractor or get_extractor()
+        started = time.perf_counter()
+        document = extractor.parse(content)
+        parsed = time.perf_counter()
+        items, container_count, nothing_found = extractor.search_fields(document)
+        parse_s, extract_s = parsed - started, time.perf_counter() - parsed
+    request_metrics.observe('search', 'parse', parse_s)
+    request_metrics.observe('search', 'extract', extract_s)
+    print(f"Found {container_count} potential book container(s) in search results.")
+
+    if nothing_found: # Only report error if not found anywhere
+         error_message = "No book containers found using known selectors in search results."
+
+    for item in items:
+        book_data = {}
+        book_data['title'] = item['title']
+        relative_url = item.get('href')
+        if relative_url:
+            book_data['url'] = urllib.parse.urljoin(SITE_ROOT, relative_url)
+        else:
+            book_data['url'] = None # Handle cases where URL might be missing
+        book_data['price'] = item.get('price') or 'N/A' # Default to N/A
+        book_data['product_id'] = item.get('product_id') or 'N/A' # Default to N/A
+
+        # Simple representation for display
+        book_data['display_text'] = f"{book_data['title']} ({book_data['price']} EUR)"
+
+        if book_data.get('title') and book_data.get('url'): # Ensure we have title and URL
+            books_found.append(book_data)
+
+    return books_found, error_message
+
+
+def _search_error_message(exc):
+    """Turns an exception raised while fetching/parsing a search page into a user message."""
+    if isinstance(exc, requests.exceptions.Timeout):
+        return f"Search request timed out after 15 seconds."
+    if isinstance(exc, requests.exceptions.RequestException):
+        return f"Search network error: {exc}"
+    return f"Search scraping error: {exc}"
+
+
+def fetch_search_page(query, page, session=None, policy=None):
+    """
+    Downloads one search results page and returns its raw HTML.
+
+    Args:
+        policy (fetch_policy.FetchPolicy, optional): Retries/backoff to fetch with.
+
+    Raises:
+        requests.exceptions.RequestException: On network errors and HTTP error statuses.
+    """
+    search_url = build_search_url(query, page)
+    print(f"Fetching Search URL: {search_url}") # Keep console log for debugging
+    http = session if session is not None else requests
+    timer = ResponseTimer()
+    try:
+        if policy is not None:
+            response = policy.get(http, search_url, headers=HEADERS, timeout=15, hooks=timer.hooks_for(http))
+        else:
+            response = http.get(search_url, headers=HEADERS, timeout=15, hooks=timer.hooks_for(http)) # Increased timeout
+    except requests.exceptions.Timeout:
+        request_metrics.record_error('search', 'timeout')
+        raise
+    except requests.exceptions.RequestException:
+        request_metrics.record_error('search', 'network')
+        raise
+    request_metrics.record_response('search', response.status_code, ttfb=response.elapsed.total_seconds())
+    request_metrics.record_body('search', len(response.content), download=timer.since_headers())
+    response.raise_for_status()
+    print(f"Successfully fetched search page {page}.")
+    return response.content
+
+
+def iter_search_pages(query, max_pages=SEARCH_MAX_PAGES, max_results=None, session=None, parse_pool=None):
+    """
+    Scrapes knygos.lt search results page by page.
+
+    While one page is being parsed, the next one is already downloading on a
+    background thread, so results can be shown as soon as each page arrives.
+    Stops at max_pages, at max_results, or when a page adds no new books.
+
+    Args:
+        query (str): The search term.
+        max_pages (int): Maximum number of result pages to fetch.
+        max_results (int, optional): Stop after this many books in total.
+        session (requests.Session, optional): Session reused for every page.
+        parse_pool (parse_pool.ParsePool, optional): Parses the pages in worker processes.
+
+    Yields:
+        list: The new book dicts found on one page (same format as scrape_knygos_lt).
+        str: An error message string, or None. After an error nothing more is yielded.
+    """
+    seen_urls = set()
+    total = 0
+    executor = ThreadPoolExecutor(max_workers=1) # One page ahead is enough to hide latency
+    try:
+        future = executor.submit(fetch_search_page, query, 1, session)
+        for page in range(1, max(1, max_pages) + 1):
+            try:
+                content = future.result()
+            except Exception as e:
+                error_message = _search_error_message(e)
+                print(error_message)
+                yield [], error_message
+                return
+
+            # Prefetch the next page before parsing this one
+            future = executor.submit(fetch_search_page, query, page + 1, session) if page < max_pages else None
+
+            try:
+                books, error_message = parse_search_results(content, parse_pool=parse_pool)
+            except Exception as e:
+                error_message = _search_error_message(e)
+                print(error_message)
+                yield [], error_message
+                return
+
+            new_books = []
+            for book_data in books:
+                if book_data['url'] in seen_urls:
+                    continue # Out-of-range pages often repeat the last page
+                seen_urls.add(book_data['url'])
+                book_data['search_query'] = query # Lets bulk_refresh.py re-read this book's price from the listing
+                new_books.append(book_data)
+                if max_results is not None and total + len(new_books) >= max_results:
+                    break
+            total += len(new_books)
+
+            if new_books or error_message or page == 1:
+                yield new_books, error_message
+            if not new_books or error_message or (max_results is not None and total >= max_results):
+                return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def scrape_knygos_lt(query, max_pages=1, max_results=None, session=None, parse_pool=None):
+    """
+    Scrapes knygos.lt search results for a given query.
+
+    Args:
+        query (str): The search term.
+        max_pages (int): Number of result pages to collect (default: first page only).
+        max_results (int, optional): Maximum number of books to return.
+        session (requests.Session, optional): Session reused for every page.
+        parse_pool (parse_pool.ParsePool, optional): Parses the pages in worker processes.
+
+    Returns:
+        list: A list of dictionaries with book info (title, price, url, product_id, search_query).
+              Returns an empty list on error or if nothing found.
+        str: An error message string, or None if successful.
+    """
+    books_found = []
+    error_message = None
+    for batch, error in iter_search_pages(query, max_pages=max_pages, max_results=max_results, session=session,
+                                          parse_pool=parse_pool):
+        books_found.extend(batch)
+        error_message = error or error_message
+
+    # Return both results and error status
+    return books_found, error_message
+
+
+# --- Scraper for Individual Book Page & Price History Update ---
+def copy_for_update(book_data):
+    """
+    Copy of a book that a refresh can change without touching the original.
+
+    The price_history list is copied too: record_price appends to it, and the
+    GUI may be reading the original's history on another thread (analytics).
+    """
+    if not isinstance(book_data, dict):
+        return book_data # prepare_book_data turns it into an error result
+    copied = book_data.copy()
+    if isinstance(copied.get('price_history'), list):
+        copied['price_history'] = list(copied['price_history'])
+    return copied
+
+
+def prepare_book_data(book_data):
+    """
+    Validates book_data before a refresh and makes sure it has a history list.
+
+    Returns:
+        dict: The book_data to update, or a finished error dict when the input
+              cannot be fetched (invalid type or missing URL).
+        bool: True if the page should be fetched, False if the returned dict is final.
+    """
+    # Ensure book_data is a dictionary (safety check)
+    if not isinstance(book_data, dict):
+        print(f"Error: Received invalid book_data type: {type(book_data)}")
+        return {'error': 'Invalid data format', 'title':'Unknown', 'price':'Error', 'url':'N/A', 'product_id':'N/A', 'price_history':[]}, False
+
+
+    # Initialize price_history if it doesn't exist or is not a list
+    if 'price_history' not in book_data or not isinstance(book_data.get('price_history'), list):
+         book_data['price_history'] = []
+
+    if not book_data.get('url'):
+        book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+        book_data['error'] = "Missing URL"
+        book_data['price'] = 'Error'
+        book_data['display_text'] = f"{book_identifier} (Update Error: No URL)"
+        return book_data, False
+
+    return book_data, True
+
+
+def extract_product_price(content, extractor=None, parse_pool=None):
+    """
+    Finds the raw price string on a product page.
+
+    Args:
+        content (bytes or str): Raw HTML of the product page.
+        extractor (optional): Extractor backend (see extractors.py). Defaults
+                              to the configured EXTRACTOR_BACKEND.
+        parse_pool (parse_pool.ParsePool, optional): Parse in a worker process
+                              instead of on the calling thread.
+
+    Returns:
+        str: The price as found on the page (not yet validated), or None if
+             no price element exists.
+    """
+    # --- !!! CRITICAL: SELECTOR FOR PRICE ON PRODUCT PAGE !!! ---
+    # The selectors live in extractors.PRICE_SELECTOR. Inspect the HTML source
+    # of a real knygos.lt book page if prices stop being found.
+    if parse_pool is not None:
+        info, parse_s, extract_s = parse_pool.product_fields(content)
+    else:
+        extractor = extractor or get_extractor()
+        started = time.perf_counter()
+        document = extractor.parse(content)
+        parsed = time.perf_counter()
+        info = extractor.product_fields(document)
+        parse_s, extract_s = parsed - started, time.perf_counter() - parsed
+    request_metrics.observe('product', 'parse', parse_s)
+    request_metrics.observe('product', 'extract', extract_s)
+    request_metrics.record_selector(info['price_selector'])
+    return info['price']
+
+
+def apply_extracted_price(book_data, temp_price):
+    """
+    Records a price found by extract_product_price (or None if missing) on book_data.
+    """
+    if temp_price is not None:
+        record_price(book_data, temp_price)
+    else:
+        # Price element not found
+        print("  -> Price element not found on page.")
+        book_data['price'] = 'Not Found' # More specific than 'N/A'
+        book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Price Missing)"
+        book_data.setdefault('error', "Price element not found") # Use setdefault
+
+
+def apply_product_page(book_data, content, parse_pool=None):
+    """
+    Parses a fetched product page and records the price on book_data.
+
+    Args:
+        book_data (dict): Book being refreshed (already passed through prepare_book_data).
+        content (bytes or str): Raw HTML of the product page.
+        parse_pool (parse_pool.ParsePool, optional): Parses the page in a worker process.
+
+    Returns:
+        str: The raw price string found on the page, or None.
+    """
+    temp_price = extract_product_price(content, parse_pool=parse_pool)
+    apply_extracted_price(book_data, temp_price)
+    return temp_price
+
+
+def record_price(book_data, temp_price):
+    """
+    Validates a scraped price string and records it in book_data's price history.
+
+    Args:
+        book_data (dict): Book being refreshed; must have a 'price_history' list.
+        temp_price (str): Price as found on the page (e.g. '8.45').
+
+    Returns:
+        bool: True if the price was valid and stored.
+    """
+    # --- Price History Recording Logic ---
+    current_date_str = datetime.today().strftime('%Y-%m-%d') # Get current date as YYYY-MM-DD
+
+    # Validate and store the numeric price
+    try:
+        numeric_price = float(temp_price)
+        new_price = f"{numeric_price:.2f}" # Store price with consistent formatting (2 decimal places)
+        print(f"  -> Found price: {new_price}")
+    except (ValueError, TypeError):
+         print(f"  -> Found price element but content is not a valid number: '{temp_price}'")
+         book_data['price'] = 'Parse Error'
+         book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Price Format)"
+         book_data.setdefault('error', "Price format error") # Use setdefault
+         return False
+
+    # Record price since it was successfully updated
+    book_data['price'] = new_price # Update the main price field
+    # Ensure title exists before creating display text
+    book_title_for_display = book_data.get('title', 'Unknown Title')
+    book_data['display_text'] = f"{book_title_for_display} ({book_data['price']} EUR)"
+
+    # Check if history is empty or if date/price differs from the last entry
+    last_entry = book_data['price_history'][-1] if book_data['price_history'] else None
+    # Compare date string and price string
+    if not last_entry or last_entry[0] != current_date_str or last_entry[1] != new_price:
+         print(f"  -> Recording price {new_price} for date {current_date_str}")
+         book_data['price_history'].append([current_date_str, new_price])
+    else:
+         print(f"  -> Price {new_price} already recorded for today {current_date_str}")
+    # Remove potential 'error' key if price was successfully updated now
+    book_data.pop('error', None)
+    book_data['last_checked'] = datetime.now().isoformat(timespec='seconds') # Used by refresh_scheduler
+    return True
+
+
+# --- Error recording shared by all fetch backends ---
+def _set_failed_price(book_data, price_status):
+    """Keeps the last known price of a book whose refresh failed; only books without one show the error status."""
+    try:
+        float(book_data.get('price'))
+    except (TypeError, ValueError):
+        book_data['price'] = price_status
+
+
+def record_http_error(book_data, status_code):
+    """Marks book_data as failed with an HTTP error status."""
+    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+    error_msg = f"HTTP Error {status_code}"
+    price_status = f'HTTP {status_code}'
+    if status_code == 404:
+       error_msg = "Page not found (404)"
+       price_status = 'Not Found (404)'
+    print(f"  -> Update failed: {error_msg} for {book_identifier}")
+    _set_failed_price(book_data, price_status)
+    book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} ({price_status})"
+    book_data['error'] = error_msg # Store the error status
+
+
+def record_timeout(book_data):
+    """Marks book_data as failed because the request timed out."""
+    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+    print(f"  -> Update timed out for {book_identifier}")
+    _set_failed_price(book_data, 'Timeout')
+    book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Timeout)"
+    book_data['error'] = "Timeout"
+
+
+def record_network_error(book_data, exc):
+    """Marks book_data as failed because of a connection-level error."""
+    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+    error_msg = f"Network Error: {exc}"
+    print(f"  -> Update failed: {error_msg} for {book_identifier}")
+    _set_failed_price(book_data, 'Network Error')
+    book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Network)"
+    book_data['error'] = error_msg
+
+
+def record_unknown_error(book_data, exc):
+    """Marks book_data as failed because of an unexpected exception."""
+    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+    error_msg = f"Unknown update error: {exc}"
+    print(f"  -> Update failed: {error_msg} for {book_identifier}")
+    _set_failed_price(book_data, 'Update Error')
+    book_data['display_text'] = f"{book_data.get('title', 'Unknown Title')} (Update Error: Unknown)"
+    book_data['error'] = error_msg
+
+
+def finalize_book_data(book_data):
+    """Ensures essential keys exist on book_data, even after an error."""
+    book_data.setdefault('title', 'Unknown Title')
+    book_data.setdefault('price', 'Error')
+    book_data.setdefault('url', 'N/A')
+    book_data.setdefault('product_id', 'N/A')
+    book_data.setdefault('display_text', f"{book_data['title']} ({book_data['price']})") # Ensure display text reflects current status
+    return book_data
+
+
+def update_book_info(book_data, session=None, cache=None, streaming=None, journal=None, policy=None,
+                     parse_pool=None):
+    """
+    Fetches the individual book page, tries to update its price,
+    and records price history.
+
+    Args:
+        book_data (dict): Dictionary containing at least 'url' and 'title'.
+                          Should also contain 'price_history' list (or it will be created).
+        session (requests.Session, optional): Session to fetch with, so that
+                          connections are kept alive between calls. Falls back
+                          to a plain requests.get when not given.
+        cache (http_cache.HttpCache, optional): On-disk cache of validators and
+                          extracted prices. Fresh entries and 304 responses reuse
+                          the cached price without parsing the page.
+        streaming (bool, optional): Stream the page and close the connection as
+                          soon as the price and product id have been seen.
+                          Defaults to STREAMING_FETCH.
+        journal (price_journal.PriceJournal, optional): Append-only journal that
+                          receives each successful check (new price or not).
+        policy (fetch_policy.FetchPolicy, optional): Retries with backoff,
+                          adaptive concurrency and a per-host circuit breaker,
+                          shared by all workers of a run.
+        parse_pool (parse_pool.ParsePool, optional): Parses the downloaded page
+                          in a worker process instead of on this thread. Not
+                          used for streamed pages, which are scanned as they arrive.
+
+    Returns:
+        dict: Updated book_data with new price, display_text, and potentially
+              updated price_history. Includes 'error' key if update failed.
+    """
+    book_data, should_fetch = prepare_book_data(book_data)
+    if not should_fetch:
+        return book_data
+
+    # Use a stable identifier for messages
+    book_identifier = book_data.get('title', book_data.get('url', 'Unknown Book'))
+    history_length = len(book_data['price_history'])
+    last_checked = book_data.get('last_checked')
+
+    try:
+        print(f"Updating book: {str(book_identifier)[:50]}... URL: {book_data['url']}")
+        request_headers = HEADERS
+        cache_entry = cache.lookup(book_data['url']) if cache is not None else None
+        if cache_entry is not None:
+            if cache.is_fresh(cache_entry):
+                print("  -> Cached copy is still fresh, reusing price.")
+                apply_extracted_price(book_data, cache_entry['price'])
+                return finalize_book_data(book_data)
+            request_headers = {**HEADERS, **cache.validator_headers(cache_entry)}
+
+        if streaming is None:
+            streaming = STREAMING_FETCH
+        http = session if session is not None else requests
+        timer = ResponseTimer()
+        if policy is not None:
+            response = policy.get(http, book_data['url'], headers=request_headers, timeout=10, stream=streaming,
+                                  hooks=timer.hooks_for(http))
+        else:
+            response = http.get(book_data['url'], headers=request_headers, timeout=10, stream=streaming,
+                                hooks=timer.hooks_for(http))
+        request_metrics.record_response('product', response.status_code, ttfb=response.elapsed.total_seconds())
+        if not streaming:
+            request_metrics.record_body('product', len(response.content), download=timer.since_headers())
+
+        if response.status_code == 304 and cache_entry is not None:
+            response.close()
+            print("  -> Not modified (304), reusing cached price.")
+            cache.revalidated(book_data['url'], response.headers)
+            apply_extracted_price(book_data, cache_entry['price'])
+            return finalize_book_data(book_data)
+
+        if streaming and response.status_code >= 400:
+            response.close()
+        response.raise_for_status() # Check for 4xx/5xx errors
+
+        if streaming:
+            product_info, stream_entry = read_product_stream(response)
+            request_metrics.record_body('product', stream_entry['bytes_read'],
+                                        download=stream_entry['read_s'] - stream_entry['parse_s'])
+            request_metrics.observe('product', 'parse', stream_entry['parse_s'])
+            request_metrics.record_selector(product_info['price_selector'])
+            saved = stream_entry['bytes_saved']
+            print(f"  -> Streamed {stream_entry['bytes_read']} bytes"
+                  + (f", stopped early (saved {saved} bytes)" if stream_entry['stopped_early'] and saved is not None else ""))
+            temp_price = product_info['price']
+            apply_extracted_price(book_data, temp_price)
+        else:
+            temp_price = apply_product_page(book_data, response.content, parse_pool=parse_pool)
+        if cache is not None:
+            cache.store(book_data['url'], response.headers, temp_price)
+
+    except requests.exceptions.HTTPError as e:
+        record_http_error(book_data, e.response.status_code)
+    except requests.exceptions.Timeout:
+        request_metrics.record_error('product', 'timeout')
+        record_timeout(book_data)
+    except requests.exceptions.RequestException as e:
+        request_metrics.record_error('product', 'network')
+        record_network_error(book_data, e)
+    except Exception as e:
+        record_unknown_error(book_data, e)
+    finally:
+        if journal is not None and (len(book_data['price_history']) > history_length
+                                    or book_data.get('last_checked') != last_checked):
+            journal.record_observation(book_data)
+
+    return finalize_book_data(book_data)
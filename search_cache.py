@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from scraper_core import SCRIPT_DIR, SEARCH_MAX_PAGES, iter_search_pages
+
+# --- Configuration ---
+SEARCH_CACHE_FILE = "search_cache.json" # Disk tier, stored next to the script
+SEARCH_CACHE_FULL_PATH = os.path.join(SCRIPT_DIR, SEARCH_CACHE_FILE)
+SEARCH_CACHE_TTL = 6 * 60 * 60 # Seconds a cached search stays valid
+SEARCH_CACHE_MEMORY_ENTRIES = 100 # In-memory LRU tier size
+SEARCH_CACHE_DISK_ENTRIES = 1000 # On-disk tier size
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a search query."""
+    return ' '.join(query.split()).casefold()
+
+
+# --- Two-tier Search Result Cache ---
+class SearchCache:
+    """
+    TTL + LRU cache of search results keyed by normalized query.
+
+    Lookups check a small in-memory LRU first, then the larger on-disk tier
+    (which survives restarts); disk hits are promoted into memory. Entries
+    store the books found for a given page count, so a later search asking
+    for the same or fewer results is served without any network access.
+    """
+
+    def __init__(self, path=SEARCH_CACHE_FULL_PATH, ttl=SEARCH_CACHE_TTL,
+                 memory_entries=SEARCH_CACHE_MEMORY_ENTRIES, disk_entries=SEARCH_CACHE_DISK_ENTRIES):
+        """
+        Args:
+            path (str, optional): JSON file for the disk tier; None keeps the cache in memory only.
+            ttl (float): Seconds before an entry expires.
+            memory_entries (int): Size bound of the in-memory tier.
+            disk_entries (int): Size bound of the on-disk tier.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = max(1, int(memory_entries))
+        self.disk_entries = max(1, int(disk_entries))
+        self._memory = OrderedDict() # {key: entry}, least recently used first
+        self._disk = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_dirty = False
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._load()
+
+    @staticmethod
+    def make_key(query, max_pages):
+        return f"{normalize_query(query)}|{max_pages}"
+
+    def stats_text(self):
+        """Short hit/miss summary for the status bar."""
+        return f"cache {self.memory_hits + self.disk_hits} hit(s) / {self.misses} miss(es)"
+
+    # --- Persistence ---
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable search cache '{self.path}': {e}")
+            return
+        now = time.time()
+        for key, entry in stored if isinstance(stored, list) else []:
+            if isinstance(entry, dict) and now - entry.get('created', 0) < self.ttl:
+                self._disk[key] = entry
+        self._trim(self._disk, self.disk_entries)
+
+    def save(self):
+        """Writes the disk tier atomically if it changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._disk_dirty:
+                return
+            items = list(self._disk.items())
+            self._disk_dirty = False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Drops every entry from both tiers and deletes the disk file."""
+        with self._lock:
+            self._memory.clear()
+            self._disk.clear()
+            self._disk_dirty = False
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def _trim(tier, limit):
+        while len(tier) > limit:
+            tier.popitem(last=False)
+
+    # --- Lookup & Store ---
+    def _usable(self, entry, max_results, now):
+        if now - entry['created'] >= self.ttl:
+            return False
+        if entry['max_results'] is None:
+            return True
+        return max_results is not None and max_results <= entry['max_results']
+
+    def get(self, query, max_pages=SEARCH_MAX_PAGES, max_results=None):
+        """
+        Returns cached books for the search, or None on a miss.
+
+        Args:
+            query (str): The search term (normalized before lookup).
+            max_pages (int): Page count the search would fetch.
+            max_results (int, optional): Result limit the search would apply.
+        """
+        key = self.make_key(query, max_pages)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._usable(entry, max_results, now):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                entry = self._disk.get(key)
+                if entry is not None and self._usable(entry, max_results, now):
+                    self._disk.move_to_end(key)
+                    self._memory[key] = entry # Promote to the memory tier
+                    self._trim(self._memory, self.memory_entries)
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                    return None
+            books = entry['books'] if max_results is None else entry['books'][:max_results]
+            return [dict(book) for book in books] # Callers may modify the dicts
+
+    def put(self, query, books, max_pages=SEARCH_MAX_PAGES, max_results=None):
+        """Stores the complete result list of a successful search in both tiers."""
+        key = self.make_key(query, max_pages)
+        entry = {
+            'created': time.time(),
+            'max_results': max_results,
+            'books': [dict(book) for book in books],
+        }
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            self._trim(self._memory, self.memory_entries)
+            if self.path:
+                self._disk[key] = entry
+                self._disk.move_to_end(key)
+                self._trim(self._disk, self.disk_entries)
+                self._disk_dirty = True
+
+
+def cached_search_pages(cache, query, max_pages=SEARCH_MAX_PAGES, max_results=None, parse_pool=None):
+    """
+    iter_search_pages with a SearchCache in front of it.
+
+    A hit yields all cached books as a single batch without touching the
+    network; a miss streams pages as usual and caches the full result if the
+    search finished without errors.
+
+    Yields:
+        list: Book dicts for one batch.
+        str: An error message string, or None.
+    """
+    cached = cache.get(query, max_pages=max_pages, max_results=max_results)
+    if cached is not None:
+        yield cached, None
+        return
+
+    collected = []
+    failed = False
+    for batch, error in iter_search_pages(query, max_pages=max_pages, max_results=max_results, parse_pool=parse_pool):
+        collected.extend(batch)
+        failed = failed or bool(error)
+        yield batch, error
+
+    if not failed:
+        cache.put(query, collected, max_pages=max_pages, max_results=max_results)
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Could not save search cache: {e}")
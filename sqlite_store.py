@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sqlite3
+
+from scraper_core import SCRIPT_DIR, INTERESTED_BOOKS_FULL_PATH, book_key, iter_books_json, write_books_json
+
+# --- Configuration ---
+WATCHLIST_DB_FILE = "interested_books.db" # SQLite database next to the script
+WATCHLIST_DB_FULL_PATH = os.path.join(SCRIPT_DIR, WATCHLIST_DB_FILE)
+
+# Book fields stored in their own columns; anything else goes into 'extra' as JSON
+_BOOK_COLUMNS = ('title', 'url', 'price', 'product_id', 'display_text', 'error')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    book_key     TEXT PRIMARY KEY,
+    position     INTEGER NOT NULL,
+    title        TEXT,
+    url          TEXT,
+    price        TEXT,
+    product_id   TEXT,
+    display_text TEXT,
+    error        TEXT,
+    extra        TEXT
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    book_key TEXT NOT NULL REFERENCES books(book_key) ON DELETE CASCADE,
+    seq      INTEGER NOT NULL,  -- Position in the book's history list, keeps JSON order
+    date     TEXT NOT NULL,     -- 'YYYY-MM-DD'
+    price    TEXT NOT NULL,     -- Same string as in the JSON file, e.g. '8.45'
+    PRIMARY KEY (book_key, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_book_date ON price_history (book_key, date);
+"""
+
+
+# --- SQLite Storage Engine ---
+class SQLiteStore:
+    """
+    Watchlist and price history stored in SQLite.
+
+    Unlike interested_books.json, saving after a refresh only touches the rows
+    of the books that changed: upsert_book() rewrites one book row and appends
+    the new history entries. Books come back from load_books() in exactly the
+    JSON format used elsewhere, so the rest of the app does not care which
+    storage is used.
+    """
+
+    def __init__(self, path=WATCHLIST_DB_FULL_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL") # Readers don't block the refresh writer
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    # --- Writes ---
+    def _upsert(self, book_data, position=None):
+        key = book_key(book_data)
+        if not key:
+            return False
+        if position is None:
+            row = self.conn.execute("SELECT position FROM books WHERE book_key = ?", (key,)).fetchone()
+            if row is None:
+                row = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM books").fetchone()
+            position = row[0]
+        extra = {k: v for k, v in book_data.items() if k not in _BOOK_COLUMNS and k != 'price_history'}
+        self.conn.execute(
+            "INSERT INTO books (book_key, position, title, url, price, product_id, display_text, error, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(book_key) DO UPDATE SET position = excluded.position, title = excluded.title,"
+            " url = excluded.url, price = excluded.price, product_id = excluded.product_id,"
+            " display_text = excluded.display_text, error = excluded.error, extra = excluded.extra",
+            (key, position, *(book_data.get(column) for column in _BOOK_COLUMNS),
+             json.dumps(extra, ensure_ascii=False) if extra else None))
+
+        history = [entry for entry in book_data.get('price_history') or []
+                   if isinstance(entry, (list, tuple)) and len(entry) == 2]
+        stored = self.conn.execute("SELECT COUNT(*), MAX(seq) FROM price_history WHERE book_key = ?", (key,)).fetchone()
+        stored_count = stored[0]
+        if stored_count > len(history) or (stored_count and stored[1] != stored_count - 1):
+            # History was edited rather than appended to: rewrite it
+            self.conn.execute("DELETE FROM price_history WHERE book_key = ?", (key,))
+            stored_count = 0
+        elif stored_count:
+            last = self.conn.execute("SELECT date, price FROM price_history WHERE book_key = ? AND seq = ?",
+                                     (key, stored_count - 1)).fetchone()
+            if list(last) != [str(history[stored_count - 1][0]), str(history[stored_count - 1][1])]:
+                self.conn.execute("DELETE FROM price_history WHERE book_key = ?", (key,))
+                stored_count = 0
+        self.conn.executemany(
+            "INSERT INTO price_history (book_key, seq, date, price) VALUES (?, ?, ?, ?)",
+            ((key, seq, str(entry[0]), str(entry[1])) for seq, entry in enumerate(history) if seq >= stored_count))
+        return True
+
+    def upsert_book(self, book_data):
+        """
+        Inserts or updates one book and appends any new price history entries.
+
+        Returns:
+            bool: False if the book has no usable key (product_id or url).
+        """
+        with self.conn:
+            return self._upsert(book_data)
+
+    def upsert_books(self, books):
+        """Upserts many books in a single transaction. Returns the number stored."""
+        count = 0
+        with self.conn:
+            for book_data in books:
+                if isinstance(book_data, dict) and self._upsert(book_data):
+                    count += 1
+        return count
+
+    def replace_all(self, books):
+        """Replaces the whole watchlist (e.g. when importing a JSON file)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM price_history")
+            self.conn.execute("DELETE FROM books")
+            count = 0
+            for book_data in books:
+                if isinstance(book_data, dict) and self._upsert(book_data, position=count):
+                    count += 1
+        return count
+
+    def remove_book(self, key):
+        """Deletes a book and its history. Returns True if it existed."""
+        with self.conn:
+            return self.conn.execute("DELETE FROM books WHERE book_key = ?", (key,)).rowcount > 0
+
+    # --- Reads ---
+    def _row_to_book(self, row):
+        key, title, url, price, product_id, display_text, error, extra = row
+        book_data = json.loads(extra) if extra else {}
+        book_data.update({'title': title, 'url': url, 'price': price, 'product_id': product_id,
+                          'display_text': display_text})
+        if error is not None:
+            book_data['error'] = error
+        return key, book_data
+
+    def iter_books(self, with_history=True):
+        """
+        Yields book dicts (JSON format) in watchlist order, one at a time.
+
+        History rows are streamed alongside the books with a single ordered
+        query, so memory use does not grow with the total history size.
+        """
+        book_rows = self.conn.execute(
+            "SELECT book_key, title, url, price, product_id, display_text, error, extra"
+            " FROM books ORDER BY position")
+        if not with_history:
+            for row in book_rows:
+                yield self._row_to_book(row)[1]
+            return
+
+        history_rows = self.conn.cursor().execute(
+            "SELECT h.book_key, h.date, h.price FROM price_history h JOIN books b USING (book_key)"
+            " ORDER BY b.position, h.seq")
+        pending = next(history_rows, None)
+        for row in book_rows:
+            key, book_data = self._row_to_book(row)
+            history = []
+            while pending is not None and pending[0] == key:
+                history.append([pending[1], pending[2]])
+                pending = next(history_rows, None)
+            book_data['price_history'] = history
+            yield book_data
+
+    def load_books(self):
+        """Returns the whole watchlist as a list of book dicts (JSON format)."""
+        return list(self.iter_books())
+
+    def history(self, key, start_date=None, end_date=None):
+        """
+        Range query over one book's price history.
+
+        Args:
+            key (str): Book key (product_id or url).
+            start_date (str, optional): Inclusive 'YYYY-MM-DD' lower bound.
+            end_date (str, optional): Inclusive 'YYYY-MM-DD' upper bound.
+
+        Returns:
+            list: [date_str, price_str] entries ordered by date.
+        """
+        query = "SELECT date, price FROM price_history WHERE book_key = ?"
+        params = [key]
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        query += " ORDER BY date, seq"
+        return [[date, price] for date, price in self.conn.execute(query, params)]
+
+    # --- JSON Import / Export ---
+    def import_json(self, json_path, replace=True):
+        """
+        Loads an interested_books.json style file into the database.
+
+        The file is decoded one book at a time (scraper_core.iter_books_json)
+        inside a single transaction, so a malformed file changes nothing.
+
+        Args:
+            json_path (str): Path of the JSON list of book dicts.
+            replace (bool): Replace the current watchlist (True) or merge into it.
+
+        Returns:
+            int: Number of books imported.
+        """
+        books = iter_books_json(json_path)
+        return self.replace_all(books) if replace else self.upsert_books(books)
+
+    def export_json(self, json_path):
+        """Writes the watchlist in the interested_books.json format (atomically), streaming it from the database."""
+        return write_books_json(self.iter_books(), json_path)
+
+
+def migrate_json_to_sqlite(json_path=INTERESTED_BOOKS_FULL_PATH, db_path=WATCHLIST_DB_FULL_PATH):
+    """
+    Converts an existing interested_books.json into a new SQLite database.
+
+    The JSON file is left untouched. Returns the number of books migrated.
+    """
+    with SQLiteStore(db_path) as store:
+        return store.import_json(json_path, replace=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the SQLite watchlist database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Convert a JSON watchlist into a database.")
+    migrate_parser.add_argument("json_path", nargs="?", default=INTERESTED_BOOKS_FULL_PATH)
+    migrate_parser.add_argument("db_path", nargs="?", default=WATCHLIST_DB_FULL_PATH)
+
+    export_parser = subparsers.add_parser("export", help="Write the database out as JSON.")
+    export_parser.add_argument("json_path")
+    export_parser.add_argument("--db", default=WATCHLIST_DB_FULL_PATH)
+
+    history_parser = subparsers.add_parser("history", help="Print one book's price history.")
+    history_parser.add_argument("book_key")
+    history_parser.add_argument("--from", dest="start_date")
+    history_parser.add_argument("--to", dest="end_date")
+    history_parser.add_argument("--db", default=WATCHLIST_DB_FULL_PATH)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        print(f"Migrated {migrate_json_to_sqlite(args.json_path, args.db_path)} book(s) into {args.db_path}")
+    elif args.command == "export":
+        with SQLiteStore(args.db) as store:
+            print(f"Exported {store.export_json(args.json_path)} book(s) to {args.json_path}")
+    elif args.command == "history":
+        with SQLiteStore(args.db) as store:
+            for date, price in store.history(args.book_key, args.start_date, args.end_date):
+                print(f"{date}\t{price}")
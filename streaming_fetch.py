@@ -0,0 +1,226 @@
+import codecs
+import threading
+import time
+from collections import deque
+from html.parser import HTMLParser
+
+from extractors import _clean_price_text, _price_selector
+
+# --- Configuration ---
+STREAM_CHUNK_SIZE = 8192 # Bytes read from the socket per step
+STREAM_STATS_KEEP = 1000 # Most recent per-request records kept in memory
+
+
+# --- Incremental Product Page Scanner ---
+class ProductPageScanner(HTMLParser):
+    """
+    Incremental HTML parser that looks only for the product price, id and title.
+
+    Feed it decoded chunks as they arrive; `complete` turns True as soon as the
+    price and product id are both known, so the rest of the page (inline
+    scripts, reviews, recommendations) does not need to be downloaded.
+    Follows the same selectors as extractors.PRICE_SELECTOR/PRODUCT_ID_SELECTOR/
+    TITLE_SELECTOR, taking the first match in document order.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.price = None
+        self.product_id = None
+        self.title = None
+        self.price_selector = None
+        self._price_found = False
+        self._div_stack = [] # True for each open div.product-price
+        self._capture = None # 'price' or 'title' while collecting element text
+        self._capture_tag = None
+        self._capture_depth = 0
+        self._capture_parts = []
+        self._text_node = [] # Data of the current text node (may arrive split across feeds)
+
+    @property
+    def complete(self):
+        return self._price_found and self.product_id is not None
+
+    def info(self):
+        """Returns the fields in the same shape as Extractor.extract_product()."""
+        return {'price': self.price, 'title': self.title, 'product_id': self.product_id,
+                'price_selector': self.price_selector}
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text_node()
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+
+        if self._capture and tag == self._capture_tag:
+            self._capture_depth += 1
+
+        if self.product_id is None:
+            if attrs.get('data-cta-product-id') is not None:
+                self.product_id = attrs['data-cta-product-id'].strip() or None
+            elif tag == 'meta' and attrs.get('itemprop') in ('sku', 'productID'):
+                self.product_id = (attrs.get('content') or '').strip() or None
+
+        if tag == 'div':
+            self._div_stack.append('product-price' in classes)
+        elif tag == 'meta':
+            if not self._price_found and attrs.get('itemprop') == 'price':
+                self.price = (attrs.get('content') or 'N/A').strip()
+                self.price_selector = _price_selector(tag, 'price')
+                self._price_found = True
+            elif self.title is None and attrs.get('property') == 'og:title':
+                self.title = (attrs.get('content') or '').strip() or None
+        elif tag == 'span' and not self._price_found and not self._capture:
+            if attrs.get('itemprop') == 'price' or ('price' in classes and any(self._div_stack)):
+                self.price_selector = _price_selector(tag, attrs.get('itemprop'))
+                self._start_capture('price', tag)
+        elif tag == 'h1' and self.title is None and not self._capture:
+            self._start_capture('title', tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.handle_endtag(tag) # Self-closed element has no content
+
+    def handle_endtag(self, tag):
+        self._flush_text_node()
+        if tag == 'div' and self._div_stack:
+            self._div_stack.pop()
+        if self._capture and tag == self._capture_tag:
+            self._capture_depth -= 1
+            if self._capture_depth == 0:
+                self._finish_capture()
+
+    def handle_data(self, data):
+        if self._capture:
+            self._text_node.append(data)
+
+    def _flush_text_node(self):
+        # Like get_text(strip=True): strip each whole text node, then join them
+        if self._text_node:
+            self._capture_parts.append(''.join(self._text_node).strip())
+            self._text_node = []
+
+    def _start_capture(self, field, tag):
+        self._capture = field
+        self._capture_tag = tag
+        self._capture_depth = 1
+        self._capture_parts = []
+        self._text_node = []
+
+    def _finish_capture(self):
+        text = ''.join(self._capture_parts)
+        if self._capture == 'price':
+            self.price = _clean_price_text(text)
+            self._price_found = True
+        elif self._capture == 'title':
+            self.title = text or None
+        self._capture = None
+        self._capture_tag = None
+
+
+# --- Per-request Byte Accounting ---
+class StreamStats:
+    """Thread-safe record of bytes read and saved by streamed fetches."""
+
+    def __init__(self, keep=STREAM_STATS_KEEP):
+        self._lock = threading.Lock()
+        self.records = deque(maxlen=keep) # Most recent per-request dicts
+        self.requests = 0
+        self.early_stops = 0
+        self.bytes_read = 0
+        self.bytes_saved = 0 # Only counted when the server sent a Content-Length
+
+    def record(self, url, bytes_read, content_length, stopped_early, read_s=None, parse_s=None):
+        bytes_saved = max(0, content_length - bytes_read) if content_length is not None else None
+        entry = {
+            'url': url,
+            'bytes_read': bytes_read,
+            'content_length': content_length,
+            'bytes_saved': bytes_saved,
+            'stopped_early': stopped_early,
+            'read_s': read_s, # Whole body loop, including parse_s
+            'parse_s': parse_s, # Time spent in the scanner
+        }
+        with self._lock:
+            self.records.append(entry)
+            self.requests += 1
+            self.bytes_read += bytes_read
+            if stopped_early:
+                self.early_stops += 1
+            if bytes_saved:
+                self.bytes_saved += bytes_saved
+        return entry
+
+    def summary(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'early_stops': self.early_stops,
+                'bytes_read': self.bytes_read,
+                'bytes_saved': self.bytes_saved,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self.requests = self.early_stops = self.bytes_read = self.bytes_saved = 0
+
+
+stream_stats = StreamStats() # Shared by every streamed fetch in the process
+
+
+def _response_encoding(response):
+    """Charset from Content-Type, defaulting to UTF-8 (requests would guess ISO-8859-1)."""
+    if 'charset=' in response.headers.get('Content-Type', '').lower():
+        return response.encoding or 'utf-8'
+    return 'utf-8'
+
+
+def read_product_stream(response, chunk_size=STREAM_CHUNK_SIZE, stats=stream_stats):
+    """
+    Reads a product page opened with stream=True until the price and product
+    id are found, then closes the connection.
+
+    Args:
+        response (requests.Response): Response from a get(..., stream=True) call,
+                                      already checked for HTTP errors.
+        chunk_size (int): Bytes read per step.
+        stats (StreamStats): Where the per-request byte counts are recorded.
+
+    Returns:
+        dict: {'price', 'title', 'product_id', 'price_selector'} like Extractor.extract_product().
+        dict: The per-request stats record (bytes_read, bytes_saved, read_s, parse_s, ...).
+    """
+    scanner = ProductPageScanner()
+    decoder = codecs.getincrementaldecoder(_response_encoding(response))(errors='replace')
+    stopped_early = False
+    counted = 0
+    parse_s = 0.0
+    started = time.perf_counter()
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            counted += len(chunk)
+            parse_started = time.perf_counter()
+            scanner.feed(decoder.decode(chunk))
+            parse_s += time.perf_counter() - parse_started
+            if scanner.complete:
+                stopped_early = True
+                break
+        if not stopped_early:
+            parse_started = time.perf_counter()
+            scanner.feed(decoder.decode(b'', final=True))
+            scanner.close()
+            parse_s += time.perf_counter() - parse_started
+    finally:
+        # Bytes off the wire (before decompression) when urllib3 can tell us
+        raw_tell = getattr(response.raw, 'tell', None)
+        bytes_read = raw_tell() if callable(raw_tell) else counted
+        response.close() # Drops the rest of the body if we stopped early
+
+    content_length = response.headers.get('Content-Length')
+    try:
+        content_length = int(content_length) if content_length is not None else None
+    except ValueError:
+        content_length = None
+    entry = stats.record(response.url, bytes_read, content_length, stopped_early,
+                         read_s=time.perf_counter() - started, parse_s=parse_s)
+    return scanner.info(), entry
@@ -0,0 +1,328 @@
+import json
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+
+from scraper_core import SCRIPT_DIR
+
+# --- Configuration ---
+WATCH_RULES_FILE = "watch_rules.json" # Global and per-book rules, next to the script
+WATCH_RULES_FULL_PATH = os.path.join(SCRIPT_DIR, WATCH_RULES_FILE)
+WATCH_STATE_FILE = "watch_state.json" # Running state per book (rolling maxima, lowest price)
+WATCH_STATE_FULL_PATH = os.path.join(SCRIPT_DIR, WATCH_STATE_FILE)
+ALERT_LOG_FILE = "alerts.jsonl" # One JSON object per triggered alert, appended
+ALERT_LOG_FULL_PATH = os.path.join(SCRIPT_DIR, ALERT_LOG_FILE)
+DEFAULT_RULES = ( # Global rules used while there is no rules file
+    {'type': 'all_time_low'},
+    {'type': 'drop', 'percent': 20, 'days': 30},
+)
+RULE_TYPES = ('below', 'drop', 'all_time_low')
+
+
+def _cents(price):
+    return round(float(price) * 100)
+
+
+def rule_id(rule):
+    """Stable text id of a rule, e.g. 'below:10.00' or 'drop:20:30'."""
+    if rule['type'] == 'below':
+        return f"below:{float(rule['price']):.2f}"
+    if rule['type'] == 'drop':
+        return f"drop:{float(rule['percent']):g}:{int(rule['days'])}"
+    return rule['type']
+
+
+def validate_rule(rule):
+    """
+    Checks one rule dict and returns it with normalised values.
+
+    Raises:
+        ValueError: If the type is unknown or a required value is missing or invalid.
+    """
+    if not isinstance(rule, dict) or rule.get('type') not in RULE_TYPES:
+        raise ValueError(f"Unknown watch rule {rule!r}; the type must be one of {', '.join(RULE_TYPES)}.")
+    try:
+        if rule['type'] == 'below':
+            return {'type': 'below', 'price': float(rule['price'])}
+        if rule['type'] == 'drop':
+            percent, days = float(rule['percent']), int(rule.get('days', 30))
+            if not 0 < percent < 100 or days < 1:
+                raise ValueError("percent must be between 0 and 100 and days at least 1")
+            return {'type': 'drop', 'percent': percent, 'days': days}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid watch rule {rule!r}: {e}") from None
+    return {'type': 'all_time_low'}
+
+
+# --- Per-book Running State ---
+class _BookState:
+    """
+    What the rules need to know about one book's history so far.
+
+    The rolling maximum of each drop window is a monotonic deque of
+    (day, cents) pairs with decreasing prices: a new observation removes
+    every older entry that is not higher, and entries that fell out of the
+    window are removed from the front, so the front is the window maximum.
+    Each observation is pushed and popped at most once, so keeping the
+    state current costs O(1) per new observation, whatever the history length.
+    """
+    __slots__ = ('length', 'last_entry', 'price', 'low', 'maxes', 'armed')
+
+    def __init__(self, windows):
+        self.length = 0 # History entries consumed
+        self.last_entry = None
+        self.price = None # Latest valid price, in cents
+        self.low = None # Lowest price seen, in cents
+        self.maxes = {days: deque() for days in windows} # days -> deque of (day, cents)
+        self.armed = {} # rule id -> False while the rule's condition still holds after firing
+
+    def push(self, day, cents):
+        for days, window in self.maxes.items():
+            while window and window[-1][1] <= cents:
+                window.pop()
+            window.append((day, cents))
+            while window[0][0] <= day - days:
+                window.popleft()
+        self.price = cents
+        self.low = cents if self.low is None else min(self.low, cents)
+
+    def to_json(self):
+        return {'length': self.length, 'last_entry': self.last_entry, 'price': self.price, 'low': self.low,
+                'maxes': {str(days): [list(item) for item in window] for days, window in self.maxes.items()},
+                'armed': self.armed}
+
+    @classmethod
+    def from_json(cls, data):
+        state = cls(())
+        state.length = int(data['length'])
+        state.last_entry = data.get('last_entry')
+        state.price = data.get('price')
+        state.low = data.get('low')
+        state.maxes = {int(days): deque(tuple(item) for item in window) for days, window in data['maxes'].items()}
+        state.armed = dict(data.get('armed') or {})
+        return state
+
+
+# --- Watch Rules ---
+class WatchRules:
+    """
+    Price-drop rules, evaluated incrementally as refreshed books arrive.
+
+    Rules are global (applied to every book) or per book key:
+      {'type': 'below', 'price': 10.0}             price under 10 EUR
+      {'type': 'drop', 'percent': 20, 'days': 30}  at least 20% under the
+                                                   highest price of the last 30 days
+      {'type': 'all_time_low'}                     lower than any earlier price
+    observe() only consumes the history entries added since the book was
+    last seen (see _BookState), then checks the rules against the latest
+    price. 'below' and 'drop' fire when their condition becomes true and
+    re-arm once it is false again, so a book that stays cheap alerts once.
+    The first time a book is seen its existing history is consumed silently
+    except for the last entry, which is evaluated like a new one.
+
+    The running state can be saved and loaded (save_state/load_state) so
+    later runs continue where the previous one stopped. Safe to call from
+    RefreshEngine worker threads.
+    """
+
+    def __init__(self, global_rules=DEFAULT_RULES, book_rules=None, rules_path=WATCH_RULES_FULL_PATH,
+                 state_path=WATCH_STATE_FULL_PATH):
+        """
+        Args:
+            global_rules (iterable): Rules applied to every book.
+            book_rules (dict, optional): {book key: [rules]} applied in addition.
+            rules_path (str): File written by save_rules().
+            state_path (str): File used by load_state()/save_state(); None keeps the state in memory only.
+
+        Raises:
+            ValueError: If a rule is invalid.
+        """
+        self.global_rules = [validate_rule(rule) for rule in global_rules]
+        self.book_rules = {key: [validate_rule(rule) for rule in rules] for key, rules in (book_rules or {}).items()}
+        self.rules_path = rules_path
+        self.state_path = state_path
+        self._states = {} # key -> _BookState
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, rules_path=WATCH_RULES_FULL_PATH, state_path=WATCH_STATE_FULL_PATH):
+        """
+        Reads the rules file ({"global": [...], "books": {key: [...]}}) and the saved state.
+
+        Without a rules file, DEFAULT_RULES apply to every book.
+
+        Raises:
+            ValueError: If the rules file is malformed.
+        """
+        global_rules, book_rules = DEFAULT_RULES, {}
+        if rules_path and os.path.exists(rules_path):
+            with open(rules_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if not isinstance(stored, dict):
+                raise ValueError(f"{rules_path} must contain an object with 'global' and 'books' rules.")
+            global_rules, book_rules = stored.get('global', []), stored.get('books', {})
+        watch = cls(global_rules, book_rules, rules_path=rules_path, state_path=state_path)
+        watch.load_state()
+        return watch
+
+    def save_rules(self):
+        """Writes the rules file atomically."""
+        tmp_path = self.rules_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'global': self.global_rules, 'books': self.book_rules}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.rules_path)
+
+    def set_book_rules(self, key, rules):
+        """Replaces the per-book rules of one book (an empty list removes them)."""
+        rules = [validate_rule(rule) for rule in rules]
+        with self._lock:
+            if rules:
+                self.book_rules[key] = rules
+            else:
+                self.book_rules.pop(key, None)
+
+    def rules_for(self, key):
+        return self.global_rules + self.book_rules.get(key, [])
+
+    # --- State Persistence ---
+    def load_state(self):
+        """Loads the saved running state, ignoring a missing or unreadable file."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            states = {key: _BookState.from_json(data) for key, data in stored.items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Ignoring unreadable watch state '{self.state_path}': {e}")
+            return
+        with self._lock:
+            self._states = states
+
+    def save_state(self):
+        """Writes the running state of every book seen so far (atomically)."""
+        if not self.state_path:
+            return
+        with self._lock:
+            stored = {key: state.to_json() for key, state in self._states.items()}
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, self.state_path)
+
+    def forget(self, key):
+        """Drops the state of a removed book."""
+        with self._lock:
+            self._states.pop(key, None)
+
+    # --- Evaluation ---
+    def observe(self, key, book_data, now=None):
+        """
+        Updates a book's state with its new history entries and checks its rules.
+
+        Args:
+            key (str): Book key.
+            book_data (dict): The refreshed book (its price_history is read, not changed).
+            now (datetime, optional): Time stamp of the alerts.
+
+        Returns:
+            list: Alert dicts (key, title, url, rule, price, message, time); empty if nothing fired.
+        """
+        rules = self.rules_for(key)
+        if not rules:
+            return []
+        history = book_data.get('price_history') or []
+        windows = {rule['days'] for rule in rules if rule['type'] == 'drop'}
+        with self._lock:
+            state = self._states.get(key)
+            if (state is None or not windows <= set(state.maxes) or state.length > len(history)
+                    or (state.length and history[state.length - 1] != state.last_entry)):
+                # New book, new drop window or rewritten history: rebuild from the history
+                state = self._states[key] = _BookState(windows)
+                self._consume(state, history[:-1])
+            if state.length == len(history):
+                return [] # Nothing new since the last check
+            previous_low = state.low
+            if not self._consume(state, history[state.length:]):
+                return []
+            current = state.price
+            alerts = []
+            for rule in rules:
+                message = self._check(rule, state, current, previous_low)
+                if message:
+                    alerts.append({
+                        'time': (now or datetime.now()).isoformat(timespec='seconds'),
+                        'key': key,
+                        'title': book_data.get('title'),
+                        'url': book_data.get('url'),
+                        'rule': rule_id(rule),
+                        'price': f"{current / 100:.2f}",
+                        'message': message,
+                    })
+            return alerts
+
+    @staticmethod
+    def _consume(state, entries):
+        """Pushes history entries into the state. Returns the number of valid entries."""
+        valid = 0
+        for entry in entries:
+            state.length += 1
+            state.last_entry = entry
+            try:
+                state.push(date.fromisoformat(entry[0]).toordinal(), _cents(entry[1]))
+                valid += 1
+            except (ValueError, TypeError, IndexError):
+                pass
+        return valid
+
+    @staticmethod
+    def _check(rule, state, current, previous_low):
+        """Message if the rule fires for the current price, else None. Updates the rule's armed flag."""
+        kind = rule['type']
+        if kind == 'all_time_low':
+            if previous_low is not None and current < previous_low:
+                return f"New all-time low {current / 100:.2f} EUR (previous {previous_low / 100:.2f})"
+            return None
+        if kind == 'below':
+            holds = current < round(rule['price'] * 100)
+            message = f"Below {rule['price']:.2f} EUR: {current / 100:.2f}"
+        else:
+            peak = state.maxes[rule['days']][0][1]
+            drop = (peak - current) / peak * 100 if peak > 0 else 0.0
+            holds = drop >= rule['percent']
+            message = f"{drop:.1f}% under the {rule['days']}-day high of {peak / 100:.2f} EUR"
+        ident = rule_id(rule)
+        fire = holds and state.armed.get(ident, True)
+        state.armed[ident] = not holds # Fires again only after the condition was false
+        return message if fire else None
+
+
+# --- Alert Log ---
+class AlertLog:
+    """Append-only JSON-lines file of triggered alerts."""
+
+    def __init__(self, path=ALERT_LOG_FULL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, alerts):
+        if not alerts or not self.path:
+            return
+        lines = ''.join(json.dumps(alert, ensure_ascii=False) + '\n' for alert in alerts)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+    def read(self, limit=None):
+        """The logged alerts, oldest first (only the last `limit` if given)."""
+        if not self.path or not os.path.exists(self.path):
+            return []
+        alerts = deque(maxlen=limit)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    alerts.append(json.loads(line))
+                except ValueError:
+                    pass # A line cut short by a crash
+        return list(alerts)
@@ -0,0 +1,400 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date
+
+from scraper_core import INTERESTED_BOOKS_FULL_PATH, book_key, iter_books_json, write_books_json
+
+# --- Configuration ---
+EXPORT_BATCH_ROWS = 65536 # Rows buffered per Parquet/Arrow record batch; bounds the memory of an export
+EXPORT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+# Book fields with their own column; any other field goes into 'extra' as a JSON object
+BOOK_FIELDS = ('title', 'url', 'price', 'product_id', 'display_text', 'error', 'search_query', 'last_checked')
+BOOK_COLUMNS = ('key',) + BOOK_FIELDS + ('extra',)
+HISTORY_COLUMNS = ('key', 'seq', 'date', 'price') # One row per price_history entry
+# Parquet/Arrow only: the original string wherever the typed 'date'/'price' would not give it back
+HISTORY_TEXT_COLUMNS = ('date_text', 'price_text')
+OPTIONAL_COLUMNS = {'extra'} | set(HISTORY_TEXT_COLUMNS) # May be missing from files of older exports
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow # Optional, only needed for Parquet and Arrow files
+        import pyarrow.parquet # noqa: F401 (registers pyarrow.parquet)
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow files need the 'pyarrow' package; CSV works without it.") from None
+    return pyarrow
+
+
+def detect_format(path):
+    """
+    Export format of a file, from its extension.
+
+    Returns:
+        str: 'csv', 'parquet' or 'arrow'.
+
+    Raises:
+        ValueError: For any other extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{extension}' of {path}; use one of {', '.join(EXPORT_FORMATS)}.")
+    return EXPORT_FORMATS[extension]
+
+
+def history_path_for(books_path):
+    """Default price history file next to a books file: books.csv -> books.history.csv."""
+    root, extension = os.path.splitext(books_path)
+    return f"{root}.history{extension}"
+
+
+def _book_row(key, book_data):
+    extra = {k: v for k, v in book_data.items() if k not in BOOK_FIELDS and k != 'price_history'}
+    row = [key]
+    for field in BOOK_FIELDS:
+        value = book_data.get(field)
+        row.append(None if value is None else str(value))
+    row.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+    return row
+
+
+def _row_to_book(row):
+    """Book dict (without price_history) from a BOOK_COLUMNS mapping; empty cells are missing fields."""
+    book_data = json.loads(row['extra']) if row.get('extra') else {}
+    for field in BOOK_FIELDS:
+        if row.get(field) not in (None, ''):
+            book_data[field] = row[field]
+    return row.get('key'), book_data
+
+
+def _history_entries(book_data):
+    for entry in book_data.get('price_history') or []:
+        if isinstance(entry, (list, tuple)) and len(entry) == 2:
+            yield str(entry[0]), str(entry[1])
+
+
+# --- Writers ---
+class _CsvWriter:
+    """Books and history as two CSV files with a header row, written row by row."""
+
+    def __init__(self, books_path, history_path):
+        self._books_file = open(books_path, 'w', encoding='utf-8', newline='')
+        self._history_file = open(history_path, 'w', encoding='utf-8', newline='')
+        self._books = csv.writer(self._books_file)
+        self._history = csv.writer(self._history_file)
+        self._books.writerow(BOOK_COLUMNS)
+        self._history.writerow(HISTORY_COLUMNS)
+        self.history_rows = 0
+
+    def add(self, key, book_data):
+        self._books.writerow(_book_row(key, book_data))
+        for seq, (date_str, price) in enumerate(_history_entries(book_data)):
+            self._history.writerow((key, seq, date_str, price))
+            self.history_rows += 1
+
+    def close(self):
+        self._books_file.close()
+        self._history_file.close()
+
+
+class _ArrowWriter:
+    """
+    Books and history as Parquet or Arrow IPC files, written in record batches.
+
+    History is typed for analytics: 'date' is a date32 and 'price' a float64.
+    So that an import gives back exactly what was exported, 'date_text' and
+    'price_text' keep the original string of every value the typed column
+    would not reproduce ('8.5', which reads back as '8.50', or 'N/A', which
+    is not a number); they are null for the usual '2025-04-04' / '8.45'
+    entries, so they cost next to nothing. A value that cannot be parsed at
+    all is null in its typed column.
+    """
+
+    def __init__(self, books_path, history_path, fmt, batch_rows=EXPORT_BATCH_ROWS):
+        pa = self._pa = _import_pyarrow()
+        self.batch_rows = max(1, batch_rows)
+        self.book_schema = pa.schema([(name, pa.string()) for name in BOOK_COLUMNS])
+        self.history_schema = pa.schema([('key', pa.string()), ('seq', pa.int32()), ('date', pa.date32()),
+                                         ('price', pa.float64()), ('date_text', pa.string()),
+                                         ('price_text', pa.string())])
+        if fmt == 'parquet':
+            self._book_writer = pa.parquet.ParquetWriter(books_path, self.book_schema)
+            self._history_writer = pa.parquet.ParquetWriter(history_path, self.history_schema)
+        else:
+            self._book_writer = pa.ipc.new_file(books_path, self.book_schema)
+            self._history_writer = pa.ipc.new_file(history_path, self.history_schema)
+        self._book_rows = []
+        self._history_columns = ([], [], [], [], [], [])
+        self.history_rows = 0
+
+    @staticmethod
+    def _typed(date_str, price):
+        """(date or None, float or None, date text or None, price text or None) of one history entry."""
+        try:
+            day = date.fromisoformat(date_str)
+        except ValueError:
+            day = None
+        try:
+            value = float(price)
+        except ValueError:
+            value = None
+        date_text = None if day is not None and day.isoformat() == date_str else date_str
+        price_text = None if value is not None and f"{value:.2f}" == price else price
+        return day, value, date_text, price_text
+
+    def add(self, key, book_data):
+        self._book_rows.append(_book_row(key, book_data))
+        if len(self._book_rows) >= self.batch_rows:
+            self._flush_books()
+        keys, seqs, dates, prices, date_texts, price_texts = self._history_columns
+        for seq, (date_str, price) in enumerate(_history_entries(book_data)):
+            day, value, date_text, price_text = self._typed(date_str, price)
+            keys.append(key)
+            seqs.append(seq)
+            dates.append(day)
+            prices.append(value)
+            date_texts.append(date_text)
+            price_texts.append(price_text)
+            if len(keys) >= self.batch_rows:
+                self._flush_history()
+
+    def _flush_books(self):
+        if self._book_rows:
+            columns = [list(column) for column in zip(*self._book_rows)]
+            self._book_writer.write_batch(self._pa.record_batch(columns, schema=self.book_schema))
+            self._book_rows = []
+
+    def _flush_history(self):
+        if self._history_columns[0]:
+            self._history_writer.write_batch(self._pa.record_batch(list(self._history_columns),
+                                                                   schema=self.history_schema))
+            self.history_rows += len(self._history_columns[0])
+            for column in self._history_columns: # The batch holds its own copy
+                column.clear()
+
+    def close(self):
+        self._flush_books()
+        self._flush_history()
+        self._book_writer.close()
+        self._history_writer.close()
+
+
+def export_books(books, books_path, history_path=None, fmt=None, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Writes a watchlist as a books table and a flattened price history table.
+
+    Books are consumed one at a time and rows are written as they come (in
+    record batches of batch_rows for Parquet/Arrow), so memory use does not
+    grow with the watchlist or its history when `books` is a generator such
+    as iter_books_json() or SQLiteStore.iter_books(). Both files are
+    written under a temporary name and swapped in once complete.
+
+    Books table: BOOK_COLUMNS, one row per book, 'key' being scraper_core.book_key.
+    History table: HISTORY_COLUMNS, one row per price_history entry, grouped
+    by book in watchlist order ('seq' is the entry's position in its list).
+
+    Args:
+        books (iterable): Book dicts; entries without a usable key are skipped.
+        books_path (str): Books file; its extension picks the format unless fmt is given.
+        history_path (str, optional): History file; defaults to history_path_for(books_path).
+        fmt (str, optional): 'csv', 'parquet' or 'arrow'.
+        batch_rows (int): Rows per Parquet/Arrow record batch.
+
+    Every [date, price] entry is written, in any format, so importing the
+    files gives back the same strings (see _ArrowWriter for how Parquet/Arrow
+    keep values that their typed columns cannot hold).
+
+    Returns:
+        dict: Counts of 'books' and 'history_rows'.
+
+    Raises:
+        ValueError: If the format is unknown.
+        RuntimeError: If Parquet/Arrow is requested without pyarrow installed.
+    """
+    fmt = fmt or detect_format(books_path)
+    history_path = history_path or history_path_for(books_path)
+    tmp_paths = (books_path + '.tmp', history_path + '.tmp')
+    if fmt == 'csv':
+        writer = _CsvWriter(*tmp_paths)
+    elif fmt in ('parquet', 'arrow'):
+        writer = _ArrowWriter(*tmp_paths, fmt, batch_rows=batch_rows)
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+    count = 0
+    try:
+        for book_data in books:
+            key = book_key(book_data) if isinstance(book_data, dict) else None
+            if key:
+                writer.add(key, book_data)
+                count += 1
+        writer.close()
+    except BaseException:
+        writer.close()
+        for path in tmp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    os.replace(tmp_paths[0], books_path)
+    os.replace(tmp_paths[1], history_path)
+    return {'books': count, 'history_rows': writer.history_rows}
+
+
+# --- Readers ---
+def _iter_csv(path, columns):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = set(columns) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} lacks the column(s) {', '.join(sorted(missing))}.")
+        yield from reader
+
+
+def _iter_arrow(path, fmt, columns, batch_rows=EXPORT_BATCH_ROWS):
+    """Rows of a Parquet or Arrow IPC file as dicts, one record batch in memory at a time."""
+    pa = _import_pyarrow()
+    if fmt == 'parquet':
+        parquet_file = pa.parquet.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        batches = parquet_file.iter_batches(batch_size=batch_rows, columns=[name for name in columns if name in names])
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path)) # Batches are mapped, not read, until used
+        names = reader.schema.names
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    missing = set(columns) - set(names) - OPTIONAL_COLUMNS
+    if missing:
+        raise ValueError(f"{path} lacks the column(s) {', '.join(sorted(missing))}.")
+    for batch in batches:
+        present = [name for name in columns if name in batch.schema.names]
+        values = [batch.column(name).to_pylist() for name in present]
+        for row in zip(*values):
+            yield dict(zip(present, row))
+
+
+def _history_value(row):
+    """(key, date string, price string) of a history row from any of the formats."""
+    day = row.get('date_text') or row['date']
+    price = row.get('price_text') or row['price']
+    if isinstance(day, date):
+        day = day.isoformat()
+    if isinstance(price, float):
+        price = f"{price:.2f}" # Prices are recorded with two decimals
+    return row['key'], str(day), str(price)
+
+
+def iter_import(books_path, history_path=None, fmt=None, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Yields the book dicts of an exported watchlist (see export_books), one at a time.
+
+    The books and history files are read side by side: each book collects
+    the history rows that follow for its key, so the history must be grouped
+    by book in the books' order, as export_books writes it. Only one book
+    and one read batch are in memory at a time.
+
+    Yields:
+        dict: Book dict in the interested_books.json format.
+
+    Raises:
+        ValueError: On an unknown format, missing columns, or history rows
+                    that do not follow their book's order (raised at the end).
+        RuntimeError: If Parquet/Arrow is read without pyarrow installed.
+    """
+    fmt = fmt or detect_format(books_path)
+    history_path = history_path or history_path_for(books_path)
+    if fmt == 'csv':
+        book_rows = _iter_csv(books_path, ('key',))
+        history_rows = (_history_value(row) for row in _iter_csv(history_path, HISTORY_COLUMNS))
+    elif fmt in ('parquet', 'arrow'):
+        book_rows = _iter_arrow(books_path, fmt, BOOK_COLUMNS, batch_rows)
+        history_rows = (_history_value(row) for row in _iter_arrow(history_path, fmt,
+                                                                   HISTORY_COLUMNS + HISTORY_TEXT_COLUMNS, batch_rows))
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+
+    pending = next(history_rows, None)
+    for row in book_rows:
+        key, book_data = _row_to_book(row)
+        history = []
+        while pending is not None and pending[0] == key:
+            history.append([pending[1], pending[2]])
+            pending = next(history_rows, None)
+        book_data['price_history'] = history
+        yield book_data
+    if pending is not None:
+        raise ValueError(f"History row for '{pending[0]}' in {history_path} does not follow the books' order "
+                         f"(or its book is missing); rows must be grouped by book as export_books writes them.")
+
+
+# --- Command Line ---
+def _source_books(storage, path):
+    """Generator of the books of a stored watchlist, and a close function."""
+    if storage == "sqlite":
+        from sqlite_store import SQLiteStore
+        store = SQLiteStore(path)
+        return store.iter_books(), store.close
+    if storage == "journal":
+        from price_journal import PriceJournal
+        journal = PriceJournal(path)
+        return iter(journal.load() or []), journal.close # Replaying the journal needs every book at once
+    return iter_books_json(path), lambda: None
+
+
+def _default_path(storage):
+    if storage == "sqlite":
+        from sqlite_store import WATCHLIST_DB_FULL_PATH
+        return WATCHLIST_DB_FULL_PATH
+    return INTERESTED_BOOKS_FULL_PATH
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Stream the watchlist and its price history to or from CSV, Parquet or Arrow files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("export", "Write the saved watchlist to a books file and a history file."),
+                               ("import", "Replace the saved watchlist with an exported one.")):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("books_path", help="Books file (.csv, .parquet, .arrow/.feather).")
+        sub.add_argument("history_path", nargs="?", help="History file (default: BOOKS.history.EXT).")
+        sub.add_argument("--format", choices=sorted(set(EXPORT_FORMATS.values())),
+                         help="File format (default: from the books file's extension).")
+        sub.add_argument("--storage", choices=("json", "sqlite", "journal"), default="json")
+        sub.add_argument("--file", default=None,
+                         help="Watchlist file (default: interested_books.json, or interested_books.db for sqlite).")
+    args = parser.parse_args(argv)
+    path = args.file or _default_path(args.storage)
+    history_path = args.history_path or history_path_for(args.books_path)
+
+    try:
+        if args.command == "export":
+            books, close = _source_books(args.storage, path)
+            try:
+                stats = export_books(books, args.books_path, history_path, fmt=args.format)
+            finally:
+                close()
+            print(f"Exported {stats['books']} book(s) to {args.books_path} and {stats['history_rows']} "
+                  f"history row(s) to {history_path}")
+        else:
+            books = iter_import(args.books_path, history_path, fmt=args.format)
+            if args.storage == "sqlite":
+                from sqlite_store import SQLiteStore
+                with SQLiteStore(path) as store:
+                    count = store.replace_all(books) # One transaction: an invalid file changes nothing
+            elif args.storage == "journal":
+                from price_journal import PriceJournal
+                journal = PriceJournal(path)
+                try:
+                    count = journal.write_snapshot(books)
+                finally:
+                    journal.close()
+            else:
+                count = write_books_json(books, path)
+            print(f"Imported {count} book(s) into {path}")
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"{args.command.capitalize()} failed: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())